@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Solves every scenario of a file in one process, with one Gurobi environment and one
+# loaded catalog, and writes one JSON line per scenario:
+#
+#   python batch.py scenarios.jsonl --output results.jsonl
+#
+# A scenario is a set of input overrides for currentInputs(), e.g. {"minMemory": 20480}.
+# Scenario files are JSON lines, a JSON list, or a CSV with one input per column.
+import argparse
+import csv
+import json
+import sys
+import time
+
+import serverOptimization as so
+from componentCatalog import defaultCatalogDir, loadCatalog
+
+
+def parseValue(text):
+    # CSV cells: numbers, true/false and null as JSON, anything else as a string
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def loadScenarios(path):
+    with open(path) as f:
+        if path.endswith(".csv"):
+            return [dict((name, parseValue(value)) for name, value in row.items() if value != "") for row in csv.DictReader(f)]
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def solveScenarios(scenarios, defaults=None, catalogDir=defaultCatalogDir, threads=0, params=None):
+    # Yields {"index", "scenario", "seconds", "solution" or "error"} for each scenario in
+    # order. defaults are overrides every scenario starts from.
+    from gurobipy import GurobiError
+    env = so.quietEnv(threads, params)
+    catalog = loadCatalog(catalogDir)
+    for index, scenario in enumerate(scenarios):
+        start = time.perf_counter()
+        record = {"index": index, "scenario": scenario}
+        try:
+            solution = so.solve(so.currentInputs(dict(defaults or {}, **scenario)), catalog, env)
+            record["solution"] = solution.toDict() if solution is not None else None
+        except (GurobiError, ValueError) as e:
+            record["error"] = str(e)
+        record["seconds"] = time.perf_counter() - start
+        yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a file of scenarios in one process")
+    parser.add_argument("scenarios", help="JSON lines, JSON list or CSV file of input overrides")
+    parser.add_argument("--output", help="JSON lines file to write, standard output by default")
+    parser.add_argument("--mode", choices=["auto", "mip", "enumerate", "decompose", "columns"],
+                        help="solverMode of scenarios that do not set one")
+    parser.add_argument("--catalog", default=defaultCatalogDir)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--time-limit", type=float)
+    args = parser.parse_args()
+    defaults = {"solverMode": args.mode} if args.mode else {}
+    params = {"TimeLimit": args.time_limit} if args.time_limit is not None else None
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for record in solveScenarios(loadScenarios(args.scenarios), defaults, args.catalog, args.threads, params):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
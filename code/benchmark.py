@@ -0,0 +1,225 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Times ilp() and goalProgramming() models on synthetic catalogs and appends one JSON line
+# per solve to a history file:
+#
+#   python benchmark.py --scales 1 10 100 --mixes 5
+#
+# Catalogs are the built-in one with every row copied scale times at jittered prices and
+# specs, so scale 10 has about 10 times the variables of buildVars().
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import time
+
+import numpy as np
+
+from componentCatalog import defaultCatalogDir, loadCatalog, readTable, sourcePaths, tables
+
+benchmarkDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".benchmark")
+defaultHistory = os.path.join(benchmarkDir, "history.jsonl")
+
+# Text columns suffixed on every copy so each copy gets its own variable name
+labelColumns = {"cpus": ["name", "family"], "memory": ["memoryType"], "disk25": ["partnumber"], "disk35": ["partnumber"],
+                "diskNvme": ["partnumber"], "siom": ["manufacturer"], "pciNetwork": ["manufacturer"], "servers": ["name"]}
+# Numeric columns scaled by a random factor on every copy; slot counts stay as they are
+jitterColumns = {"cpus": ["cost", "ghz"], "memory": ["cost"], "disk25": ["cost", "iops"], "disk35": ["cost", "iops"],
+                 "diskNvme": ["cost", "iops"], "siom": ["cost"], "pciNetwork": ["cost"], "servers": ["cost", "watts"]}
+jitter = 0.15
+
+# Requirement inputs a mix draws from, around the defaults of serverOptimization
+requirementChoices = {"minMemory": [4096, 10240, 40960],
+                      "minGigaflops": [1000, 3000, 10000],
+                      "minDiskTB": [200, 1800, 5000],
+                      "minDiskIOPS": [0, 20000, 100000],
+                      "minTotalNetworkSpeedGigabits": [1000, 4300, 12000],
+                      "fillAllDiskSlots": [True, False],
+                      "rackCostScalingFactor": [0, 1]}
+# Goal of goalProgramming() each requirement sets
+requirementGoals = {"minMemory": "memoryGB", "minGigaflops": "cpuGigaflops", "minDiskTB": "diskTB",
+                    "minDiskIOPS": "diskIOPS", "minTotalNetworkSpeedGigabits": "totalNetworkSpeedGigabits"}
+
+
+def syntheticCatalog(scale, seed=0, path=None):
+    # Writes the built-in catalog with every row repeated scale times to path as csv and
+    # returns path. The first copy is the original row.
+    path = path or os.path.join(benchmarkDir, "catalog-{}-{}".format(scale, seed))
+    if os.path.isdir(path):
+        return path
+    rng = random.Random(seed)
+    staging = path + ".tmp{}".format(os.getpid())
+    os.makedirs(staging)
+    for table, source in sourcePaths(defaultCatalogDir).items():
+        columns = readTable(source)
+        names = list(columns)
+        rows = [dict(zip(names, row)) for row in zip(*[columns[name].tolist() for name in names])]
+        with open(os.path.join(staging, table + ".csv"), "w") as f:
+            f.write(",".join(names) + "\n")
+            for copy in range(scale):
+                for row in rows:
+                    row = dict(row)
+                    if copy > 0:
+                        for name in labelColumns[table]:
+                            row[name] = "{} v{}".format(row[name], copy)
+                        for name in jitterColumns[table]:
+                            value = row[name] * rng.uniform(1 - jitter, 1 + jitter)
+                            row[name] = round(value, 2) if isinstance(row[name], float) else int(round(value))
+                    f.write(",".join(str(row[name]) for name in names) + "\n")
+    try:
+        os.rename(staging, path)
+    except OSError:
+        # Another process wrote the same catalog first
+        pass
+    return path
+
+
+def requirementMixes(count, seed=0):
+    # count requirement overrides for currentInputs(); the first is the defaults
+    rng = random.Random(seed)
+    mixes = [{}]
+    while len(mixes) < count:
+        mixes.append(dict((name, rng.choice(values)) for name, values in requirementChoices.items()))
+    return mixes[:count]
+
+
+def revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timedSolve(m, profile, trace, inputs):
+    # Solves m and returns its sizes, build sections and phase times
+    profile.finish()
+    record = {"build": profile.stats()["total"], "sections": profile.sections, "vars": m.NumVars, "intVars": m.NumIntVars,
+              "constrs": m.NumConstrs, "nonzeros": m.NumNZs}
+    m.optimize(trace)
+    result = trace.write(m, inputs)
+    record.update((name, result[name]) for name in ["presolve", "rootLP", "firstSolution", "lastImprovement", "status", "objVal",
+                                                     "gap", "nodes"])
+    record["solve"] = result["runtime"]
+    return record
+
+
+def benchmarkIlp(so, catalog, mix, env, trace):
+    p = so.currentInputs(dict(mix, solverMode="mip", warmStartPath=None, cachePath=None))
+    profile = so.BuildProfile("ILP")
+    m, b = so.ilpModel(catalog, p, env, profile)
+    return timedSolve(m, profile, trace, mix)
+
+
+def mixGoals(so, mix, env=None):
+    # Goals of goalProgramming() with the targets and settings of a requirement mix
+    goals = so.Goals("goalProgramming", env)
+    for name, goal in requirementGoals.items():
+        if name in mix:
+            getattr(goals, goal).goal = mix[name]
+    for name in ["fillAllDiskSlots", "rackCostScalingFactor"]:
+        if name in mix:
+            setattr(goals, name, mix[name])
+    return goals
+
+
+def benchmarkGoals(so, catalog, mix, env, trace):
+    profile = so.BuildProfile("goalProgramming")
+    profile.mark("goals")
+    goals = mixGoals(so, mix, env)
+    so.goalModel(goals, catalog, profile)
+    return timedSolve(goals.model, profile, trace, mix)
+
+
+def runBenchmarks(scales=(1, 10, 100), mixes=3, models=("ilp", "goals"), history=defaultHistory, seed=0,
+                  timeLimit=300, threads=0, tracePath=None):
+    # Runs every (scale, model, mix) and appends one record per solve to history, and its
+    # progress to tracePath when given. Solves that fail (e.g. a size-limited license on
+    # the large catalogs) are recorded with the error. Returns the records.
+    import serverOptimization as so
+    # serverOptimization loads these on first use; import them before anything is timed
+    import scipy.sparse
+    from gurobipy import GurobiError, gurobi
+    from solveTrace import SolveTrace
+    env = so.quietEnv(threads, {"TimeLimit": timeLimit})
+    run = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": revision(), "gurobi": ".".join(map(str, gurobi.version())),
+           "seed": seed}
+    records = []
+    for scale in scales:
+        start = time.perf_counter()
+        catalog = loadCatalog(syntheticCatalog(scale, seed))
+        load = time.perf_counter() - start
+        rows = dict((table, catalog.size(table)) for table in tables)
+        for model in models:
+            solve = benchmarkIlp if model == "ilp" else benchmarkGoals
+            for index, mix in enumerate(requirementMixes(mixes, seed)):
+                record = dict(run, scale=scale, model=model, mix=index, inputs=mix, catalogRows=rows, catalogLoad=load)
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        record.update(solve(so, catalog, mix, env, SolveTrace(tracePath)))
+                except GurobiError as e:
+                    record["error"] = str(e)
+                records.append(record)
+                print(summaryLine(record))
+    if history:
+        os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+        with open(history, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return records
+
+
+def summaryLine(record):
+    if "error" in record:
+        return "{scale:>5}x {model:<5} mix {mix}: {error}".format(**record)
+    times = " ".join("{}={}".format(name, "-" if record[name] is None else "%.3fs" % record[name])
+                     for name in ["build", "presolve", "rootLP", "solve"])
+    return "{scale:>5}x {model:<5} mix {mix}: {vars} vars {constrs} constrs {nonzeros} nz {times} obj {objVal}".format(times=times, **record)
+
+
+def loadHistory(history=defaultHistory):
+    with open(history) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compareRuns(records, metrics=("build", "solve", "vars", "nonzeros")):
+    # Median of each metric per (scale, model) for the last two runs in records, as
+    # {(scale, model): {metric: (previous, last)}}
+    runs = sorted(set(record["run"] for record in records))[-2:]
+    table = {}
+    for record in records:
+        if record["run"] not in runs or "error" in record:
+            continue
+        entry = table.setdefault((record["scale"], record["model"]), dict((metric, [[], []]) for metric in metrics))
+        for metric in metrics:
+            if record.get(metric) is not None:
+                entry[metric][runs.index(record["run"]) + 2 - len(runs)].append(record[metric])
+    return dict((key, dict((metric, tuple(float(np.median(values)) if values else None for values in pair))
+                           for metric, pair in entry.items())) for key, entry in table.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time ilp() and goalProgramming() models on synthetic catalogs")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--mixes", type=int, default=3, help="requirement mixes per scale and model")
+    parser.add_argument("--models", nargs="+", default=["ilp", "goals"], choices=["ilp", "goals"])
+    parser.add_argument("--history", default=defaultHistory)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=300)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--trace", help="also append the progress of every solve to this JSON lines file")
+    parser.add_argument("--compare", action="store_true", help="print the last two runs in the history and exit")
+    args = parser.parse_args()
+    if args.compare:
+        for (scale, model), metrics in sorted(compareRuns(loadHistory(args.history)).items()):
+            print("{:>5}x {:<5} ".format(scale, model) + "  ".join("{} {} -> {}".format(metric, *["-" if value is None else "%.4g" % value for value in pair])
+                                                                   for metric, pair in metrics.items()))
+        return
+    runBenchmarks(args.scales, args.mixes, args.models, args.history, args.seed, args.time_limit, args.threads, args.trace)
+
+
+if __name__ == "__main__":
+    main()
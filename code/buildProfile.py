@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import time
+
+
+class BuildProfile:
+    # Wall time of every phase of building and solving a model, and the variables,
+    # constraints and nonzeros each section of buildIlp()/goalModel() contributes. Phases
+    # are marked in order: mark(name) ends the previous phase and starts the next one.
+    # section(name, builder) does the same and also counts what the section added to the
+    # builder's rows.
+
+    def __init__(self, name=""):
+        self.name = name
+        self.phases = []
+        self.sections = {}
+        self.model = {}
+        self.presolved = None
+        self.current = None
+        self.started = None
+        self.rowsAt = None
+
+    def mark(self, name=None):
+        now = time.perf_counter()
+        if self.current is not None:
+            self.phases.append({"name": self.current, "seconds": now - self.started})
+        self.current = name
+        self.started = now
+
+    def section(self, name, b):
+        # Closes the previous section with its row counts and opens name. Variables are
+        # counted from the groups a section covers, see sectionVars().
+        if self.rowsAt is None:
+            # Rows the builder added before the first section link count and use variables
+            self.sections["Linking"] = {"vars": 0, "constrs": len(b.names), "nonzeros": int(sum(row.count_nonzero() for row in b.rows)),
+                                        "genConstrs": len(b.linkConstrs)}
+            self.rowsAt = (len(b.rows), len(b.names))
+        if self.current in self.sections:
+            rows = b.rows[self.rowsAt[0]:]
+            entry = self.sections[self.current]
+            entry["constrs"] += len(b.names) - self.rowsAt[1]
+            entry["nonzeros"] += int(sum(row.count_nonzero() for row in rows))
+        self.mark(name)
+        if name is not None:
+            self.sections.setdefault(name, {"vars": sectionVars(name, b), "constrs": 0, "nonzeros": 0})
+            self.rowsAt = (len(b.rows), len(b.names))
+
+    def finish(self):
+        self.mark(None)
+        for name, entry in self.sections.items():
+            entry["seconds"] = self.seconds(name)
+
+    def modelSize(self, m):
+        return {"vars": m.NumVars, "intVars": m.NumIntVars, "constrs": m.NumConstrs, "genConstrs": m.NumGenConstrs,
+                "nonzeros": m.NumNZs}
+
+    def presolve(self, m):
+        # Sizes before and after Gurobi's presolve; runs presolve once more than optimize()
+        self.mark("presolve")
+        presolved = m.presolve()
+        self.mark(None)
+        self.model = self.modelSize(m)
+        self.presolved = self.modelSize(presolved)
+        presolved.dispose()
+
+    def seconds(self, name):
+        return sum(phase["seconds"] for phase in self.phases if phase["name"] == name)
+
+    def stats(self):
+        # The profile as plain data: phase times in order, per section sizes and times, and
+        # the model before and after presolve
+        totals = {}
+        for phase in self.phases:
+            totals[phase["name"]] = totals.get(phase["name"], 0.0) + phase["seconds"]
+        stats = {"model": self.name, "phases": totals, "sections": self.sections, "size": self.model,
+                 "presolved": self.presolved, "total": sum(totals.values())}
+        if self.model:
+            # Rows and variables added outside the builder, like the deviations of Goals
+            stats["unattributed"] = dict((name, self.model[name] - sum(entry.get(name, 0) for entry in self.sections.values()))
+                                         for name in ["vars", "constrs", "nonzeros"])
+        return stats
+
+    def line(self):
+        return "profile " + json.dumps(self.stats(), sort_keys=True)
+
+
+# Groups of components whose count and use variables belong to each build section
+sectionGroups = {"Server": ["servers"], "CPU": ["cpus"], "Memory": ["memory"], "Disk": ["disk25", "disk35", "diskNvme"],
+                 "Network": ["siom", "pciNetwork"]}
+
+
+def sectionVars(name, b):
+    if name == "Racks":
+        return len(b.racks)
+    return sum(2 * len(b.groups.get(group, [])) for group in sectionGroups.get(name, []))
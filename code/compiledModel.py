@@ -0,0 +1,78 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import tempfile
+
+from lazyImport import LazyImport
+
+gp = LazyImport("gurobipy")
+
+# A compiled model is three files next to each other: the built model as compressed MPS,
+# the Python state that goes with it (components, racks, names) and the aggregate rows, see
+# compiledIlp(). The rows are scipy matrices, kept apart so reading a model does not
+# import scipy.
+modelSuffix = ".mps.bz2"
+stateSuffix = ".state.pickle"
+rowsSuffix = ".rows.pickle"
+
+
+def replaceFile(path, suffix, write):
+    # write(temporary file) then rename it to path + suffix, so a concurrent reader sees the
+    # old file or the new one. Nothing is ever deleted under a reader. The temporary file
+    # ends in suffix too, which tells Gurobi the format to write.
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=parent, suffix=suffix)
+    os.close(handle)
+    try:
+        write(temporary)
+        os.replace(temporary, path + suffix)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def pickleTo(value):
+    def write(path):
+        with open(path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return write
+
+
+def writeCompiledModel(path, m, state, rows):
+    # path is the common prefix of the files. The state file is written last and readers
+    # look for it first, so a model is only read once all its files exist. Two processes
+    # compiling the same key write equivalent files, so either may replace the other's. MPS
+    # replaces names with spaces, so the names are kept with the state.
+    m.update()
+    names = {"VarName": m.getAttr("VarName", m.getVars()), "ConstrName": m.getAttr("ConstrName", m.getConstrs()),
+             "GenConstrName": [constr.GenConstrName for constr in m.getGenConstrs()]}
+    replaceFile(path, modelSuffix, m.write)
+    replaceFile(path, rowsSuffix, pickleTo(rows))
+    replaceFile(path, stateSuffix, pickleTo((names, state)))
+    return path
+
+
+def readCompiledModel(path, env=None):
+    # (model, state), or None when path has no complete compiled model
+    try:
+        with open(path + stateSuffix, "rb") as f:
+            names, state = pickle.load(f)
+    except Exception:
+        # Not compiled yet, or written by an incompatible version of the component classes
+        # (compiling again replaces it)
+        return None
+    m = gp.read(path + modelSuffix, env) if env is not None else gp.read(path + modelSuffix)
+    m.setAttr("VarName", m.getVars(), names["VarName"])
+    m.setAttr("ConstrName", m.getConstrs(), names["ConstrName"])
+    for constr, name in zip(m.getGenConstrs(), names["GenConstrName"]):
+        constr.GenConstrName = name
+    m.update()
+    return m, state
+
+
+def readCompiledRows(path):
+    with open(path + rowsSuffix, "rb") as f:
+        return pickle.load(f)
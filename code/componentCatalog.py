@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+defaultCatalogDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog")
+tables = ["servers", "cpus", "memory", "disk25", "disk35", "diskNvme", "siom", "pciNetwork"]
+
+# Compiled catalogs already loaded by this process, keyed by source hash
+loadedCatalogs = {}
+
+# Source directory -> (its mtime, [(table, path)], [(mtime, size)] of the paths, key) of the
+# last catalogKey() of it
+catalogKeys = {}
+
+
+class Catalog:
+    # Columnar component catalog: {table: {column: numpy array}}. Compiled catalogs are
+    # memory-mapped read-only, so every process loading the same catalog shares the pages.
+
+    def __init__(self, columns, key, path=None):
+        self.columns = columns
+        self.key = key
+        # Directory of the compiled catalog
+        self.path = path
+
+    def table(self, name):
+        return self.columns[name]
+
+    def size(self, name):
+        columns = self.columns[name]
+        return len(next(iter(columns.values()))) if columns else 0
+
+    def rows(self, name):
+        # Rows of a table as dicts of plain python values, skipping disabled entries
+        columns = self.columns[name]
+        enabled = columns.get("enabled")
+        names = [c for c in columns if c != "enabled"]
+        values = [pythonValues(columns[c]) for c in names]
+        for i, row in enumerate(zip(*values)):
+            if enabled is None or enabled[i]:
+                yield dict(zip(names, row))
+
+
+def pythonValues(array):
+    values = array.tolist()
+    if array.dtype.kind == 'f':
+        # Keep whole numbers as ints so names like "disk 4TB" match the hand written catalog
+        values = [int(v) if v.is_integer() else v for v in values]
+    return values
+
+
+def columnArray(values):
+    for parse, dtype in [(int, np.int64), (float, np.float64)]:
+        try:
+            return np.array([parse(v) for v in values], dtype=dtype)
+        except ValueError:
+            pass
+    return np.array(values, dtype=str)
+
+
+def sourcePaths(sourceDir):
+    paths = {}
+    for table in tables:
+        for extension in [".parquet", ".csv"]:
+            path = os.path.join(sourceDir, table + extension)
+            if os.path.exists(path):
+                paths[table] = path
+                break
+        else:
+            raise IOError("no catalog file for table {} in {}".format(table, sourceDir))
+    return paths
+
+
+def readTable(path):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required to read parquet catalogs ({})".format(path))
+        data = pyarrow.parquet.read_table(path).to_pydict()
+        return dict((name, np.asarray(values)) for name, values in data.items())
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        data = list(zip(*reader)) or [()] * len(header)
+    return dict((name, columnArray(values)) for name, values in zip(header, data))
+
+
+def fileStamps(paths):
+    stamps = []
+    for table, path in paths:
+        stat = os.stat(path)
+        stamps.append((stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+def catalogKey(sourceDir):
+    # Hash of the source files, only read again when a file's modification time or size
+    # changed since this process last hashed them. Adding or removing a file changes the
+    # directory's modification time, which makes the files be looked up again.
+    directory = os.path.abspath(sourceDir)
+    directoryStamp = os.stat(directory).st_mtime_ns
+    if directory in catalogKeys:
+        cachedStamp, paths, stamps, key = catalogKeys[directory]
+        if cachedStamp == directoryStamp and fileStamps(paths) == stamps:
+            return key
+    paths = sorted(sourcePaths(sourceDir).items())
+    stamps = fileStamps(paths)
+    digest = hashlib.sha1()
+    for table, path in paths:
+        digest.update(table.encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    catalogKeys[directory] = (directoryStamp, paths, stamps, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def compileCatalog(sourceDir=defaultCatalogDir, compiledDir=None, key=None):
+    # Converts the csv/parquet price lists into one .npy file per column. The output
+    # directory is named by the source hash so a changed price list compiles to a new one.
+    compiledDir = compiledDir or os.path.join(sourceDir, ".compiled")
+    key = key or catalogKey(sourceDir)
+    target = os.path.join(compiledDir, key)
+    if os.path.exists(os.path.join(target, "manifest.json")):
+        return target
+    if not os.path.isdir(compiledDir):
+        os.makedirs(compiledDir)
+    staging = tempfile.mkdtemp(dir=compiledDir)
+    manifest = {"key": key, "tables": {}}
+    for table, path in sourcePaths(sourceDir).items():
+        columns = readTable(path)
+        os.makedirs(os.path.join(staging, table))
+        for name, array in columns.items():
+            np.save(os.path.join(staging, table, name + ".npy"), array)
+        manifest["tables"][table] = list(columns)
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Another process compiled the same catalog first
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def loadColumn(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # Empty columns cannot be memory-mapped
+        return np.load(path)
+
+
+def openCompiled(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    columns = {}
+    for table, names in manifest["tables"].items():
+        columns[table] = dict((name, loadColumn(os.path.join(path, table, name + ".npy"))) for name in names)
+    return Catalog(columns, manifest["key"], path)
+
+
+def loadCatalog(sourceDir=defaultCatalogDir, compiledDir=None):
+    key = catalogKey(sourceDir)
+    if key not in loadedCatalogs:
+        loadedCatalogs[key] = openCompiled(compileCatalog(sourceDir, compiledDir, key))
+    return loadedCatalogs[key]
@@ -0,0 +1,202 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import itertools
+from functools import reduce
+
+import numpy as np
+
+hdd = 'HDD'
+# Slack on the >= requirements, the same as Gurobi's default feasibility tolerance
+tolerance = 1e-6
+
+singleTypeInputs = ["maxDistinctServerTypes", "maxDistinctCpus", "maxDistinctMemory", "maxDistinctNetworkCards"]
+
+
+def singleTypeCase(groups, p):
+    # True when the ILP can only pick one server, cpu, memory and network card type and at
+    # most one disk type per form factor. Every configuration is then a choice of types and
+    # a server count, and the cheapest count of each component follows from the requirements.
+    if any(p[name] != 1 for name in singleTypeInputs):
+        return False
+    if p["maxDistinct25Disks"] > 1 or p["maxDistinct35Disks"] > 1:
+        return False
+    # NVMe disks are not tied to slots, their count would be a free variable
+    if p["maxDistinctNvmeDisks"] > 0 and groups["diskNvme"]:
+        return False
+    # Without fillAllDiskSlots the 2.5" and 3.5" counts of a server with both kinds of
+    # slots trade off against each other
+    return p["fillAllDiskSlots"] or all(s.disk25Slots == 0 or s.disk35Slots == 0 for s in groups["servers"])
+
+
+def attributes(components, get):
+    # One value per component plus a trailing 0 for "none of this group"
+    return np.array([get(c) for c in components] + [0], dtype=float)
+
+
+def ceilDiv(required, per):
+    # Smallest count giving at least required with per each; inf when per is 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        count = np.ceil(required / per - tolerance)
+    return np.where(required <= 0, 0, np.where(per > 0, count, np.inf))
+
+
+def capped(count, limit):
+    # Counts above limit are infeasible; keep them finite so they can be multiplied by 0
+    return np.minimum(count, limit + 1)
+
+
+def typeChosen(count, types):
+    # A real type must be bought at least once and "none" (the last column) never
+    real = np.arange(types) < types - 1
+    return (count > 0) == real
+
+
+def rackOptions(racks, p):
+    # Every subset of racks with its capacity and cost. Fewest racks first, then in list
+    # order, so equal cost ties pick the subset rackOrder() allows
+    subsets = sorted(itertools.product([0, 1], repeat=len(racks)), key=lambda subset: (sum(subset), [-use for use in subset]))
+    used = np.array(subsets, dtype=float).reshape(len(subsets), len(racks))
+    cost = np.array([p["rackCostScalingFactor"] * (r.networkCost + r.costPerMonth * 12 * r.timeHorizonYears) for r in racks])
+    return (used, used @ np.array([r.availableRackUnits for r in racks], dtype=float),
+            used @ np.array([r.availableWatts for r in racks], dtype=float), used @ cost)
+
+
+def diskCounts(N, servers, disks, form, p, requirements):
+    # Disk count of each type per (server, server count) for one form factor
+    slots = N * attributes(servers, lambda s: getattr(s, "disk" + form + "Slots"))[:-1, None]
+    if p["fillAllDiskSlots"]:
+        return np.broadcast_to(slots[:, :, None], slots.shape + (len(disks) + 1,)), slots
+    minimum = N * attributes(servers, lambda s: getattr(s, "minimum" + form + "Disks"))[:-1, None]
+    count = np.maximum(minimum[:, :, None], p["minDiskCount"])
+    for required, get in requirements:
+        count = np.maximum(count, ceilDiv(required, attributes(disks, get)))
+    # Servers without these slots get none; singleTypeCase() rules out servers with both
+    count = np.where(slots[:, :, None] > 0, capped(count, slots[:, :, None]), 0)
+    return count, slots
+
+
+def enumerateSingleType(groups, racks, p, top=10):
+    # Costs every (server, server count, cpu, memory, 2.5" disk, 3.5" disk, network card)
+    # combination with the same rows as buildIlp() and returns the top cheapest feasible
+    # ones as [{"cost", "configuration": {varName: count}}], cheapest first. Each group's
+    # cost only depends on the server and its count, so the top configurations are among
+    # the top entries of each group for the best (server, count) pairs.
+    servers = groups["servers"]
+    networkCards = groups["siom"] + groups["pciNetwork"]
+    inf = np.inf
+
+    def serverValues(get):
+        return attributes(servers, get)[:-1, None]
+
+    k = np.arange(int(p["minServers"]), int(p["maxServers"]) + 1, dtype=float)
+    N = serverValues(lambda s: s.nodes) * k
+    nodes = N[:, :, None]
+
+    ##### Servers and racks #####
+    used, rackUnits, watts, rackCost = rackOptions(racks, p)
+    fits = ((serverValues(lambda s: s.rackUnits) * k)[:, :, None] <= rackUnits) & \
+           ((serverValues(lambda s: s.watts) * k)[:, :, None] <= watts)
+    rackChoice = np.argmin(np.where(fits, rackCost, inf), axis=-1)
+    fixed = serverValues(lambda s: s.configuredCost) * k + np.where(fits.any(axis=-1), rackCost[rackChoice], inf)
+
+    ##### CPU #####
+    cpus = groups["cpus"]
+    cpuCount = np.broadcast_to(nodes * serverValues(lambda s: s.cpuSlots)[:, :, None], N.shape + (len(cpus) + 1,))
+    cores = cpuCount * attributes(cpus, lambda c: c.cores)
+    feasible = (cores >= p["minCores"] - tolerance) & \
+               (cores * attributes(cpus, lambda c: c.ghz) >= p["minGigaflops"] - tolerance) & \
+               typeChosen(cpuCount, len(cpus) + 1)
+    cpuCost = np.where(feasible, cpuCount * attributes(cpus, lambda c: c.cost), inf)
+
+    ##### Memory #####
+    memory = groups["memory"]
+    gb = attributes(memory, lambda m: m.memoryGB)
+    memorySlots = nodes * serverValues(lambda s: s.memorySlots)[:, :, None]
+    memoryCount = capped(reduce(np.maximum, [nodes * serverValues(lambda s: s.minMemorySlots)[:, :, None],
+                                             ceilDiv(p["minMemory"], gb),
+                                             ceilDiv(nodes * p["minAvgMemoryPerNode"], gb)]), memorySlots)
+    feasible = (memoryCount <= memorySlots) & \
+               (memoryCount * gb <= nodes * p["maxAvgMemoryPerNode"] + tolerance) & \
+               typeChosen(memoryCount, len(memory) + 1)
+    memoryCost = np.where(feasible, memoryCount * attributes(memory, lambda m: m.cost), inf)
+
+    ##### Disk #####
+    disk25 = groups["disk25"] if p["maxDistinct25Disks"] > 0 else []
+    disk35 = groups["disk35"] if p["maxDistinct35Disks"] > 0 else []
+    requirements = [(p["minDiskTB"], lambda d: d.tb),
+                    (p["minDiskHddTB"], lambda d: d.tb * (d.type == hdd)),
+                    (p["minDiskFastTB"], lambda d: d.tb * (d.type != hdd)),
+                    (p["minDiskIOPS"], lambda d: d.iops),
+                    (p["minDiskHddIOPS"], lambda d: d.iops * (d.type == hdd)),
+                    (p["minDiskFastIOPS"], lambda d: d.iops * (d.type != hdd)),
+                    (p["minDiskStreamMBs"], lambda d: d.streamMBs)]
+    count25, slots25 = diskCounts(N, servers, disk25, "25", p, requirements)
+    count35, slots35 = diskCounts(N, servers, disk35, "35", p, requirements)
+    # (server, count, 2.5" type, 3.5" type)
+    c25 = count25[:, :, :, None]
+    c35 = count35[:, :, None, :]
+    feasible = (c25 <= slots25[:, :, None, None]) & (c35 <= slots35[:, :, None, None]) & \
+               typeChosen(count25, len(disk25) + 1)[:, :, :, None] & typeChosen(count35, len(disk35) + 1)[:, :, None, :] & \
+               (c25 + c35 >= p["minDiskCount"]) & ((c25 > 0) * 1 + (c35 > 0) <= p["maxDistinctDisks"])
+    for required, get in requirements:
+        total = c25 * attributes(disk25, get)[:, None] + c35 * attributes(disk35, get)
+        feasible &= total >= required - tolerance
+    diskCost = np.where(feasible, c25 * attributes(disk25, lambda d: d.cost)[:, None] + c35 * attributes(disk35, lambda d: d.cost), inf)
+    diskCost = diskCost.reshape(N.shape + (-1,))
+
+    ##### Network #####
+    adapters = attributes(networkCards, lambda n: n.adapterCount)
+    siom = np.array([1.0] * len(groups["siom"]) + [0.0] * (len(groups["pciNetwork"]) + 1))
+    cardSlots = np.where(siom > 0, (N * serverValues(lambda s: s.siomCards) * p["allowSiomCards"])[:, :, None],
+                         (N * serverValues(lambda s: s.pcieV3X16Slots + s.pcieV3X8Slots))[:, :, None])
+    maxCards = nodes * p["maxNetworkCardsPerServer"]
+    cardCount = capped(reduce(np.maximum, [nodes * p["minNetworkCardsPerServer"],
+                                           ceilDiv(nodes * p["minNetworkConnectionsPerNode"], adapters),
+                                           ceilDiv(p["minTotalNetworkSpeedGigabits"], adapters * attributes(networkCards, lambda n: n.speedGbit))]), maxCards)
+    feasible = (cardCount <= maxCards) & (cardCount <= p["maxNetworkConnections"]) & \
+               (cardCount <= cardSlots) & typeChosen(cardCount, len(networkCards) + 1)
+    networkCost = np.where(feasible, cardCount * attributes(networkCards, lambda n: n.cost), inf)
+
+    ##### Top configurations #####
+    parts = [cpuCost, memoryCost, diskCost, networkCost]
+    best = fixed + sum(part.min(axis=-1) for part in parts)
+    candidates = np.flatnonzero(np.isfinite(best))
+    if len(candidates) == 0:
+        return []
+    # A (server, count) pair whose cheapest configuration is beaten by the top cheapest
+    # configurations of other pairs cannot be in the result
+    cutoff = np.sort(best.ravel()[candidates])[:top][-1]
+    candidates = candidates[best.ravel()[candidates] <= cutoff]
+    cheapest = []
+    for part in parts:
+        flat = part.reshape(-1, part.shape[-1])[candidates]
+        order = np.argsort(flat, axis=-1, kind="stable")[:, :top]
+        cheapest.append((order, np.take_along_axis(flat, order, axis=-1)))
+    totals = fixed.ravel()[candidates]
+    for axis, (order, costs) in enumerate(cheapest):
+        shape = [len(candidates)] + [1] * len(parts)
+        shape[axis + 1] = costs.shape[1]
+        totals = totals.reshape(totals.shape + (1,) * (len(shape) - totals.ndim)) + costs.reshape(shape)
+    flat = totals.ravel()
+    chosen = np.argsort(flat, kind="stable")[:top]
+    chosen = chosen[np.isfinite(flat[chosen])]
+
+    results = []
+    for index in chosen:
+        position = np.unravel_index(index, totals.shape)
+        s, j = np.unravel_index(candidates[position[0]], N.shape)
+        cpu, mem, disk, network = [order[position[0], position[axis + 1]] for axis, (order, costs) in enumerate(cheapest)]
+        a, b = np.unravel_index(disk, (len(disk25) + 1, len(disk35) + 1))
+        configuration = {servers[s].baseVarName: int(k[j])}
+        for components, choice, count in [(cpus, cpu, cpuCount[s, j, cpu]),
+                                          (memory, mem, memoryCount[s, j, mem]),
+                                          (disk25, a, count25[s, j, a]),
+                                          (disk35, b, count35[s, j, b]),
+                                          (networkCards, network, cardCount[s, j, network])]:
+            if choice < len(components):
+                configuration[components[choice].baseVarName] = int(count)
+        for rack, use in zip(racks, used[rackChoice[s, j]]):
+            if use:
+                configuration["rack " + rack.name] = 1
+        results.append({"cost": float(flat[index]), "configuration": configuration})
+    return results
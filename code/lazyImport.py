@@ -0,0 +1,27 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import importlib
+
+
+class LazyImport:
+    # Stands in for a module (or one of its attributes) and imports it on first attribute
+    # access, so importing a module that uses gurobipy or scipy does not load them (or
+    # check for a Gurobi license) until a model is built:
+    #   gp = LazyImport("gurobipy"); GRB = LazyImport("gurobipy", "GRB")
+
+    def __init__(self, module, attribute=None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attribute) if self._attribute else target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        return "<lazy {}{}>".format(self._module, "." + self._attribute if self._attribute else "")
@@ -0,0 +1,157 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from componentCatalog import loadColumn
+
+# Slack on the >= requirements, the same as Gurobi's default feasibility tolerance
+tolerance = 1e-6
+
+# Requirement input -> index column it is a lower bound on (summed over the servers)
+indexRequirements = {"minCores": "cores",
+                     "minGigaflops": "gigaflops",
+                     "minMemory": "memoryGB",
+                     "minDiskTB": "diskTB",
+                     "minDiskHddTB": "diskHddTB",
+                     "minDiskFastTB": "diskFastTB",
+                     "minDiskIOPS": "diskIOPS",
+                     "minDiskHddIOPS": "diskHddIOPS",
+                     "minDiskFastIOPS": "diskFastIOPS",
+                     "minDiskStreamMBs": "diskStreamMBs",
+                     "minDiskCount": "diskCount",
+                     "minTotalNetworkSpeedGigabits": "networkSpeed"}
+
+# Limits a query takes besides the requirements, with the ILP's defaults
+queryLimits = {"minServers": 0, "maxServers": 50, "maxNetworkConnections": 10000, "rackCostScalingFactor": 0}
+
+
+class NodeIndex:
+    # Every node configuration of a catalog, one row per server with all of its nodes
+    # configured the same, sorted by cost. Columns are memory-mapped like the compiled
+    # catalog. Answers "cheapest cluster of one configuration" questions without a model.
+
+    def __init__(self, columns, manifest):
+        self.columns = columns
+        self.manifest = manifest
+        self.size = len(columns["cost"])
+        racks = manifest["racks"]
+        # Rack subsets, fewest racks first and then in list order like rackOrder()
+        subsets = sorted([tuple((k >> j) & 1 for j in range(len(racks))) for k in range(2 ** len(racks))],
+                         key=lambda subset: (sum(subset), [-use for use in subset]))
+        self.rackSubsets = np.array(subsets, dtype=float).reshape(len(subsets), len(racks))
+        self.rackUnits = self.rackSubsets @ np.array([r["availableRackUnits"] for r in racks], dtype=float)
+        self.rackWatts = self.rackSubsets @ np.array([r["availableWatts"] for r in racks], dtype=float)
+        self.rackCost = self.rackSubsets @ np.array([r["networkCost"] + r["costPerMonth"] * 12 * r["timeHorizonYears"] for r in racks], dtype=float)
+        # Reciprocals so a query multiplies instead of divides
+        self.perUnit = {}
+
+    def reciprocal(self, column):
+        if column not in self.perUnit:
+            values = np.asarray(self.columns[column])
+            with np.errstate(divide="ignore"):
+                self.perUnit[column] = np.where(values > 0, 1.0 / np.where(values > 0, values, 1), np.inf)
+        return self.perUnit[column]
+
+    def serversNeeded(self, **requirements):
+        # Fewest servers of each row meeting the requirements (inf if no count does)
+        unknown = set(requirements) - set(indexRequirements) - set(queryLimits)
+        if unknown:
+            raise ValueError("unknown requirements " + ", ".join(sorted(unknown)))
+        count = np.full(self.size, float(requirements.get("minServers", queryLimits["minServers"])))
+        needed = np.empty(self.size)
+        for name, column in indexRequirements.items():
+            required = requirements.get(name, 0)
+            if required > 0:
+                np.multiply(self.reciprocal(column), required, out=needed)
+                needed -= tolerance
+                np.ceil(needed, out=needed)
+                np.maximum(count, needed, out=count)
+        return count
+
+    def query(self, top=10, **requirements):
+        # The top cheapest single configuration clusters as
+        # [{"cost", "servers", "row", "configuration": {varName: count}}], cheapest first
+        if top < 1:
+            raise ValueError("top must be at least 1")
+        limits = dict(queryLimits, **dict((name, value) for name, value in requirements.items() if name in queryLimits))
+        count = self.serversNeeded(**requirements)
+        # A row fits some rack subset exactly when it fits all racks together
+        feasible = (count <= limits["maxServers"]) & \
+                   (count * self.columns["networkCards"] <= limits["maxNetworkConnections"]) & \
+                   (count * self.columns["rackUnits"] <= self.rackUnits[-1]) & \
+                   (count * self.columns["watts"] <= self.rackWatts[-1])
+        rows = np.flatnonzero(feasible)
+        servers = count[rows]
+        serverCost = servers * self.columns["cost"][rows]
+        rackCost = limits["rackCostScalingFactor"] * self.rackCost
+        # Rack costs are only looked up for the rows whose server cost alone could make the
+        # top: the cheapest few first, then any other row cheaper than the top so far
+        size = top * 8
+        first = np.argpartition(serverCost, size - 1)[:size] if len(serverCost) > size else np.arange(len(serverCost))
+        best = self.rackedTop(first, servers, rows, serverCost, rackCost, top)
+        if len(serverCost) > size:
+            bound = best[top - 1][0] if len(best) >= top else np.inf
+            rest = np.flatnonzero(serverCost < bound)
+            rest = rest[~np.isin(rest, first)]
+            best = sorted(best + self.rackedTop(rest, servers, rows, serverCost, rackCost, top), key=lambda entry: entry[0])[:top]
+        return [{"cost": float(cost), "servers": int(servers[j]), "row": int(rows[j]),
+                 "configuration": self.configuration(rows[j], int(servers[j]), self.rackSubsets[choice])} for cost, j, choice in best]
+
+    def rackedTop(self, chunk, servers, rows, serverCost, rackCost, top):
+        # (total cost, position, rack subset) of the top cheapest of chunk with racks
+        chunk = chunk[np.argsort(serverCost[chunk], kind="stable")]
+        fits = ((servers[chunk] * self.columns["rackUnits"][rows[chunk]])[:, None] <= self.rackUnits) & \
+               ((servers[chunk] * self.columns["watts"][rows[chunk]])[:, None] <= self.rackWatts)
+        choice = np.argmin(np.where(fits, rackCost, np.inf), axis=-1)
+        total = serverCost[chunk] + rackCost[choice]
+        order = np.argsort(total, kind="stable")[:top]
+        return [(total[j], chunk[j], choice[j]) for j in order]
+
+    def configuration(self, row, servers, rackSubset=None):
+        # {varName: count} of a cluster of servers copies of row, like the ILP prints it
+        names = self.manifest["names"]
+        server = names["servers"][self.columns["server"][row]]
+        configuration = {server["name"]: servers}
+        for group in self.manifest["groups"]:
+            entry = self.columns[group][row]
+            if entry >= 0:
+                name = names[group][entry]
+                configuration[name] = configuration.get(name, 0) + servers * server["nodes"] * int(self.columns[group + "Count"][row])
+        for rack, use in zip(self.manifest["racks"], rackSubset if rackSubset is not None else []):
+            if use:
+                configuration["rack " + rack["name"]] = 1
+        return configuration
+
+
+def writeIndex(path, columns, manifest):
+    # Same layout as a compiled catalog: one .npy per column and manifest.json, written
+    # next to the target and renamed into place
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    staging = tempfile.mkdtemp(dir=parent)
+    for name, array in columns.items():
+        np.save(os.path.join(staging, name + ".npy"), array)
+    manifest = dict(manifest, columns=list(columns))
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if os.path.exists(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.rename(staging, path)
+    except OSError:
+        # Another process wrote the same index first
+        shutil.rmtree(staging, ignore_errors=True)
+    return path
+
+
+def openNodeIndex(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    columns = dict((name, loadColumn(os.path.join(path, name + ".npy"))) for name in manifest["columns"])
+    return NodeIndex(columns, manifest)
@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+
+
+class Sensitivity:
+    # Duals and ranges of a solved configuration, from the LP with the choice of components
+    # and racks fixed and the counts relaxed (see sensitivityAnalysis()). Answers what-if
+    # questions about one requirement or one price without solving again; outside the
+    # reported range the answer is None and the MIP has to be re-run. The duals are those of
+    # the LP, whose counts may be fractional, so requirement answers are LP estimates.
+
+    def __init__(self, objVal, lpObjVal, requirements, components):
+        self.objVal = objVal
+        self.lpObjVal = lpObjVal
+        # input -> {"constraint", "sense", "rhs", "activity", "slack", "dual", "rhsLow", "rhsHigh"}
+        self.requirements = requirements
+        # varName -> {"count", "cost", "reducedCost", "costLow", "costHigh"} of every component bought.
+        # Costs are unit prices as ScenarioModel.updatePrices() takes them; for a server the
+        # list price, not the configuredCost the objective uses.
+        self.components = components
+
+    def component(self, name):
+        # The entry of a varName, or of the only component whose name contains name
+        if name in self.components:
+            return name, self.components[name]
+        matches = [varName for varName in self.components if name in varName]
+        if len(matches) != 1:
+            raise KeyError("{} matches {} components bought".format(name, len(matches)))
+        return matches[0], self.components[matches[0]]
+
+    def requirementChange(self, name, rhs):
+        # LP estimate of the objective with input name set to rhs, None outside its range:
+        # the objective of the LP (lpObjVal, at most objVal) moved by the dual. It prices the
+        # change with the same component types and fractional counts, so the MIP objective
+        # can be higher wherever rounding the counts up costs more.
+        entry = self.requirements[name]
+        if not entry["rhsLow"] <= rhs <= entry["rhsHigh"]:
+            return None
+        return self.lpObjVal + entry["dual"] * (rhs - entry["rhs"])
+
+    def costChange(self, name, cost):
+        # Cost of the same configuration with the unit price of a component bought (a
+        # server's list price) set to cost, None outside the LP's cost range, where another
+        # configuration may be cheaper
+        varName, entry = self.component(name)
+        if not entry["costLow"] <= cost <= entry["costHigh"]:
+            return None
+        return self.objVal + entry["count"] * (cost - entry["cost"])
+
+    def toDict(self):
+        return {"objVal": self.objVal, "lpObjVal": self.lpObjVal, "requirements": self.requirements, "components": self.components}
+
+    def toJson(self, **kwargs):
+        return json.dumps(self.toDict(), **kwargs)
+
+    def lines(self):
+        lines = ["LP objective {:g}, MIP objective {:g}".format(self.lpObjVal, self.objVal),
+                 "requirement                          rhs      slack    LP dual   valid rhs range"]
+        for name, entry in self.requirements.items():
+            lines.append("{:<30} {:>10g} {:>10g} {:>10g}   [{:g}, {:g}]".format(name, entry["rhs"], entry["slack"], entry["dual"],
+                                                                            entry["rhsLow"], entry["rhsHigh"]))
+        lines.append("component                                          count       cost   valid cost range")
+        for name, entry in self.components.items():
+            lines.append("{:<50} {:>5} {:>10g}   [{:g}, {:g}]".format(name, entry["count"], entry["cost"], entry["costLow"],
+                                                                    entry["costHigh"]))
+        return lines
+
+    def printReport(self):
+        for line in self.lines():
+            print (line)
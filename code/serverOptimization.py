@@ -1,6 +1,31 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from gurobipy import *
+import hashlib
+import itertools
+import json
+import operator
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+from buildProfile import BuildProfile
+from compiledModel import readCompiledModel, readCompiledRows, writeCompiledModel
+from componentCatalog import Catalog, defaultCatalogDir, loadCatalog
+from enumeration import enumerateSingleType, singleTypeCase
+from lazyImport import LazyImport
+from nodeIndex import openNodeIndex, writeIndex
+from solution import Solution
+from sensitivity import Sensitivity
+from solveCache import cacheKey, openSolveCache
+from solveTrace import openSolveTrace
+from warmStart import openWarmStartStore
+
+# Imported on first use, see lazyImport.py
+gp = LazyImport("gurobipy")
+GRB = LazyImport("gurobipy", "GRB")
+sp = LazyImport("scipy.sparse")
 
 sas = 'SAS'
 sata = 'SATA'
@@ -24,8 +49,11 @@ supermicro = "Super Micro"
 
 
 class Cpu:
+    distinctName = "distinctCpus"
+    # Everything the models read from an entry; entries equal on these are interchangeable
+    modelAttributes = ("cores", "ghz", "cost")
 
-    def __init__(self, model, cores, ghz, cost, name, cachemb=0, watts=0, family='xeon', minCount=0):
+    def __init__(self, cores, ghz, cost, name, cachemb=0, watts=0, family='xeon', minCount=0):
         self.cores = cores
         self.ghz = ghz
         self.cost = cost
@@ -33,29 +61,37 @@ class Cpu:
         self.cacheMB = cachemb
         self.watts = watts
         self.family = family
-        baseVarName = "cpu {} {} @{}".format(family, cores, ghz)
-        self.countVar = model.addVar(lb=0, vtype=GRB.INTEGER, name=baseVarName)
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="use " + baseVarName)
-        model.addConstr(self.countVar - 10000 * self.useVar, GRB.LESS_EQUAL, 0, "distinctCpus " + baseVarName)
+        self.baseVarName = "cpu {} {} @{}".format(family, cores, ghz)
+        self.identifier = name
+        # Entries merged into this one by mergeDuplicates()
+        self.aliases = []
+        # Assigned by MatrixBuilder when a model is built
+        self.countVar = None
+        self.useVar = None
 
 
 class Memory:
+    distinctName = "distinctMemory"
+    modelAttributes = ("memoryGB", "cost")
 
-    def __init__(self, model, gb, memoryType, mhz, cost, ddr='DDR4'):
+    def __init__(self, gb, memoryType, mhz, cost, ddr='DDR4'):
         self.memoryGB = gb
         self.type = memoryType
         self.MHz = mhz
         self.cost = cost
         self.ddrType = ddr
-        baseVarName = "memory {}GB {}".format(self.memoryGB, self.type)
-        self.countVar = model.addVar(lb=0, vtype=GRB.INTEGER, name=baseVarName)
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="use " + baseVarName)
-        model.addConstr(self.countVar - 10000 * self.useVar, GRB.LESS_EQUAL, 0, "distinctMemory " + baseVarName)
+        self.baseVarName = "memory {}GB {}".format(self.memoryGB, self.type)
+        self.identifier = self.baseVarName
+        self.aliases = []
+        self.countVar = None
+        self.useVar = None
 
 
 class Disk:
+    distinctName = "distinctDisks"
+    modelAttributes = ("tb", "iops", "streamMBs", "type", "cost")
 
-    def __init__(self, model, tb, size, cost, iops, protocol, gbps, partnumber, disktype=hdd, streammbs=0):
+    def __init__(self, tb, size, cost, iops, protocol, gbps, partnumber, disktype=hdd, streammbs=0):
         self.tb = tb
         self.iops = iops
         # Simplified generalizations
@@ -74,29 +110,37 @@ class Disk:
         self.gbps = gbps
         self.partNumber = partnumber
         self.cost = cost
-        baseVarName = "disk {}TB {}\" {} {}".format(self.tb, self.size, self.protocol, self.partNumber)
-        self.countVar = model.addVar(lb=0, vtype=GRB.INTEGER, name=baseVarName)
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="use " + baseVarName)
-        model.addConstr(self.countVar - 10000 * self.useVar, GRB.LESS_EQUAL, 0, "distinctDisks " + baseVarName)
+        self.baseVarName = "disk {}TB {}\" {} {}".format(self.tb, self.size, self.protocol, self.partNumber)
+        self.identifier = partnumber
+        self.aliases = []
+        self.countVar = None
+        self.useVar = None
 
 
 class Network:
+    distinctName = "distinctNetworkCards"
+    modelAttributes = ("speedGbit", "adapterCount", "cost")
 
-    def __init__(self, model, cost, speed, adapterType, adapterCount, manufacturer):
+    def __init__(self, cost, speed, adapterType, adapterCount, manufacturer):
         self.cost = cost
         self.speedGbit = speed
         self.adapterType = adapterType
         self.adapterCount = adapterCount
         self.manufacturer = manufacturer
-        baseVarName = "network {} x {} @ {} Gigabit by {}".format(adapterCount, adapterType, speed, manufacturer)
-        self.countVar = model.addVar(lb=0, vtype=GRB.INTEGER, name=baseVarName)
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="use " + baseVarName)
-        model.addConstr(self.countVar - 10000 * self.useVar, GRB.LESS_EQUAL, 0, "distinctNetworkCards " + baseVarName)
+        self.baseVarName = "network {} x {} @ {} Gigabit by {}".format(adapterCount, adapterType, speed, manufacturer)
+        self.identifier = self.baseVarName
+        self.aliases = []
+        self.countVar = None
+        self.useVar = None
 
 
 class Server:
+    distinctName = "distinctServers"
+    modelAttributes = ("configuredCost", "watts", "rackUnits", "cpuSlots", "memorySlots", "minMemorySlots",
+                       "disk25Slots", "disk35Slots", "nvmeSlots", "minimum25Disks", "minimum35Disks",
+                       "pcieV3X16Slots", "pcieV3X8Slots", "siomCards", "nodes")
 
-    def __init__(self, model, name, url, cost, watts, rackunits, cpuslots, memoryslots, minmemoryslots, disk25slots, disk35slots, nvmeslots, minimum25disks, minimum35disks, osdisks, osdisktype, x16, x8, onboardnetworkports, siomcards, powersupplies, nodes):
+    def __init__(self, name, url, cost, watts, rackunits, cpuslots, memoryslots, minmemoryslots, disk25slots, disk35slots, nvmeslots, minimum25disks, minimum35disks, osdisks, osdisktype, x16, x8, onboardnetworkports, siomcards, powersupplies, nodes):
         self.name = name
         self.url = url
         self.cost = cost
@@ -119,497 +163,2200 @@ class Server:
         self.powerSupplies = powersupplies
         self.nodes = nodes
 
+        self.setCost(cost)
+        self.baseVarName = "server " + self.name
+        self.identifier = name
+        self.aliases = []
+        self.countVar = None
+        self.useVar = None
+
+    def setCost(self, cost):
         supportCost = 450
-        self.configuredCost = cost + 139 * osdisks + supportCost
-        baseVarName = "server " + self.name
-        self.countVar = model.addVar(lb=0, vtype=GRB.INTEGER, name=baseVarName)
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="use " + baseVarName)
-        model.addConstr(self.countVar - 10000 * self.useVar, GRB.LESS_EQUAL, 0, "distinctServers " + baseVarName)
+        self.cost = cost
+        self.configuredCost = cost + 139 * self.osDisks + supportCost
 
     def __str__(self):
         return self.name + ":" + str(self.configuredCost)
 
 
 class Rack:
-    availableRackUnits = 0
-    availableWatts = 0
-    networkCost = 0
-    costPerMonth = 0
-    timeHorizonYears = 0
-    useVar = None
-    rackUnits = LinExpr()
-    watts = LinExpr()
-
-    def __init__(self, model, name, availableRackUnits, availableWatts, networkCost, costPerMonth, timeHorizonYears):
+    modelAttributes = ("availableRackUnits", "availableWatts", "networkCost", "costPerMonth", "timeHorizonYears")
+
+    def __init__(self, name, availableRackUnits, availableWatts, networkCost, costPerMonth, timeHorizonYears):
+        self.name = name
         self.availableRackUnits = availableRackUnits
         self.availableWatts = availableWatts
         self.networkCost = networkCost
         self.costPerMonth = costPerMonth
         self.timeHorizonYears = timeHorizonYears
-        self.useVar = model.addVar(vtype=GRB.BINARY, name="rack " + name)
-
-
-def buildVars(m):
-    cpus = [Cpu(m, 6, 1.7, 249, 'E5 - 2603', 15, 85),
-            Cpu(m, 8, 1.7, 369, 'E5 - 2609', 20, 85),
-            Cpu(m, 8, 2.1, 499, 'E5 - 2620', 20, 85),
-            Cpu(m, 10, 2.2, 769, 'E5 - 2630', 25, 85),
-            Cpu(m, 10, 2.4, 1079, 'E5 - 2640', 25, 90),
-            Cpu(m, 12, 2.2, 1299, 'E5 - 2650', 30, 105),
-            Cpu(m, 14, 2, 1599, 'E5 - 2660', 35, 105),
-            Cpu(m, 14, 2.4, 1999, 'E5 - 2680', 35, 120),
-            Cpu(m, 14, 2.6, 2349, 'E5 - 2690', 35, 135),
-            Cpu(m, 10, 1.8, 729, 'E5 - 2630L', 25, 55),
-            Cpu(m, 14, 1.7, 1499, 'E5 - 2650L', 35, 65),
-            Cpu(m, 4, 2.6, 509, 'E5 - 2623', 10, 85),
-            Cpu(m, 4, 3.5, 1149, 'E5 - 2637', 15, 135),
-            Cpu(m, 6, 3.4, 1799, 'E5 - 2643', 20, 135),
-            Cpu(m, 8, 3.2, 2349, 'E5 - 2667', 25, 135),
-            Cpu(m, 16, 2.1, 1999, 'E5 - 2683', 40, 120),
-            Cpu(m, 18, 2.1, 2699, 'E5 - 2695', 45, 120),
-            Cpu(m, 16, 2.6, 3249, 'E5 - 2697A', 40, 145),
-            Cpu(m, 18, 2.3, 2999, 'E5 - 2697', 45, 145),
-            Cpu(m, 20, 2.2, 3599, 'E5 - 2698', 50, 135),
-            Cpu(m, 22, 2.2, 4599, 'E5 - 2699', 55, 145),
-            Cpu(m, 22, 2.4, 5499, 'E5 - 2699A', 55, 145)]
-
-    memory = [#Memory(m, 4, 'Registered', 2400, 69),
-              #Memory(m, 8, 'Registered', 2400, 139),
-              Memory(m, 16, 'Registered', 2400, 229),
-              Memory(m, 32, 'Registered', 2400, 399),
-              Memory(m, 64, 'Registered', 2400, 929),
-              Memory(m, 32, 'Load - Reduced', 2400, 479),
-              Memory(m, 64, 'Load - Reduced', 2400, 999)]
-
-    disk25 = [Disk(m, 5, 2.5, 213, 90, sata, 6, 'Barracuda5TB5400'),
-              Disk(m, .3, 2.5, 189, 166, sas, 12, '0B28810'),
-              Disk(m, .6, 2.5, 239, 166, sas, 12, '0B28808'),
-              Disk(m, .9, 2.5, 309, 166, sas, 12, '0B27976'),
-              Disk(m, 1.2, 2.5, 339, 166, sas, 12, '0B28807'),
-              Disk(m, .3, 2.5, 269, 250, sas, 12, '0B28955'),
-              Disk(m, .6, 2.5, 399, 250, sas, 12, '0B28953'),
-              Disk(m, 1, 2.5, 209, 120, sata, 6, 'ST1000NX0313'),
-              Disk(m, 2, 2.5, 349, 120, sata, 6, 'ST2000NX0253'),
-              Disk(m, 1, 2.5, 229, 120, sas, 12, 'ST1000NX0333'),
-              Disk(m, 2, 2.5, 389, 120, sas, 12, 'ST2000NX0273'),
-              Disk(m, .6, 2.5, 189, 166, sas, 12, 'ST600MM0018'),
-              Disk(m, .9, 2.5, 299, 166, sas, 12, 'ST900MM0018'),
-              Disk(m, 1.2, 2.5, 339, 166, sas, 12, 'ST1200MM0018'),
-              Disk(m, 1.8, 2.5, 439, 166, sas, 12, 'ST1800MM0018'),
-              Disk(m, .3, 2.5, 249, 250, sas, 12, 'ST300MP0005'),
-              Disk(m, .6, 2.5, 359, 250, sas, 12, 'ST600MP0005'),
-              Disk(m, .24, 2.5, 149, 5000, sata, 6, 'Intel DC S4500 240', ssd),
-              Disk(m, .48, 2.5, 259, 5000, sata, 6, 'Intel DC S4500 480', ssd),
-              Disk(m, .96, 2.5, 489, 5000, sata, 6, 'Intel DC S4500 960', ssd),
-              Disk(m, 1.92, 2.5, 979, 5000, sata, 6, 'Intel DC S4500 1920', ssd),
-              Disk(m, 3.84, 2.5, 1999, 5000, sata, 6, 'Intel DC S4500 3840', ssd),
-              Disk(m, .24, 2.5, 199, 5000, sata, 6, 'Intel DC S4600 240', ssd),
-              Disk(m, .48, 2.5, 329, 5000, sata, 6, 'Intel DC S4600 480', ssd),
-              Disk(m, .96, 2.5, 629, 5000, sata, 6, 'Intel DC S4600 960', ssd),
-              Disk(m, 1.92, 2.5, 1259, 5000, sata, 6, 'Intel DC S4600 1920', ssd),
-              Disk(m, .48, 2.5, 279, 5000, sata, 6, 'Micron M5100 ECO 480', ssd),
-              Disk(m, 0.96, 2.5, 489, 5000, sata, 6, 'Micron M5100 ECO 960', ssd),
-              Disk(m, 1.92, 2.5, 769, 5000, sata, 6, 'Micron M5100 ECO 1920', ssd),
-              Disk(m, 3.84, 2.5, 1459, 5000, sata, 6, 'Micron M5100 ECO 3840', ssd),
-              Disk(m, 7.68, 2.5, 2959, 5000, sata, 6, 'Micron M5100 ECO 7680', ssd),
-              Disk(m, 0.24, 2.5, 159, 5000, sata, 6, 'Micron M5100 PRO 240', ssd),
-              Disk(m, .48, 2.5, 289, 5000, sata, 6, 'Micron M5100 PRO 480', ssd),
-              Disk(m, 0.96, 2.5, 499, 5000, sata, 6, 'Micron M5100 PRO 960', ssd),
-              Disk(m, 1.92, 2.5, 899, 5000, sata, 6, 'Micron M5100 PRO 1920', ssd),
-              Disk(m, 3.84, 2.5, 1719, 5000, sata, 6, 'Micron M5100 PRO 3840', ssd),
-              Disk(m, 0.24, 2.5, 199, 5000, sata, 6, 'Micron M5100 MAX 240', ssd),
-              Disk(m, .48, 2.5, 339, 5000, sata, 6, 'Micron M5100 MAX 480', ssd),
-              Disk(m, 0.96, 2.5, 619, 5000, sata, 6, 'Micron M5100 MAX 960', ssd),
-              Disk(m, 1.92, 2.5, 1179, 5000, sata, 6, 'Micron M5100 MAX 1920', ssd),
-             ]
-
-    disk35 = [Disk(m, 2, 3.5, 149, 120, sata, 6, '0F23092'),
-              Disk(m, 4, 3.5, 199, 120, sata, 6, '0F23090'),
-              Disk(m, 6, 3.5, 239, 120, sata, 6, '0F23001'),
-              Disk(m, 8, 3.5, 339, 120, sata, 6, '0F23267'),
-              Disk(m, 10, 3.5, 399, 120, sata, 6, '0F27604'),
-              Disk(m, 12, 3.5, 589, 120, sata, 6, '0F30144'),
-              Disk(m, 2, 3.5, 179, 120, sas, 12, '0F22799'),
-              Disk(m, 4, 3.5, 219, 120, sas, 12, '0F22795'),
-              Disk(m, 6, 3.5, 259, 120, sas, 12, '0F22791'),
-              Disk(m, 8, 3.5, 369, 120, sas, 12, '0F23268'),
-              Disk(m, 10, 3.5, 429, 120, sas, 12, '0F27352'),
-              Disk(m, 12, 3.5, 609, 120, sas, 12, '0F27352'),
-              Disk(m, 1, 3.5, 119, 120, sata, 6, 'ST1000NM0055'),
-              Disk(m, 2, 3.5, 139, 120, sata, 6, 'ST2000NM0055'),
-              Disk(m, 4, 3.5, 209, 120, sata, 6, 'ST4000NM0035'),
-              Disk(m, 6, 3.5, 269, 120, sata, 6, 'ST6000NM0115'),
-              Disk(m, 8, 3.5, 339, 120, sata, 6, 'ST8000NM0055'),
-              Disk(m, 10, 3.5, 439, 120, sata, 6, 'ST10000NM0086'),
-              Disk(m, 12, 3.5, 569, 120, sata, 6, 'ST12000NM0007'),
-              Disk(m, 1, 3.5, 139, 120, sas, 12, 'ST1000NM0045'),
-              Disk(m, 2, 3.5, 169, 120, sas, 12, 'ST2000NM0045'),
-              Disk(m, 4, 3.5, 219, 120, sas, 12, 'ST4000NM0025'),
-              Disk(m, 6, 3.5, 259, 120, sas, 12, 'ST6000NM0095'),
-              Disk(m, 8, 3.5, 329, 120, sas, 12, 'ST8000NM0075'),
-              Disk(m, 10, 3.5, 449, 120, sas, 12, 'ST10000NM0096'),
-              Disk(m, 12, 3.5, 529, 120, sas, 12, 'ST12000NM0027'),
-              Disk(m, 1, 3.5, 209, 120, sata, 6, 'ST1000NX0313'),
-              Disk(m, 2, 3.5, 349, 120, sata, 6, 'ST2000NX0253'),
-             ]
-
-    diskNvme = [Disk(m, 2, 1.5, 1149, 20000, nvme, 24, 'Intel P3520 NVMe', nvme),
-            Disk(m, 4, 1.5, 2799, 20000, nvme, 24, 'Intel P4500 NVMe', nvme),
-            Disk(m, 2, 1.5, 1952, 20000, nvme, 24, 'Intel P4600 NVMe 2TB', nvme),
-            Disk(m, 4, 1.5, 3590, 20000, nvme, 24, 'Intel P4600 NVMe 4TB', nvme),
-            Disk(m, .375, 1.5, 1851, 20000, nvme, 24, 'Intel P4800X 375', nvme),
-            Disk(m, .75, 1.5, 3653, 20000, nvme, 24, 'Intel P4800X 750', nvme)]
-
-    siom = [Network(m, 62, 1, rj45, 2, supermicro),
-            Network(m, 100, 1, rj45, 4, supermicro),
-            Network(m, 188, 10, sfpplus, 2, supermicro),
-            Network(m, 289, 10, sfpplus, 4, supermicro),
-            Network(m, 201, 10, rj45, 2, supermicro),
-            Network(m, 352, 10, rj45, 4, supermicro),
-            Network(m, 327, 25, sfp28, 2, supermicro),
-            Network(m, 770, 56, qsfp, 1, supermicro),
-            Network(m, 1007, 56, qsfp, 2, supermicro)]
-
-    pciNetwork = [# Network(m, 156, 1, rj45, 2, intel),
-                  # Network(m, 365, 1, rj45, 4, intel),
-                  # Network(m, 377, 10, sfpplus, 2, intel),
-                  # Network(m, 478, 10, "LC", 1, intel),
-                  # Network(m, 577, 10, "LC", 2, intel),
-                  # Network(m, 415, 10, rj45, 1, intel),
-                  # Network(m, 629, 10, rj45, 2, intel),
-                  # Network(m, 365, 10, rj45, 1, intel),
-                  # Network(m, 428, 10, rj45, 2, intel),
-                  # Network(m, 365, 10, sfpplus, 2, intel),
-                  # Network(m, 491, 10, sfpplus, 4, intel),
-                  # Network(m, 743, 10, rj45, 4, intel),
-                  # Network(m, 478, 40, qsfpplus, 1, intel),
-                  # Network(m, 528, 40, qsfpplus, 2, intel),
-                  # Network(m, 226, 10, sfpplus, 1, mellanox),
-                  # Network(m, 289, 10, sfpplus, 2, mellanox),
-                  # Network(m, 453, 56, qsfp, 1, mellanox),
-                  # Network(m, 566, 56, qsfp, 2, mellanox),
-                  # Network(m, 226, 10, sfp28, 1, mellanox),
-                  # Network(m, 289, 10, sfp28, 2, mellanox),
-                  # Network(m, 276, 25, sfp28, 1, mellanox),
-                  # Network(m, 352, 25, sfp28, 2, mellanox),
-                  # Network(m, 440, 40, qsfp28, 1, mellanox),
-                  # Network(m, 503, 50, qsfp28, 1, mellanox),
-                  # Network(m, 453, 56, qsfp28, 1, mellanox),
-                  # Network(m, 566, 56, qsfp28, 2, mellanox),
-                  # Network(m, 503, 50, qsfp28, 1, mellanox),
-                  Network(m, 617, 50, qsfp28, 2, mellanox),
-                  # Network(m, 843, 100, qsfp28, 1, mellanox),
-                  Network(m, 1007, 100, qsfp28, 2, mellanox),
-                  # Ignoring last 4 inifiniband network cards
-                  ]
-
-    servers = [
-               Server(m, "24x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6028r-e1cr24n", 3705, 1600, 2, 2, 24, 8, 0, 24, 0, 0, 12, 2, domssd, 2, 1, 0, 1, 2, 1),
-               Server(m, "16x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6028r-e1cr16t", 2391, 1000, 2, 2, 16, 8, 0, 16, 0, 0, 0, 2, domssd, 1, 6, 2, 0, 2, 1),
-               #Server(m, "16x3.5 3U", "https://www.thinkmate.com/product/supermicro/ssg-6038r-e1cr16h", 2437, 920, 3, 2, 16, 8, 0, 16, 0, 0, 0, 2, domssd, 1, 6, 2, 0, 2, 1),
-               Server(m, "90x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6048r-e1cr90l", 8774, 1000, 4, 2, 8, 8, 0, 90, 0, 0, 45, 2, domssd, 0, 0, 4, 1, 2, 1),
-               Server(m, "72x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6048r-e1cr72l", 8689, 2000, 4, 2, 16, 8, 0, 72, 0, 0, 36, 2, domssd, 1, 3, 2, 0, 2, 1),
-               Server(m, "60x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6048r-e1cr60n", 5353, 2000, 4, 2, 24, 8, 0, 60, 6, 0, 30, 2, dom, 2, 1, 0, 1, 2, 1),
-               #Server(m, "36x3.5", "https://www.thinkmate.com/product/supermicro/ssg-6048r-e1cr36n", 3480, 1280, 4, 2, 24, 8, 0, 36, 0, 0, 0, 2, dom, 1, 6, 4, 0, 2, 1),
-               #Server(m, "24x3.5 4U", "https://www.thinkmate.com/product/supermicro/ssg-6048r-e1cr24n", 2892, 920, 4, 2, 24, 8, 0, 24, 0, 0, 0, 2, domssd, 1, 3, 4, 0, 2, 1),
-               #Server(m, "12x3.5", "https://www.thinkmate.com/product/supermicro/sys-6028r-tdwnr", 1623, 920, 2, 2, 16, 8, 0, 12, 0, 0, 0, 2, dom, 0, 4, 2, 0, 2, 1),
-               Server(m, "48x2.5", "https://www.thinkmate.com/product/supermicro/ssg-2028r-e1cr48n", 4146, 1600, 2, 2, 24, 8, 48, 0, 0, 24, 0, 2, domssd, 2, 1, 2, 1, 2, 1),
-               Server(m, "24x2.5", "https://www.thinkmate.com/product/supermicro/ssg-2028r-e1cr24h", 2441, 920, 2, 2, 16, 8, 24, 0, 0, 0, 0, 2, domssd, 1, 6, 2, 0, 2, 1),
-               Server(m, "24x2.5 4 Node", "https://www.thinkmate.com/product/supermicro/sys-2028tp-hc1r-siom", 4685, 2000, 2, 2, 16, 8, 6, 0, 0, 1, 0, 1, dom, 1, 1, 0, 1, 2, 4),
-               #Server(m, "8x2.5 2 Node", "https://www.thinkmate.com/product/supermicro/sys-1028tp-dc1tr", 2718, 1000, 1, 2, 16, 8, 4, 0, 0, 0, 0, 1, dom, 1, 0, 2, 0, 2, 2),
-               Server(m, "24x2.5 2 Node", "https://www.thinkmate.com/product/supermicro/sys-2028tp-dc1tr", 2989, 1280, 2, 2, 16, 8, 12, 0, 0, 0, 0, 1, dom, 1, 1, 2, 0, 2, 2),
-               #Server(m, "16x2.5 2 Node", "https://www.thinkmate.com/product/supermicro/sys-2028tp-dttr", 2632, 1280, 2, 2, 16, 8, 8, 0, 0, 0, 0, 1, dom, 1, 1, 2, 0, 2, 2),
-               ]
-
-    racks = [Rack(m, "1", 32, availableWattsPerRack, 35000, rackCostPerMonth, serverCostTimeHorizonYears),
-             Rack(m, "2", 32, availableWattsPerRack, 35000, rackCostPerMonth, serverCostTimeHorizonYears),
-             Rack(m, "3", 36, availableWattsPerRack, 20000, rackCostPerMonth, serverCostTimeHorizonYears),]
+        self.useVar = None
+
+    def __str__(self):
+        return self.name
+
+
+defaultBigM = 10000
+
+
+class MatrixBuilder:
+    # Columns are laid out as [count vars | use vars | rack vars]. Each group of components
+    # gets a contiguous block in the count and use sections, aggregates are 1 x n sparse rows
+    # over those columns and every row is added to the model with a single addMConstr call.
+
+    def __init__(self, model, groups, racks, bounds=None, linking="bigM"):
+        self.layout(model, groups, racks, linking)
+        n = self.n
+
+        ub, bigM = self.boundArrays(bounds)
+        self.count = model.addMVar(n, lb=0, ub=ub, vtype=GRB.INTEGER)
+        self.use = model.addMVar(n, vtype=GRB.BINARY)
+        self.rack = model.addMVar(len(racks), vtype=GRB.BINARY)
+        self.bindVars(self.count.tolist() + self.use.tolist() + self.rack.tolist())
+        model.setAttr("VarName", self.vars, self.varNames)
+
+        # BuildProfile timing the sections of the model, if any
+        self.profile = None
+        self.rows = []
+        self.senses = []
+        self.rhs = []
+        self.names = []
+        self.constrs = {}
+        self.linkConstrs = []
+        linkNames = [c.distinctName + " " + c.baseVarName for c in self.components]
+        if linking == "indicator":
+            # useVar == 0 -> countVar <= 0
+            for countVar, useVar, name in zip(self.vars[:n], self.vars[n:2 * n], linkNames):
+                self.linkConstrs.append(model.addGenConstrIndicator(useVar, False, countVar, GRB.LESS_EQUAL, 0, name))
+        elif linking == "bigM":
+            # countVar - bigM * useVar <= 0 for every component
+            self.addRows(sp.hstack([sp.identity(n, format="csr"), sp.diags(-bigM, format="csr"), sp.csr_matrix((n, len(racks)))], format="csr"),
+                         GRB.LESS_EQUAL, np.zeros(n), linkNames)
+        else:
+            raise ValueError("unknown linking constraints " + str(linking))
+
+    @classmethod
+    def load(cls, model, groups, racks, linking="bigM"):
+        # Builder of a model read back from a compiled model (see compiledIlp()): the model
+        # already has every variable and row, in the order __init__() and emit() add them
+        b = cls.__new__(cls)
+        b.layout(model, groups, racks, linking)
+        vars = model.getVars()
+        b.count = gp.MVar.fromlist(vars[:b.n])
+        b.use = gp.MVar.fromlist(vars[b.n:2 * b.n])
+        b.rack = gp.MVar.fromlist(vars[2 * b.n:])
+        b.bindVars(vars)
+        b.profile = None
+        constrs = model.getConstrs()
+        b.rows = []
+        b.senses = model.getAttr("Sense", constrs)
+        b.rhs = model.getAttr("RHS", constrs)
+        b.names = model.getAttr("ConstrName", constrs)
+        b.constrs = dict(zip(b.names, constrs))
+        b.linkConstrs = constrs[:b.n] if linking == "bigM" else model.getGenConstrs()
+        return b
+
+    def layout(self, model, groups, racks, linking):
+        # Column blocks of the groups: [count vars | use vars | rack vars]
+        self.model = model
+        self.linking = linking
+        self.groups = groups
+        self.racks = racks
+        self.components = []
+        self.start = {}
+        for group, components in groups.items():
+            self.start[group] = len(self.components)
+            self.components.extend(components)
+        self.n = len(self.components)
+        self.size = 2 * self.n + len(racks)
+        self.arrays = {}
+
+    def bindVars(self, vars):
+        n = self.n
+        self.vars = vars
+        names = [c.baseVarName for c in self.components]
+        self.varNames = names + ["use " + name for name in names] + ["rack " + rack.name for rack in self.racks]
+        for component, countVar, useVar in zip(self.components, vars[:n], vars[n:2 * n]):
+            component.countVar = countVar
+            component.useVar = useVar
+        for rack, useVar in zip(self.racks, vars[2 * n:]):
+            rack.useVar = useVar
+
+    def boundArrays(self, bounds):
+        # Per component upper bound on countVar and the matching big-M coefficient. Groups
+        # without a bound keep an unbounded countVar and the default coefficient.
+        ub = np.full(self.n, float("inf"))
+        bigM = np.full(self.n, float(defaultBigM))
+        for group, components in self.groups.items():
+            bound = (bounds or {}).get(group)
+            if bound is not None:
+                start = self.start[group]
+                ub[start:start + len(components)] = bound
+                bigM[start:start + len(components)] = bound
+        return ub, bigM
+
+    def setCountBounds(self, bounds):
+        ub, bigM = self.boundArrays(bounds)
+        self.model.setAttr("UB", self.vars[:self.n], ub.tolist())
+        if self.linking == "bigM":
+            for constr, useVar, coef in zip(self.linkConstrs, self.vars[self.n:2 * self.n], bigM):
+                self.model.chgCoeff(constr, useVar, -coef)
+
+    def values(self, groups, attr):
+        if isinstance(groups, str):
+            groups = [groups]
+        arrays = []
+        for group in groups:
+            key = (group, attr)
+            if key not in self.arrays:
+                get = attr if callable(attr) else operator.attrgetter(attr)
+                self.arrays[key] = np.array([get(c) for c in self.groups[group]], dtype=float)
+            arrays.append(self.arrays[key])
+        return np.concatenate(arrays) if arrays else np.zeros(0)
+
+    def rackValues(self, attr):
+        return np.array([getattr(rack, attr) for rack in self.racks], dtype=float)
+
+    def columns(self, groups):
+        if isinstance(groups, str):
+            groups = [groups]
+        return np.concatenate([np.arange(self.start[g], self.start[g] + len(self.groups[g])) for g in groups] + [np.zeros(0, dtype=int)])
+
+    def row(self, columns, coefs):
+        data = np.broadcast_to(np.asarray(coefs, dtype=float), columns.shape)
+        return sp.csr_matrix((data, (np.zeros(len(columns), dtype=int), columns)), shape=(1, self.size))
+
+    def countExpr(self, groups, coefs=1.0):
+        return self.row(self.columns(groups), coefs)
+
+    def useExpr(self, groups, coefs=1.0):
+        return self.row(self.columns(groups) + self.n, coefs)
+
+    def rackExpr(self, coefs=1.0):
+        return self.row(2 * self.n + np.arange(len(self.racks)), coefs)
+
+    def addRows(self, rows, sense, rhs, names):
+        self.rows.append(rows)
+        self.senses.extend([sense] * rows.shape[0])
+        self.rhs.extend(rhs)
+        self.names.extend(names)
+
+    def addConstr(self, expr, sense, rhs, name):
+        self.addRows(expr, sense, [rhs], [name])
+
+    def linExpr(self, expr):
+        expr = expr.tocsr()
+        expr.sum_duplicates()
+        return gp.LinExpr(expr.data.tolist(), [self.vars[j] for j in expr.indices])
+
+    def section(self, name):
+        if self.profile is not None:
+            self.profile.section(name, self)
+
+    def emit(self):
+        self.section(None)
+        if self.profile is not None:
+            self.profile.mark("emit")
+        A = sp.vstack(self.rows, format="csr")
+        A.eliminate_zeros()
+        constrs = self.model.addMConstr(A, self.vars, np.array(self.senses), np.array(self.rhs, dtype=float)).tolist()
+        self.model.setAttr("ConstrName", constrs, self.names)
+        if self.linking == "bigM":
+            self.linkConstrs = constrs[:self.n]
+        self.constrs = dict(zip(self.names, constrs))
+        return self.constrs
+
+
+def buildVars(catalog=None, inputs=None):
+    if catalog is None:
+        catalog = loadCatalog()
+    p = inputs or currentInputs()
+    cpus = [Cpu(**row) for row in catalog.rows("cpus")]
+    memory = [Memory(**row) for row in catalog.rows("memory")]
+    disk25 = [Disk(**row) for row in catalog.rows("disk25")]
+    disk35 = [Disk(**row) for row in catalog.rows("disk35")]
+    diskNvme = [Disk(**row) for row in catalog.rows("diskNvme")]
+    siom = [Network(**row) for row in catalog.rows("siom")]
+    pciNetwork = [Network(**row) for row in catalog.rows("pciNetwork")]
+    servers = [Server(**row) for row in catalog.rows("servers")]
+
+    racks = [Rack("1", 32, p["availableWattsPerRack"], 35000, p["rackCostPerMonth"], p["serverCostTimeHorizonYears"]),
+             Rack("2", 32, p["availableWattsPerRack"], 35000, p["rackCostPerMonth"], p["serverCostTimeHorizonYears"]),
+             Rack("3", 36, p["availableWattsPerRack"], 20000, p["rackCostPerMonth"], p["serverCostTimeHorizonYears"]),]
 
     return cpus, memory, disk25, disk35, diskNvme, siom, pciNetwork, servers, racks
 
 
-def ilp():
-    m = Model("ILP")
-    cpus, memory, disk25, disk35, diskNvme, siom, pciNetwork, servers, racks = buildVars(m)
+def buildGroups(catalog, inputs=None, prices=None):
+    # prices: {identifier: cost} replacing catalog prices, see setPrice()
+    cpus, memory, disk25, disk35, diskNvme, siom, pciNetwork, servers, racks = buildVars(catalog, inputs)
+    groups = {"servers": servers, "cpus": cpus, "memory": memory,
+              "disk25": disk25, "disk35": disk35, "diskNvme": diskNvme,
+              "siom": siom, "pciNetwork": pciNetwork}
+    for components in groups.values():
+        for component in components:
+            if component.identifier in (prices or {}):
+                setPrice(component, prices[component.identifier])
+    return groups, racks
 
-    cost = LinExpr()
 
+def setPrice(component, cost):
+    # Servers also recompute configuredCost, the coefficient the models use
+    if isinstance(component, Server):
+        component.setCost(cost)
+    else:
+        component.cost = cost
+
+
+def buildMatrix(m, catalog=None, inputs=None, prune=False, tighten=False, linking="bigM", server=None, prices=None):
+    # server: name of the only server type to offer, see serverGroups()
+    catalog = catalog or loadCatalog()
+    groups, racks = buildGroups(catalog, inputs, prices)
+    groups, merged, conflicts = mergeDuplicates(groups)
+    if server is not None:
+        groups = serverGroups(groups, server, inputs or currentInputs())
+    pruned = []
+    if prune:
+        groups, pruned = removeDominated(groups, inputs or currentInputs())
+    bounds = countBounds(groups, inputs or currentInputs()) if tighten else None
+    b = MatrixBuilder(m, groups, racks, bounds, linking)
+    b.catalogKey = catalog.key
+    b.merged = merged
+    b.conflicts = conflicts
+    b.pruned = pruned
+    return b
+
+
+##### Presolve #####
+
+def serverGroups(groups, name, p):
+    # The groups for a model that may only buy server name. Components that server has no
+    # slots for can only have a count of 0 with it, so they are left out.
+    server = [s for s in groups["servers"] if s.name == name]
+    if not server:
+        raise ValueError("unknown server " + name)
+    server = server[0]
+    groups = dict(groups, servers=[server])
+    for group, slots in [("memory", server.memorySlots),
+                         ("disk25", server.disk25Slots),
+                         ("disk35", server.disk35Slots),
+                         ("siom", server.siomCards * p["allowSiomCards"]),
+                         ("pciNetwork", server.pcieV3X16Slots + server.pcieV3X8Slots)]:
+        if slots == 0:
+            groups[group] = []
+    return groups
+
+
+def modelKey(component):
+    return tuple(getattr(component, attr) for attr in component.modelAttributes)
+
+
+def mergeDuplicates(groups):
+    # Entries of a group the models cannot tell apart are symmetric; keep the first one (with
+    # the others as aliases) so the solver does not branch between equivalent columns. Also
+    # returns the same part listed with different specs or in several groups, which needs a
+    # catalog fix rather than a merge.
+    kept = {}
+    merged = []
+    for group, components in groups.items():
+        first = {}
+        kept[group] = []
+        for component in components:
+            key = modelKey(component)
+            if key in first:
+                first[key].aliases.append(component)
+                merged.append((group, component, first[key]))
+            else:
+                first[key] = component
+                kept[group].append(component)
+    listings = {}
+    for group, components in groups.items():
+        for component in components:
+            listings.setdefault((type(component).__name__, component.identifier), []).append((group, component))
+    conflicts = []
+    for (kind, identifier), entries in listings.items():
+        if len(set(group for group, c in entries)) > 1 or len(set(modelKey(c) for group, c in entries)) > 1:
+            conflicts.append((identifier, entries))
+    return kept, merged, conflicts
+
+
+def printPresolve(b):
+    for identifier, entries in b.conflicts:
+        print ("catalog conflict", identifier, ", ".join("{} in {}".format(c.baseVarName, group) for group, c in entries))
+    for group, component, kept in b.merged:
+        print ("merged", component.identifier, "into", kept.identifier)
+    for group, component, dominator in b.pruned:
+        print ("pruned", component.baseVarName, "dominated by", dominator.baseVarName)
+
+
+def rackOrder(b):
+    # Racks with identical attributes are interchangeable: use them in list order
+    previous = {}
+    for k, rack in enumerate(b.racks):
+        key = modelKey(rack)
+        if key in previous:
+            order = np.zeros(len(b.racks))
+            order[k] = 1
+            order[previous[key][0]] = -1
+            b.addConstr(b.rackExpr(order), GRB.LESS_EQUAL, 0, "rack {} after rack {}".format(rack, previous[key][1]))
+        previous[key] = (k, rack)
+
+
+def countBounds(groups, p):
+    # group -> largest count any single entry can have in the ILP, from the slots of the
+    # servers that can be bought and maxServers (e.g. at most 50 x 2 x 4 CPUs). NVMe
+    # disks are not tied to any slots in the ILP so they keep the default big-M.
+    servers = groups["servers"]
+
+    def mostSlots(slots):
+        return p["maxServers"] * max([slots(server) * server.nodes for server in servers] or [0])
+
+    networkCards = min(mostSlots(lambda server: p["maxNetworkCardsPerServer"]), p["maxNetworkConnections"])
+    siomCards = mostSlots(lambda server: server.siomCards) if p["allowSiomCards"] else 0
+    return {"servers": p["maxServers"],
+            "cpus": mostSlots(lambda server: server.cpuSlots),
+            "memory": mostSlots(lambda server: server.memorySlots),
+            "disk25": mostSlots(lambda server: server.disk25Slots),
+            "disk35": mostSlots(lambda server: server.disk35Slots),
+            "siom": min(networkCards, siomCards),
+            "pciNetwork": min(networkCards, mostSlots(lambda server: server.pcieV3X16Slots + server.pcieV3X8Slots))}
+
+
+dominanceAttributes = {"tb": lambda disk: disk.tb,
+                       "iops": lambda disk: disk.iops,
+                       "streamMBs": lambda disk: disk.streamMBs,
+                       "isHdd": lambda disk: disk.type == hdd,
+                       "cores": lambda cpu: cpu.cores,
+                       "gigaflops": lambda cpu: cpu.cores * cpu.ghz,
+                       "memoryGB": lambda mem: mem.memoryGB,
+                       "networkSpeed": lambda network: network.speedGbit * network.adapterCount,
+                       "networkConnections": lambda network: network.adapterCount}
+
+
+def dominanceRules(p):
+    # group -> (attributes where more is never worse, attributes that must match) for the
+    # rows that are active with inputs p. Components only interact with the model through
+    # these attributes, their cost and one slot per unit, so within a group an entry that is
+    # no worse on all of them and no more expensive can replace another one for one.
+    splitHdd = any(p[name] > 0 for name in ["minDiskHddTB", "minDiskHddIOPS", "minDiskFastTB", "minDiskFastIOPS"])
+    disk = []
+    if p["minDiskTB"] > 0 or p["minDiskHddTB"] > 0 or p["minDiskFastTB"] > 0:
+        disk.append("tb")
+    if p["minDiskIOPS"] > 0 or p["minDiskHddIOPS"] > 0 or p["minDiskFastIOPS"] > 0:
+        disk.append("iops")
+    if p["minDiskStreamMBs"] > 0:
+        disk.append("streamMBs")
+    cpu = []
+    if p["minCores"] > 0:
+        cpu.append("cores")
+    if p["minGigaflops"] > 0:
+        cpu.append("gigaflops")
+    network = []
+    if p["minTotalNetworkSpeedGigabits"] > 0:
+        network.append("networkSpeed")
+    if p["minNetworkConnectionsPerNode"] > 0:
+        network.append("networkConnections")
+    diskRule = (tuple(disk), ("isHdd",) if splitHdd else ())
+    # memoryGB is bounded from both sides (minMemory and maxAvgMemoryPerNode)
+    return {"cpus": (tuple(cpu), ()),
+            "memory": ((), ("memoryGB",)),
+            "disk25": diskRule,
+            "disk35": diskRule,
+            "diskNvme": diskRule,
+            "siom": (tuple(network), ()),
+            "pciNetwork": (tuple(network), ())}
+
+
+def removeDominated(groups, p, rules=None):
+    # Returns the groups without dominated entries and [(group, removed, dominatedBy)].
+    # Ties keep the first entry in catalog order.
+    rules = rules or dominanceRules(p)
+    kept = {}
+    removed = []
+    for group, components in groups.items():
+        if group not in rules or not components:
+            kept[group] = components
+            continue
+        better, equal = rules[group]
+        n = len(components)
+        cost = np.array([c.cost for c in components], dtype=float)
+        B = np.array([[dominanceAttributes[a](c) for a in better] for c in components], dtype=float).reshape(n, len(better))
+        E = np.array([[dominanceAttributes[a](c) for a in equal] for c in components], dtype=float).reshape(n, len(equal))
+        order = np.arange(n)
+        dominators = []
+        for j in range(n):
+            noWorse = (cost <= cost[j]) & (B >= B[j]).all(axis=1) & (E == E[j]).all(axis=1)
+            strictly = (cost < cost[j]) | (B > B[j]).any(axis=1) | (order < j)
+            dominators.append(np.flatnonzero(noWorse & strictly))
+        keep = np.array([len(d) == 0 for d in dominators])
+        for j in np.flatnonzero(~keep):
+            # Dominance is transitive, so some undominated entry dominates j as well
+            removed.append((group, components[j], components[dominators[j][keep[dominators[j]]][0]]))
+        kept[group] = [c for c, k in zip(components, keep) if k]
+    return kept, removed
+
+
+allDisks = ["disk25", "disk35", "diskNvme"]
+networks = ["siom", "pciNetwork"]
+
+
+def serverRows(b):
+    # Per server aggregates shared by ilp() and goalProgramming()
+    nodes = b.values("servers", "nodes")
+    rows = {"serverCount": b.countExpr("servers"),
+            "nodeCount": b.countExpr("servers", nodes),
+            "serverTypes": b.useExpr("servers"),
+            "rackUnits": b.countExpr("servers", b.values("servers", "rackUnits")),
+            "watts": b.countExpr("servers", b.values("servers", "watts")),
+            "cost": b.countExpr("servers", b.values("servers", "configuredCost"))}
+    for name, attr in [("serverCpuSlots", "cpuSlots"),
+                       ("serverMemorySlots", "memorySlots"),
+                       ("serverMinMemorySlots", "minMemorySlots"),
+                       ("server25DiskSlots", "disk25Slots"),
+                       ("min25Disks", "minimum25Disks"),
+                       ("server35DiskSlots", "disk35Slots"),
+                       ("min35Disks", "minimum35Disks"),
+                       ("serverNvmeSlots", "nvmeSlots"),
+                       ("maxSiomCards", "siomCards")]:
+        rows[name] = b.countExpr("servers", b.values("servers", attr) * nodes)
+    pcieSlots = b.values("servers", "pcieV3X16Slots") + b.values("servers", "pcieV3X8Slots")
+    rows["maxPciNetworkCards"] = b.countExpr("servers", pcieSlots * nodes)
+    return rows
+
+
+def rackCosts(b, scalingFactor):
+    cost = b.rackValues("networkCost") + b.rackValues("costPerMonth") * 12 * b.rackValues("timeHorizonYears")
+    return b.rackExpr(scalingFactor * cost)
+
+
+def buildIlp(b, p):
     ##### Server #####
-    serverCount = LinExpr()
-    nodeCount = LinExpr()
-    serverTypes = LinExpr()
-    rackUnits = LinExpr()
-    watts = LinExpr()
-    serverCpuSlots = LinExpr()
-    serverMemorySlots = LinExpr()
-    serverMinMemorySlots = LinExpr()
-    server25DiskSlots = LinExpr()
-    server35DiskSlots = LinExpr()
-    serverNvmeSlots = LinExpr()
-    min25Disks = LinExpr()
-    min35Disks = LinExpr()
-    maxSiomCards = LinExpr()
-    maxPciNetworkCards = LinExpr()
-    for server in servers:
-        serverCount = serverCount + server.countVar
-        nodeCount = nodeCount + server.countVar * server.nodes
-        serverTypes = serverTypes + server.useVar
-        rackUnits = rackUnits + server.countVar * server.rackUnits
-        watts = watts + server.countVar * server.watts
-        cost = cost + server.countVar * server.configuredCost
-        serverCpuSlots = serverCpuSlots + server.countVar * (server.cpuSlots * server.nodes)
-        serverMemorySlots = serverMemorySlots + server.countVar * (server.memorySlots * server.nodes)
-        serverMinMemorySlots = serverMinMemorySlots + server.countVar * (server.minMemorySlots * server.nodes)
-        server25DiskSlots = server25DiskSlots + server.countVar * (server.disk25Slots * server.nodes)
-        min25Disks = min25Disks + server.countVar * (server.minimum25Disks * server.nodes)
-        server35DiskSlots = server35DiskSlots + server.countVar * (server.disk35Slots * server.nodes)
-        min35Disks = min35Disks + server.countVar * (server.minimum35Disks * server.nodes)
-        serverNvmeSlots = serverNvmeSlots + server.countVar * (server.nvmeSlots * server.nodes)
-        maxSiomCards = maxSiomCards + server.countVar * (server.siomCards * server.nodes)
-        maxPciNetworkCards = maxPciNetworkCards + server.countVar * ((server.pcieV3X16Slots + server.pcieV3X8Slots) * server.nodes)
-
-    m.addConstr(serverCount, GRB.GREATER_EQUAL, minServers, "minServers")
-    m.addConstr(serverCount, GRB.LESS_EQUAL, maxServers, "maxServers")
-    m.addConstr(serverTypes, GRB.LESS_EQUAL, maxDistinctServerTypes, "maxDistinctServerTypes")
+    b.section("Server")
+    s = serverRows(b)
+    cost = s["cost"]
+
+    b.addConstr(s["serverCount"], GRB.GREATER_EQUAL, p["minServers"], "minServers")
+    b.addConstr(s["serverCount"], GRB.LESS_EQUAL, p["maxServers"], "maxServers")
+    b.addConstr(s["serverTypes"], GRB.LESS_EQUAL, p["maxDistinctServerTypes"], "maxDistinctServerTypes")
 
     ##### Racks #####
+    b.section("Racks")
 
-    maxRackUnits = LinExpr()
-    maxWatts = LinExpr()
-    previousRack = None
-    for rack in racks:
-        if previousRack != None:
-            m.addConstr(rack.useVar, GRB.LESS_EQUAL, previousRack.useVar, "rack {} after rack {}".format(rack, previousRack))
-        previousRack = rack
-        maxRackUnits = maxRackUnits + rack.useVar * rack.availableRackUnits
-        maxWatts = maxWatts + rack.useVar * rack.availableWatts
-        cost = cost + rack.useVar * rackCostScalingFactor * (rack.networkCost + (rack.costPerMonth * 12 * rack.timeHorizonYears))
+    rackOrder(b)
+    maxRackUnits = b.rackExpr(b.rackValues("availableRackUnits"))
+    maxWatts = b.rackExpr(b.rackValues("availableWatts"))
+    cost = cost + rackCosts(b, p["rackCostScalingFactor"])
 
-    m.addConstr(rackUnits, GRB.LESS_EQUAL, maxRackUnits, "maxRackUnits")
-    m.addConstr(watts, GRB.LESS_EQUAL, maxWatts, "maxWatts")
+    b.addConstr(s["rackUnits"] - maxRackUnits, GRB.LESS_EQUAL, 0, "maxRackUnits")
+    b.addConstr(s["watts"] - maxWatts, GRB.LESS_EQUAL, 0, "maxWatts")
 
     ##### CPU #####
-    cpuTypes = LinExpr()
-    cpuCount = LinExpr()
-    cores = LinExpr()
-    gigaflops = LinExpr()
-    for cpu in cpus:
-        cpuTypes = cpuTypes + cpu.useVar
-        cpuCount = cpuCount + cpu.countVar
-        cores = cores + cpu.countVar * cpu.cores
-        cost = cost + cpu.countVar * cpu.cost
-        gigaflops = gigaflops + cpu.countVar * (cpu.cores * cpu.ghz)
-
-    m.addConstr(cpuTypes, GRB.LESS_EQUAL, maxDistinctCpus, "distinctCpus")
-    m.addConstr(serverCpuSlots, GRB.EQUAL, cpuCount, "fillCpuSlots")
-    m.addConstr(cores, GRB.GREATER_EQUAL, minCores, "minCores")
-    m.addConstr(gigaflops, GRB.GREATER_EQUAL, minGigaflops, "minGigaflops")
+    b.section("CPU")
+    cpuTypes = b.useExpr("cpus")
+    cpuCount = b.countExpr("cpus")
+    cores = b.countExpr("cpus", b.values("cpus", "cores"))
+    gigaflops = b.countExpr("cpus", b.values("cpus", "cores") * b.values("cpus", "ghz"))
+    cost = cost + b.countExpr("cpus", b.values("cpus", "cost"))
+
+    b.addConstr(cpuTypes, GRB.LESS_EQUAL, p["maxDistinctCpus"], "distinctCpus")
+    b.addConstr(s["serverCpuSlots"] - cpuCount, GRB.EQUAL, 0, "fillCpuSlots")
+    b.addConstr(cores, GRB.GREATER_EQUAL, p["minCores"], "minCores")
+    b.addConstr(gigaflops, GRB.GREATER_EQUAL, p["minGigaflops"], "minGigaflops")
 
     ##### Memory #####
-    memoryTypes = LinExpr()
-    memoryGB = LinExpr()
-    memorySlots = LinExpr()
-    for mem in memory:
-        memoryTypes = memoryTypes + mem.useVar
-        memoryGB = memoryGB + mem.countVar * mem.memoryGB
-        memorySlots = memorySlots + mem.countVar
-        cost = cost + mem.countVar * mem.cost
-
-    m.addConstr(memoryTypes, GRB.LESS_EQUAL, maxDistinctMemory, "distinctMemoryTypes")
-    m.addConstr(memoryGB, GRB.GREATER_EQUAL, minMemory, "minMemory")
-    m.addConstr(memorySlots, GRB.LESS_EQUAL, serverMemorySlots, "maxMemorySlotsAvailable")
-    m.addConstr(memorySlots, GRB.GREATER_EQUAL, serverMinMemorySlots, "minMemorySlotsRequiredByServers")
-    m.addConstr(nodeCount * maxAvgMemoryPerNode - memoryGB, GRB.GREATER_EQUAL, 0, "maxAvgMemoryPerNode")
-    m.addConstr(nodeCount * minAvgMemoryPerNode - memoryGB, GRB.LESS_EQUAL, 0, "minAvgMemoryPerNode")
+    b.section("Memory")
+    memoryTypes = b.useExpr("memory")
+    memoryGB = b.countExpr("memory", b.values("memory", "memoryGB"))
+    memorySlots = b.countExpr("memory")
+    cost = cost + b.countExpr("memory", b.values("memory", "cost"))
+
+    b.addConstr(memoryTypes, GRB.LESS_EQUAL, p["maxDistinctMemory"], "distinctMemoryTypes")
+    b.addConstr(memoryGB, GRB.GREATER_EQUAL, p["minMemory"], "minMemory")
+    b.addConstr(memorySlots - s["serverMemorySlots"], GRB.LESS_EQUAL, 0, "maxMemorySlotsAvailable")
+    b.addConstr(memorySlots - s["serverMinMemorySlots"], GRB.GREATER_EQUAL, 0, "minMemorySlotsRequiredByServers")
+    b.addConstr(s["nodeCount"] * p["maxAvgMemoryPerNode"] - memoryGB, GRB.GREATER_EQUAL, 0, "maxAvgMemoryPerNode")
+    b.addConstr(s["nodeCount"] * p["minAvgMemoryPerNode"] - memoryGB, GRB.LESS_EQUAL, 0, "minAvgMemoryPerNode")
 
     ##### Disk #####
-    allDisks = []
-    allDisks.extend(disk25)
-    allDisks.extend(disk35)
-    allDisks.extend(diskNvme)
-
-    diskTypes = LinExpr()
-    diskTypes25 = LinExpr()
-    diskTypes35 = LinExpr()
-    diskTypesNvme = LinExpr()
-    diskTB = LinExpr()
-    diskHddTB = LinExpr()
-    diskFastTB = LinExpr()
-    diskIOPS = LinExpr()
-    diskHddIOPS = LinExpr()
-    diskFastIOPS = LinExpr()
-    diskStreamMBs = LinExpr()
-    disk25Count = LinExpr()
-    disk35Count = LinExpr()
-    diskNvmeCount = LinExpr()
-
-    for disk in disk25:
-        disk25Count = disk25Count + disk.countVar
-        diskTypes25 = diskTypes25 + disk.useVar
-    for disk in disk35:
-        disk35Count = disk35Count + disk.countVar
-        diskTypes35 = diskTypes35 + disk.useVar
-    for disk in diskNvme:
-        diskNvmeCount = diskNvmeCount + disk.countVar
-        diskTypesNvme = diskTypesNvme + disk.useVar
-
-    for disk in allDisks:
-        diskTypes = diskTypes + disk.useVar
-        diskTB = diskTB + disk.countVar * disk.tb
-        diskIOPS = diskIOPS + disk.countVar * disk.iops
-        diskStreamMBs = diskStreamMBs + disk.countVar * disk.streamMBs
-        cost = cost + disk.countVar * disk.cost
-        if disk.type == hdd:
-            diskHddTB = diskHddTB + disk.countVar * disk.tb
-            diskHddIOPS = diskHddIOPS + disk.countVar * disk.iops
-        else:
-            diskFastTB = diskFastTB + disk.countVar * disk.tb
-            diskFastIOPS = diskFastIOPS + disk.countVar * disk.iops
-
-    m.addConstr(diskTypes, GRB.LESS_EQUAL, maxDistinctDisks, "distinctDiskTypes")
-    m.addConstr(diskTypes25, GRB.LESS_EQUAL, maxDistinct25Disks, "maxDistinct25Disks")
-    m.addConstr(diskTypes35, GRB.LESS_EQUAL, maxDistinct35Disks, "maxDistinct35Disks")
-    m.addConstr(diskTypesNvme, GRB.LESS_EQUAL, maxDistinctNvmeDisks, "maxDistinctNvmeDisks")
-    m.addConstr(diskTB, GRB.GREATER_EQUAL, minDiskTB, "minimumTerabytes")
-    m.addConstr(diskHddTB, GRB.GREATER_EQUAL, minDiskHddTB, "minimumHddTB")
-    m.addConstr(diskFastTB, GRB.GREATER_EQUAL, minDiskFastTB, "minimumFastTB")
-    m.addConstr(diskIOPS, GRB.GREATER_EQUAL, minDiskIOPS, "minimumIOPS")
-    m.addConstr(diskHddIOPS, GRB.GREATER_EQUAL, minDiskHddIOPS, "minimumHddIOPS")
-    m.addConstr(diskFastIOPS, GRB.GREATER_EQUAL, minDiskFastIOPS, "minimumFastIOPS")
-    m.addConstr(diskStreamMBs, GRB.GREATER_EQUAL, minDiskStreamMBs, "minimumStreamMBs")
-    m.addConstr(disk25Count + disk35Count + diskNvmeCount, GRB.GREATER_EQUAL, minDiskCount, "minDiskCount")
-    if fillAllDiskSlots:
-        m.addConstr(disk35Count, GRB.EQUAL, server35DiskSlots, "fillAll35DiskSlots")
-        m.addConstr(disk25Count, GRB.EQUAL, server25DiskSlots, "fillAll25DiskSlots")
+    b.section("Disk")
+    isHdd = b.values(allDisks, lambda disk: disk.type == hdd)
+    tb = b.values(allDisks, "tb")
+    iops = b.values(allDisks, "iops")
+
+    diskTypes = b.useExpr(allDisks)
+    diskTypes25 = b.useExpr("disk25")
+    diskTypes35 = b.useExpr("disk35")
+    diskTypesNvme = b.useExpr("diskNvme")
+    diskTB = b.countExpr(allDisks, tb)
+    diskHddTB = b.countExpr(allDisks, tb * isHdd)
+    diskFastTB = b.countExpr(allDisks, tb * (1 - isHdd))
+    diskIOPS = b.countExpr(allDisks, iops)
+    diskHddIOPS = b.countExpr(allDisks, iops * isHdd)
+    diskFastIOPS = b.countExpr(allDisks, iops * (1 - isHdd))
+    diskStreamMBs = b.countExpr(allDisks, b.values(allDisks, "streamMBs"))
+    disk25Count = b.countExpr("disk25")
+    disk35Count = b.countExpr("disk35")
+    diskNvmeCount = b.countExpr("diskNvme")
+    cost = cost + b.countExpr(allDisks, b.values(allDisks, "cost"))
+
+    b.addConstr(diskTypes, GRB.LESS_EQUAL, p["maxDistinctDisks"], "distinctDiskTypes")
+    b.addConstr(diskTypes25, GRB.LESS_EQUAL, p["maxDistinct25Disks"], "maxDistinct25Disks")
+    b.addConstr(diskTypes35, GRB.LESS_EQUAL, p["maxDistinct35Disks"], "maxDistinct35Disks")
+    b.addConstr(diskTypesNvme, GRB.LESS_EQUAL, p["maxDistinctNvmeDisks"], "maxDistinctNvmeDisks")
+    b.addConstr(diskTB, GRB.GREATER_EQUAL, p["minDiskTB"], "minimumTerabytes")
+    b.addConstr(diskHddTB, GRB.GREATER_EQUAL, p["minDiskHddTB"], "minimumHddTB")
+    b.addConstr(diskFastTB, GRB.GREATER_EQUAL, p["minDiskFastTB"], "minimumFastTB")
+    b.addConstr(diskIOPS, GRB.GREATER_EQUAL, p["minDiskIOPS"], "minimumIOPS")
+    b.addConstr(diskHddIOPS, GRB.GREATER_EQUAL, p["minDiskHddIOPS"], "minimumHddIOPS")
+    b.addConstr(diskFastIOPS, GRB.GREATER_EQUAL, p["minDiskFastIOPS"], "minimumFastIOPS")
+    b.addConstr(diskStreamMBs, GRB.GREATER_EQUAL, p["minDiskStreamMBs"], "minimumStreamMBs")
+    b.addConstr(disk25Count + disk35Count + diskNvmeCount, GRB.GREATER_EQUAL, p["minDiskCount"], "minDiskCount")
+    if p["fillAllDiskSlots"]:
+        b.addConstr(disk35Count - s["server35DiskSlots"], GRB.EQUAL, 0, "fillAll35DiskSlots")
+        b.addConstr(disk25Count - s["server25DiskSlots"], GRB.EQUAL, 0, "fillAll25DiskSlots")
     else:
-        m.addConstr(disk35Count, GRB.GREATER_EQUAL, min35Disks, "min35DiskRequirement")
-        m.addConstr(disk35Count, GRB.LESS_EQUAL, server35DiskSlots, "max35DiskSlots")
-        m.addConstr(disk25Count, GRB.GREATER_EQUAL, min25Disks, "min25DiskRequirement")
-        m.addConstr(disk25Count, GRB.LESS_EQUAL, server25DiskSlots, "max25DiskSlots")
+        b.addConstr(disk35Count - s["min35Disks"], GRB.GREATER_EQUAL, 0, "min35DiskRequirement")
+        b.addConstr(disk35Count - s["server35DiskSlots"], GRB.LESS_EQUAL, 0, "max35DiskSlots")
+        b.addConstr(disk25Count - s["min25Disks"], GRB.GREATER_EQUAL, 0, "min25DiskRequirement")
+        b.addConstr(disk25Count - s["server25DiskSlots"], GRB.LESS_EQUAL, 0, "max25DiskSlots")
 
     ##### Network #####
-    networks = []
-    networks.extend(siom)
-    networks.extend(pciNetwork)
-
-    networkSpeed = LinExpr()
-    networkCards = LinExpr()
-    networkConnections = LinExpr()
-    networkTypes = LinExpr()
-    for network in networks:
-        networkSpeed = networkSpeed + network.countVar * (network.speedGbit * network.adapterCount)
-        networkCards = networkCards + network.countVar
-        networkConnections = networkConnections + network.countVar * network.adapterCount
-        networkTypes = networkTypes + network.useVar
-        cost = cost + network.countVar * network.cost
-
-    siomCardCount = LinExpr()
-    for s in siom:
-        siomCardCount = siomCardCount + s.countVar
-
-    pciNetworkCount = LinExpr()
-    for pci in pciNetwork:
-        pciNetworkCount = pciNetworkCount + pci.countVar
-
-    m.addConstr(networkSpeed, GRB.GREATER_EQUAL, minTotalNetworkSpeedGigabits, "minTotalNetworkSpeed")
-    m.addConstr(networkCards, GRB.GREATER_EQUAL, nodeCount * minNetworkCardsPerServer, "minNetworkCardPerNode")
-    m.addConstr(networkCards, GRB.LESS_EQUAL, nodeCount * maxNetworkCardsPerServer, "maxNetworkCardsPerNode")
-    m.addConstr(networkCards, GRB.LESS_EQUAL, maxNetworkConnections, "maxNetworkConnections")
-    m.addConstr(networkConnections, GRB.GREATER_EQUAL, minNetworkConnectionsPerNode * nodeCount, "minNetworkConnections")
-    m.addConstr(siomCardCount, GRB.LESS_EQUAL, maxSiomCards if allowSiomCards else 0, "maxSiomCards")
-    m.addConstr(pciNetworkCount, GRB.LESS_EQUAL, maxPciNetworkCards, "maxPciNetworkCards")
-    m.addConstr(networkTypes, GRB.LESS_EQUAL, maxDistinctNetworkCards, "maxDistinctNetworkCards")
-
+    b.section("Network")
+    adapterCount = b.values(networks, "adapterCount")
+    networkSpeed = b.countExpr(networks, b.values(networks, "speedGbit") * adapterCount)
+    networkCards = b.countExpr(networks)
+    networkConnections = b.countExpr(networks, adapterCount)
+    networkTypes = b.useExpr(networks)
+    cost = cost + b.countExpr(networks, b.values(networks, "cost"))
+    siomCardCount = b.countExpr("siom")
+    pciNetworkCount = b.countExpr("pciNetwork")
+
+    b.addConstr(networkSpeed, GRB.GREATER_EQUAL, p["minTotalNetworkSpeedGigabits"], "minTotalNetworkSpeed")
+    b.addConstr(networkCards - s["nodeCount"] * p["minNetworkCardsPerServer"], GRB.GREATER_EQUAL, 0, "minNetworkCardPerNode")
+    b.addConstr(networkCards - s["nodeCount"] * p["maxNetworkCardsPerServer"], GRB.LESS_EQUAL, 0, "maxNetworkCardsPerNode")
+    b.addConstr(networkCards, GRB.LESS_EQUAL, p["maxNetworkConnections"], "maxNetworkConnections")
+    b.addConstr(networkConnections - s["nodeCount"] * p["minNetworkConnectionsPerNode"], GRB.GREATER_EQUAL, 0, "minNetworkConnections")
+    b.addConstr(siomCardCount - s["maxSiomCards"] * p["allowSiomCards"], GRB.LESS_EQUAL, 0, "maxSiomCards")
+    b.addConstr(pciNetworkCount - s["maxPciNetworkCards"], GRB.LESS_EQUAL, 0, "maxPciNetworkCards")
+    b.addConstr(networkTypes, GRB.LESS_EQUAL, p["maxDistinctNetworkCards"], "maxDistinctNetworkCards")
+
+    b.emit()
 
     ##### Objective #####
-
-    m.setObjective(cost, GRB.MINIMIZE)
-
+    b.section("Objective")
+
+    b.model.setObjective(b.linExpr(cost), GRB.MINIMIZE)
+
+    return {"cost": cost, "serverCount": s["serverCount"], "nodeCount": s["nodeCount"],
+            "rackUnits": s["rackUnits"], "watts": s["watts"], "cores": cores, "gigaflops": gigaflops,
+            "memoryGB": memoryGB, "diskTB": diskTB, "diskIOPS": diskIOPS, "diskStreamMBs": diskStreamMBs,
+            "networkSpeed": networkSpeed}
+
+
+def bestConfigurations(catalog=None, inputs=None, top=10):
+    # Exact optimum and the next cheapest configurations without building a model, for
+    # inputs where singleTypeCase() holds. Returns None for any other inputs.
+    p = inputs or currentInputs()
+    groups, racks = buildGroups(catalog or loadCatalog(), p)
+    groups, merged, conflicts = mergeDuplicates(groups)
+    if not singleTypeCase(groups, p):
+        return None
+    return enumerateSingleType(groups, racks, p, top)
+
+
+def ilpModel(catalog=None, inputs=None, env=None, profile=None):
+    # The ILP of ilp() for the inputs, built but not solved. With a BuildProfile the
+    # catalog, each section of buildIlp() and m.update() are timed.
+    p = inputs or currentInputs()
+    if p["compileModels"] and profile is None:
+        return compiledIlp(catalog, p, env)
+    if profile is not None:
+        profile.mark("catalog")
+    m = gp.Model("ILP", env=env)
+    b = buildMatrix(m, catalog, p, p["pruneDominated"], p["tightenBounds"], p["linkingConstraints"])
+    b.profile = profile
+    buildIlp(b, p)
+    if profile is not None:
+        profile.mark("update")
+        m.update()
+        profile.mark(None)
+    return m, b
+
+
+##### Compiled models #####
+
+# Inputs that change how a model is solved or where results go, not the model
+solveInputs = ["solverMode", "warmStartPath", "tracePath", "profileBuild", "timeLimit", "mipGap", "tuningPath",
+               "sensitivity", "cachePath", "compileModels", "goalModelPath"]
+
+def compiledModelPath(catalog, p, prices=None):
+    # Common prefix of the compiled ILP's files for the catalog, the prices and the inputs that shape
+    # the model. Inputs that are only a row's right hand side (ScenarioModel.rhsInputs) are
+    # set after reading, so scenarios that differ in requirements share one compiled model.
+    shape = dict((name, p[name]) for name in inputNames if name not in solveInputs and name not in ScenarioModel.rhsInputs)
+    if p["pruneDominated"]:
+        # The entries pruned depend on which requirements are nonzero
+        shape["dominanceRules"] = dominanceRules(p)
+    if p["tightenBounds"]:
+        shape.update((name, p[name]) for name in ScenarioModel.boundInputs)
+    key = cacheKey("ILP", catalog.key, dict(shape, prices=prices or {}), modelSourceKey())
+    return os.path.join(catalog.path or os.path.join(defaultCatalogDir, ".compiled", catalog.key), "models", key)
+
+
+def compiledIlp(catalog=None, inputs=None, env=None, prices=None):
+    # (model, MatrixBuilder) of the ILP for the inputs, read from its compiled model (see
+    # compiledModel.py) when an earlier run wrote one, so buildVars(), merging, pruning and
+    # the rows of buildIlp() are skipped. Built and compiled otherwise. b.compiledPath is the
+    # prefix of its files; readCompiledRows() of it are the rows buildIlp() returns.
+    p = inputs or currentInputs()
+    catalog = catalog or loadCatalog()
+    path = compiledModelPath(catalog, p, prices)
+    compiled = readCompiledModel(path, env)
+    if compiled is not None:
+        m, state = compiled
+        b = MatrixBuilder.load(m, state["groups"], state["racks"], p["linkingConstraints"])
+        for name in ["catalogKey", "merged", "conflicts", "pruned"]:
+            setattr(b, name, state[name])
+        for name, constraint in ScenarioModel.rhsInputs.items():
+            b.constrs[constraint].RHS = p[name]
+        b.compiledPath = path
+        return m, b
+
+    m = gp.Model("ILP", env=env)
+    b = buildMatrix(m, catalog, p, p["pruneDominated"], p["tightenBounds"], p["linkingConstraints"], prices=prices)
+    exprs = buildIlp(b, p)
+    state = {"groups": b.groups, "racks": b.racks, "catalogKey": b.catalogKey, "merged": b.merged,
+             "conflicts": b.conflicts, "pruned": b.pruned}
+    # Gurobi variables cannot be pickled; MatrixBuilder.load() sets them from the read model
+    owners = b.components + b.racks
+    bound = [dict((name, getattr(owner, name)) for name in ["countVar", "useVar"] if hasattr(owner, name)) for owner in owners]
+    try:
+        for owner, attrs in zip(owners, bound):
+            owner.__dict__.update(dict.fromkeys(attrs))
+        writeCompiledModel(path, m, state, exprs)
+    finally:
+        for owner, attrs in zip(owners, bound):
+            owner.__dict__.update(attrs)
+    b.compiledPath = path
+    return m, b
+
+
+def profileIlp(catalog=None, inputs=None, env=None):
+    # Builds, presolves and solves the ILP and returns its BuildProfile
+    profile = BuildProfile("ILP")
+    m, b = ilpModel(catalog, inputs, env, profile)
+    profile.presolve(m)
+    profile.mark("optimize")
     m.optimize()
+    profile.finish()
+    return profile
+
+
+def configurationSolution(configuration, objVal, catalog, p):
+    # Solution of a {varName: count} configuration found without the ILP's model
+    groups, racks = buildGroups(catalog or loadCatalog(), p)
+    return Solution.fromConfiguration(configuration, groups, racks, objVal, p["rackCostScalingFactor"])
+
+
+def decomposedSolution(best, results, catalog, p):
+    # Solution of decomposeByServer()'s results, None when every server type is infeasible.
+    # The status is GRB.TIME_LIMIT when the budget stopped a server type short of its
+    # optimum. bound is the lowest bound of any server type that may beat best (cut off ones
+    # cannot) and mipGap the gap to it.
+    timedOut = any(result["status"] == GRB.TIME_LIMIT for result in results)
+    if best is None and not timedOut:
+        return None
+    solution = configurationSolution(best["configuration"] if best else {}, best["objVal"] if best else None, catalog, p)
+    solution.status = GRB.TIME_LIMIT if timedOut else GRB.OPTIMAL
+    bounds = [result.get("objBound") if result.get("objBound") is not None else result["bound"] for result in results
+              if result["status"] not in [GRB.INFEASIBLE, GRB.INF_OR_UNBD, GRB.CUTOFF]]
+    if best is not None and None not in bounds:
+        solution.bound = min(bounds + [best["objVal"]])
+        solution.mipGap = (best["objVal"] - solution.bound) / max(abs(best["objVal"]), 1e-10)
+    return solution
+
+
+def columnSolution(result, catalog, p):
+    # Solution of a columnGeneration() result, with its status, LP bound and gap. It has no
+    # objVal when the heuristic found no configuration.
+    solution = configurationSolution(result["configuration"], result["objVal"], catalog, p)
+    solution.status = result["status"]
+    solution.mipGap = result["gap"]
+    solution.bound = result["bound"]
+    return solution
+
+
+# Hash of this file, set on first use by modelSourceKey()
+sourceKey = None
+
+
+def modelSourceKey():
+    # Part of every solve cache and compiled model key, so results and models of an older
+    # formulation are not returned after this file changes
+    global sourceKey
+    if sourceKey is None:
+        with open(os.path.abspath(__file__), "rb") as f:
+            sourceKey = hashlib.sha1(f.read()).hexdigest()
+    return sourceKey
+
+
+def cacheable(solution):
+    # Solves that ended with a solution or a proof that there is none, not those a time
+    # limit cut short, whose incumbent depends on the machine and its load
+    if solution is None or solution.status == GRB.TIME_LIMIT:
+        return False
+    return solution.objVal is not None or solution.status == GRB.INFEASIBLE
+
+
+def solve(inputs=None, catalog=None, env=None, verbose=False):
+    # Solves the inputs with the method solverMode selects and returns the Solution, or
+    # None when no configuration meets them. Prints nothing unless verbose. With cachePath
+    # set, inputs solved before on the same catalog return the stored Solution.
+    started = time.perf_counter()
+    p = inputs or currentInputs()
+    if p["solverMode"] not in ["auto", "mip", "enumerate", "decompose", "columns"]:
+        raise ValueError("unknown solver mode " + str(p["solverMode"]))
+    cache = openSolveCache(p["cachePath"])
+    if not cache:
+        return solveUncached(p, catalog, env, verbose, started)
+    catalog = catalog or loadCatalog()
+    key = cacheKey("ILP", catalog.key, p, modelSourceKey())
+    solution = cache.get(key)
+    if solution is None:
+        solution = solveUncached(p, catalog, env, verbose, started)
+        if cacheable(solution):
+            cache.put(key, "ILP", solution)
+    return solution
+
+
+def solveUncached(p, catalog=None, env=None, verbose=False, started=None):
+    if p["solverMode"] == "decompose":
+        catalog = catalog or loadCatalog()
+        best, results = decomposeByServer(p, catalog=catalog, started=started)
+        return decomposedSolution(best, results, catalog, p)
+    if p["solverMode"] == "columns":
+        return columnSolution(columnGeneration(catalog, p, env, started=started), catalog, p)
+    if p["solverMode"] == "enumerate" or (p["solverMode"] == "auto" and not p["sensitivity"]):
+        configurations = bestConfigurations(catalog, p, top=1)
+        if configurations is None and p["solverMode"] == "enumerate":
+            raise ValueError("enumerate needs one server, cpu, memory and network card type and one disk type per form factor")
+        if configurations is not None:
+            if not configurations:
+                return None
+            return configurationSolution(configurations[0]["configuration"], configurations[0]["cost"], catalog, p)
+
+    profile = BuildProfile("ILP") if p["profileBuild"] else None
+    m, b = ilpModel(catalog, p, env, profile)
+    if verbose:
+        printPresolve(b)
+
+    store = openWarmStartStore(p["warmStartPath"])
+    if store:
+        store.apply(m, p, b.catalogKey)
+    trace = openSolveTrace(p["tracePath"])
+    setSolveParams(m, p, "ILP", started)
+    if profile:
+        profile.presolve(m)
+        profile.mark("optimize")
+    m.optimize(trace)
+    if profile:
+        profile.finish()
+        if verbose:
+            print (profile.line())
+    if trace:
+        trace.write(m, p)
+    if store:
+        store.save(m, p, b.catalogKey)
+    solution = Solution.fromModel(m, b, p["rackCostScalingFactor"])
+    if p["sensitivity"]:
+        solution.sensitivity = sensitivityAnalysis(m, b)
+    return solution
+
+
+def tuningProfile(path, kind):
+    # Gurobi parameter file tuning.py saved for kind ("ILP" or "goals"), None if there is none
+    if not path:
+        return None
+    path = os.path.join(path, kind + ".prm")
+    return path if os.path.exists(path) else None
+
+
+def setSolveParams(m, p, kind, started=None):
+    # Loads the saved tuning profile of kind, then the time budget and gap target of the
+    # inputs, which win over the profile. The budget counts from started (a perf_counter()
+    # value), so building the model is part of it; Gurobi returns the best configuration
+    # found within it with its proven gap.
+    profile = tuningProfile(p["tuningPath"], kind)
+    if profile:
+        m.read(profile)
+    if p["mipGap"] is not None:
+        m.Params.MIPGap = p["mipGap"]
+    if p["timeLimit"] is not None:
+        setTimeLimit(m, p["timeLimit"], started)
+
+
+def setTimeLimit(m, timeLimit, started=None):
+    spent = time.perf_counter() - started if started is not None else 0.0
+    m.Params.TimeLimit = max(timeLimit - spent, 0.0)
+
+
+def ilp(catalog=None, inputs=None, env=None):
+    # solve() printing the presolve reductions and the configuration
+    solution = solve(inputs, catalog, env, verbose=True)
+    if solution is None:
+        print ("infeasible")
+        return None
+    if solution.objVal is None and solution.status == HEURISTIC:
+        print ("column generation found no configuration, LP bound {}".format(solution.bound))
+        return solution
+    solution.printConfiguration()
+    if solution.sensitivity is not None:
+        solution.sensitivity.printReport()
+    return solution
+
+
+def sensitivityAnalysis(m, b):
+    # Fixes which components and racks the solved model m uses, relaxes the counts and
+    # solves that LP once for the dual and RHS range of every requirement row and the cost
+    # range of every component bought. None without a solution or an optimal LP.
+    if b.linking != "bigM":
+        raise ValueError("sensitivity needs linkingConstraints = \"bigM\", indicator constraints have no duals")
+    if m.SolCount == 0:
+        return None
+    x = np.array(m.getAttr("X", b.vars))
+    lp = m.relax()
+    lp.Params.OutputFlag = 0
+    lpVars = lp.getVars()
+    fixed = np.round(x[b.n:])
+    lp.setAttr("LB", lpVars[b.n:], fixed.tolist())
+    lp.setAttr("UB", lpVars[b.n:], fixed.tolist())
+    lp.optimize()
+    if lp.Status != GRB.OPTIMAL:
+        lp.dispose()
+        return None
+
+    lpConstrs = lp.getConstrs()
+    rows = [(name, b.constrs[constraint].index) for name, constraint in ScenarioModel.rhsInputs.items() if constraint in b.constrs]
+    constrs = [lpConstrs[index] for name, index in rows]
+    values = dict((attr, lp.getAttr(attr, constrs)) for attr in ["Sense", "RHS", "Slack", "Pi", "SARHSLow", "SARHSUp"])
+    requirements = {}
+    for k, (name, index) in enumerate(rows):
+        requirements[name] = {"constraint": ScenarioModel.rhsInputs[name], "sense": values["Sense"][k], "rhs": values["RHS"][k],
+                              "activity": values["RHS"][k] - values["Slack"][k], "slack": values["Slack"][k],
+                              "dual": values["Pi"][k], "rhsLow": values["SARHSLow"][k], "rhsHigh": values["SARHSUp"][k]}
+
+    counts = np.round(x[:b.n]).astype(int)
+    bought = np.flatnonzero(counts > 0).tolist()
+    vars = [lpVars[j] for j in bought]
+    values = dict((attr, lp.getAttr(attr, vars)) for attr in ["Obj", "RC", "SAObjLow", "SAObjUp"])
+    components = {}
+    for k, j in enumerate(bought):
+        # Prices as updatePrices() takes them: a server's list price, without what
+        # configuredCost adds to it in the objective
+        component = b.components[j]
+        extra = component.configuredCost - component.cost if isinstance(component, Server) else 0.0
+        components[b.varNames[j]] = {"count": int(counts[j]), "cost": values["Obj"][k] - extra, "reducedCost": values["RC"][k],
+                                     "costLow": values["SAObjLow"][k] - extra, "costHigh": values["SAObjUp"][k] - extra}
+    sensitivity = Sensitivity(m.ObjVal, lp.ObjVal, requirements, components)
+    lp.dispose()
+    return sensitivity
+
+
+class ScenarioModel:
+    # The ILP built once. Requirement changes are applied to the existing rows (RHS,
+    # per-node coefficients, rack costs) so re-optimizing keeps Gurobi's previous basis
+    # and starts from the previous configuration instead of building a new Model.
+
+    # input -> constraint whose right hand side it is
+    rhsInputs = {"minServers": "minServers",
+                 "maxServers": "maxServers",
+                 "maxDistinctServerTypes": "maxDistinctServerTypes",
+                 "maxDistinctCpus": "distinctCpus",
+                 "minCores": "minCores",
+                 "minGigaflops": "minGigaflops",
+                 "maxDistinctMemory": "distinctMemoryTypes",
+                 "minMemory": "minMemory",
+                 "maxDistinctDisks": "distinctDiskTypes",
+                 "maxDistinct25Disks": "maxDistinct25Disks",
+                 "maxDistinct35Disks": "maxDistinct35Disks",
+                 "maxDistinctNvmeDisks": "maxDistinctNvmeDisks",
+                 "minDiskTB": "minimumTerabytes",
+                 "minDiskHddTB": "minimumHddTB",
+                 "minDiskFastTB": "minimumFastTB",
+                 "minDiskIOPS": "minimumIOPS",
+                 "minDiskHddIOPS": "minimumHddIOPS",
+                 "minDiskFastIOPS": "minimumFastIOPS",
+                 "minDiskStreamMBs": "minimumStreamMBs",
+                 "minDiskCount": "minDiskCount",
+                 "minTotalNetworkSpeedGigabits": "minTotalNetworkSpeed",
+                 "maxNetworkConnections": "maxNetworkConnections",
+                 "maxDistinctNetworkCards": "maxDistinctNetworkCards"}
+
+    # input -> (constraint, coefficient of each server count variable in it)
+    serverInputs = {"maxAvgMemoryPerNode": ("maxAvgMemoryPerNode", lambda server, value: server.nodes * value),
+                    "minAvgMemoryPerNode": ("minAvgMemoryPerNode", lambda server, value: server.nodes * value),
+                    "minNetworkCardsPerServer": ("minNetworkCardPerNode", lambda server, value: -server.nodes * value),
+                    "maxNetworkCardsPerServer": ("maxNetworkCardsPerNode", lambda server, value: -server.nodes * value),
+                    "minNetworkConnectionsPerNode": ("minNetworkConnections", lambda server, value: -server.nodes * value),
+                    "allowSiomCards": ("maxSiomCards", lambda server, value: -server.siomCards * server.nodes * value)}
+
+    rackInputs = ["rackCostPerMonth", "serverCostTimeHorizonYears", "availableWattsPerRack", "rackCostScalingFactor"]
+
+    # Inputs the count bounds are derived from
+    boundInputs = ["maxServers", "maxNetworkCardsPerServer", "maxNetworkConnections", "allowSiomCards"]
+
+    # Inputs that change which rows exist; changing them rebuilds the model. So do mipGap
+    # and tuningPath, whose parameters cannot be taken back on the existing model.
+    structuralInputs = ["fillAllDiskSlots", "pruneDominated", "tightenBounds", "linkingConstraints", "mipGap", "tuningPath"]
+
+    def __init__(self, catalog=None, env=None, **requirements):
+        self.catalog = catalog
+        self.env = env
+        self.inputs = currentInputs(requirements)
+        # {identifier: cost} set by updatePrices(), kept across rebuilds
+        self.prices = {}
+        self.store = openWarmStartStore(self.inputs["warmStartPath"])
+        # The first optimize() counts timeLimit from here, so building is part of it
+        self.started = time.perf_counter()
+        self.build()
+
+    def build(self):
+        p = self.inputs
+        if p["compileModels"]:
+            self.model, self.builder = compiledIlp(self.catalog, p, self.env, self.prices)
+            self.rows = None
+        else:
+            self.model = gp.Model("ILP", env=self.env) if self.env is not None else gp.Model("ILP")
+            self.builder = buildMatrix(self.model, self.catalog, p, p["pruneDominated"], p["tightenBounds"],
+                                       p["linkingConstraints"], prices=self.prices)
+            self.rows = buildIlp(self.builder, self.inputs)
+        self.pruned = self.builder.pruned
+        self.rules = dominanceRules(self.inputs)
+        setSolveParams(self.model, dict(p, timeLimit=None), "ILP")
+        # TimeLimit of the environment, restored when timeLimit is set back to None
+        self.envTimeLimit = self.model.Params.TimeLimit
+        self.constrs = self.builder.constrs
+
+    @property
+    def exprs(self):
+        # Rows of buildIlp() (cost, capacities), read from the compiled model on first use
+        if self.rows is None:
+            self.rows = readCompiledRows(self.builder.compiledPath)
+        return self.rows
+
+    def update(self, **requirements):
+        # Returns True when the change needed a rebuild
+        changed = dict((name, value) for name, value in currentInputs(requirements).items()
+                       if name in requirements and self.inputs[name] != value)
+        self.inputs.update(changed)
+        # Entries pruned under the old requirements may be needed under the new ones
+        repruned = self.inputs["pruneDominated"] and dominanceRules(self.inputs) != self.rules
+        if repruned or any(name in changed for name in self.structuralInputs):
+            self.build()
+            return True
+        servers = self.builder.groups["servers"]
+        for name, value in changed.items():
+            if name in self.rhsInputs:
+                self.constrs[self.rhsInputs[name]].RHS = value
+            elif name in self.serverInputs:
+                constrName, coef = self.serverInputs[name]
+                for server in servers:
+                    self.model.chgCoeff(self.constrs[constrName], server.countVar, coef(server, value))
+        if any(name in changed for name in self.rackInputs):
+            self.updateRacks()
+        if self.inputs["tightenBounds"] and any(name in changed for name in self.boundInputs):
+            self.builder.setCountBounds(countBounds(self.builder.groups, self.inputs))
+        return False
+
+    def updatePrices(self, prices):
+        # prices: {identifier: cost} of parts (Cpu.name, Disk.partNumber, Server.name, ...).
+        # Changes the cost coefficients in place and returns False, or rebuilds and returns
+        # True when a part is merged with others or takes part in dominance pruning, whose
+        # result the new price can change.
+        b = self.builder
+        inModel = dict((component.identifier, component) for component in b.components)
+        aliases = set(alias.identifier for component in b.components for alias in component.aliases)
+        pruned = set(component.identifier for group, component, dominator in self.pruned) | \
+            set(dominator.identifier for group, component, dominator in self.pruned)
+        unknown = [identifier for identifier in prices if identifier not in inModel and identifier not in aliases | pruned]
+        if unknown:
+            raise ValueError("unknown parts " + ", ".join(map(str, unknown)))
+        changed = dict((identifier, cost) for identifier, cost in prices.items() if self.prices.get(identifier) != cost)
+        self.prices.update(changed)
+        if any(identifier not in inModel or identifier in pruned or inModel[identifier].aliases for identifier in changed):
+            self.build()
+            return True
+        components = [inModel[identifier] for identifier in changed]
+        for component in components:
+            setPrice(component, changed[component.identifier])
+        # Cached coefficient arrays of the builder hold the old prices
+        b.arrays = dict((key, values) for key, values in b.arrays.items() if key[1] not in ["cost", "configuredCost"])
+        self.model.setAttr("Obj", [component.countVar for component in components],
+                           [component.configuredCost if isinstance(component, Server) else component.cost for component in components])
+        return False
+
+    def updateRacks(self):
+        p = self.inputs
+        maxWatts = self.constrs["maxWatts"]
+        for rack in self.builder.racks:
+            rack.availableWatts = p["availableWattsPerRack"]
+            rack.costPerMonth = p["rackCostPerMonth"]
+            rack.timeHorizonYears = p["serverCostTimeHorizonYears"]
+            self.model.chgCoeff(maxWatts, rack.useVar, -rack.availableWatts)
+            rack.useVar.Obj = p["rackCostScalingFactor"] * (rack.networkCost + (rack.costPerMonth * 12 * rack.timeHorizonYears))
+
+    def optimize(self, prices=None, **requirements):
+        # Applies the requirement and price changes, re-optimizes from the last solution and
+        # returns the Solution. timeLimit counts from this call (from __init__() for the first
+        # one), so applying the changes or rebuilding is part of it, as in solve().
+        started = self.started if self.started is not None else time.perf_counter()
+        self.started = None
+        m = self.model
+        start = None
+        if m.SolCount > 0:
+            start = dict(zip(self.builder.varNames, m.getAttr("X", self.builder.vars)))
+        rebuilt = self.update(**requirements)
+        if prices:
+            rebuilt = self.updatePrices(prices) or rebuilt
+        if rebuilt and start is not None:
+            # Rebuilt, possibly with a different set of components: match the start by name
+            matched = [(v, start[name]) for v, name in zip(self.builder.vars, self.builder.varNames) if name in start]
+            self.model.setAttr("Start", [v for v, x in matched], [x for v, x in matched])
+        elif start is not None:
+            self.model.setAttr("Start", self.builder.vars, [start[name] for name in self.builder.varNames])
+        elif self.store:
+            self.store.apply(self.model, self.inputs, self.builder.catalogKey)
+        if self.inputs["timeLimit"] is None:
+            self.model.Params.TimeLimit = self.envTimeLimit
+        else:
+            setTimeLimit(self.model, self.inputs["timeLimit"], started)
+        self.model.optimize()
+        if self.store:
+            self.store.save(self.model, self.inputs, self.builder.catalogKey)
+        solution = Solution.fromModel(self.model, self.builder, self.inputs["rackCostScalingFactor"])
+        if self.inputs["sensitivity"]:
+            solution.sensitivity = sensitivityAnalysis(self.model, self.builder)
+        return solution
+
+
+##### Sweeps #####
+
+# ScenarioModel owned by each sweep worker process
+workerScenario = None
+
+
+def scenarioGrid(**axes):
+    # scenarioGrid(minMemory=[4096, 8192], minDiskTB=[500, 1000]) -> one dict per combination
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*[axes[name] for name in names])]
+
+
+def quietEnv(threads, params=None):
+    env = gp.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.setParam("Threads", threads)
+    for name, value in (params or {}).items():
+        env.setParam(name, value)
+    env.start()
+    return env
+
+
+def solvedConfiguration(m, vars):
+    # {varName: count} of the nonzero count and rack variables in m's solution
+    return dict((name, int(round(x, 0))) for name, x in zip(m.getAttr("VarName", vars), m.getAttr("X", vars))
+                if abs(x) > 1e-6 and not name.startswith("use "))
+
+
+def startWorker(threads, catalogDir, params):
+    global workerScenario
+    catalog = loadCatalog(catalogDir) if catalogDir else None
+    workerScenario = ScenarioModel(catalog, quietEnv(threads, params))
+
+
+def solveScenarios(chunk):
+    results = []
+    for index, scenario in chunk:
+        result = {"index": index, "scenario": scenario, "objVal": None, "configuration": {}}
+        try:
+            result["objVal"] = workerScenario.optimize(**scenario).objVal
+            m = workerScenario.model
+            result["status"] = m.Status
+            result["runtime"] = m.Runtime
+            if m.SolCount > 0:
+                result["mipGap"] = m.MIPGap
+                result["configuration"] = solvedConfiguration(m, workerScenario.builder.vars)
+        except gp.GurobiError as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
+
+def sweep(scenarios, workers=None, threads=1, catalogDir=None, chunkSize=1, params=None):
+    # Solves every scenario dict in a process pool and yields results as they finish.
+    # Each worker keeps one Env with Threads=threads and one ScenarioModel, so by default
+    # workers * threads is the core count. Consecutive scenarios are sent to the same worker
+    # in chunks of chunkSize so each solve warm starts from a similar configuration.
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    indexed = list(enumerate(scenarios))
+    chunks = [indexed[i:i + chunkSize] for i in range(0, len(indexed), chunkSize)]
+    with ProcessPoolExecutor(workers, initializer=startWorker, initargs=(threads, catalogDir, params)) as pool:
+        futures = [pool.submit(solveScenarios, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+
+##### Decomposition #####
+
+# Env and catalog of each decomposition (and frontier) worker process
+workerEnv = None
+workerCatalog = None
+
+
+# Models of the server types this decomposition worker bounded, solved by the same worker
+# without building them again
+workerModels = {}
+
+
+def startDecompositionWorker(threads, catalog, params):
+    # catalog: a Catalog, a catalog source directory or None for the default catalog
+    global workerEnv, workerCatalog
+    workerEnv = quietEnv(threads, params)
+    if isinstance(catalog, Catalog):
+        workerCatalog = catalog
+    else:
+        workerCatalog = loadCatalog(catalog) if catalog else loadCatalog()
+
+
+def serverModel(env, catalog, p, server):
+    m = gp.Model("ILP " + server, env=env)
+    b = buildMatrix(m, catalog, p, p["pruneDominated"], p["tightenBounds"], p["linkingConstraints"], server)
+    buildIlp(b, p)
+    return m, b
+
+
+def boundServerType(server, p):
+    # LP relaxation bound of the server type's ILP, None when the relaxation has no optimum.
+    # p["timeLimit"] is what was left of the budget when the parent sent the task.
+    started = time.perf_counter()
+    m, b = serverModel(workerEnv, workerCatalog, p, server)
+    m.update()
+    relaxed = m.relax()
+    setSolveParams(relaxed, p, "ILP", started)
+    relaxed.optimize()
+    bound = relaxed.ObjVal if relaxed.Status == GRB.OPTIMAL else None
+    status = relaxed.Status
+    relaxed.dispose()
+    if bound is not None:
+        workerModels[server] = (m, b)
+    else:
+        m.dispose()
+    return server, status, bound
 
-    for v in m.getVars():
-        if abs(v.X) > 1e-6 and not v.varName.startswith("use "):
-            print (v.varName, int(round(v.X, 0)))
-    return m.getAttr("ObjVal")
 
+def solveServerType(server, p, cutoff=None):
+    started = time.perf_counter()
+    m, b = workerModels.pop(server, None) or serverModel(workerEnv, workerCatalog, p, server)
+    setSolveParams(m, p, "ILP", started)
+    if cutoff is not None:
+        m.setParam("Cutoff", cutoff)
+    m.optimize()
+    result = {"server": server, "status": m.Status, "runtime": m.Runtime, "objVal": None, "objBound": None, "configuration": {}}
+    if m.Status in [GRB.OPTIMAL, GRB.TIME_LIMIT]:
+        result["objBound"] = m.ObjBound
+    if m.SolCount > 0:
+        result["objVal"] = m.ObjVal
+        result["configuration"] = solvedConfiguration(m, b.vars)
+    return result
+
+
+def remainingBudget(p, started):
+    # p with timeLimit set to what is left of it since started, for work done elsewhere
+    if p["timeLimit"] is None:
+        return p
+    return dict(p, timeLimit=max(p["timeLimit"] - (time.perf_counter() - started), 0.0))
+
+
+def decomposeByServer(inputs=None, workers=None, threads=1, catalogDir=None, params=None, catalog=None, started=None):
+    # With maxDistinctServerTypes = 1 the ILP is the best of one smaller ILP per server type.
+    # The workers solve their LP relaxations first; the subproblems then go to the pool in
+    # order of that bound, each with the best objective found so far as Cutoff, and the
+    # ones whose bound cannot beat it are not solved at all. catalog (a Catalog) wins over
+    # catalogDir; Gurobi environments cannot be sent to workers, so each worker starts its
+    # own with params. timeLimit counts from started; server types the budget leaves
+    # unsolved are reported with status GRB.TIME_LIMIT. mipGap and the tuning profile apply
+    # to every subproblem.
+    # Returns (best result or None, [result per server type]).
+    started = started if started is not None else time.perf_counter()
+    p = inputs or currentInputs()
+    if p["maxDistinctServerTypes"] != 1:
+        raise ValueError("decomposing by server type needs maxDistinctServerTypes = 1")
+    catalog = catalog or (loadCatalog(catalogDir) if catalogDir else loadCatalog())
+    groups, racks = buildGroups(catalog, p)
+    groups, merged, conflicts = mergeDuplicates(groups)
+    servers = [server.name for server in groups["servers"]]
+    results = []
+    best = None
+    workers = min(workers or max(1, (os.cpu_count() or 1) // threads), max(1, len(servers)))
+    with ProcessPoolExecutor(workers, initializer=startDecompositionWorker, initargs=(threads, catalog, params)) as pool:
+        pending = []
+        for server, status, bound in pool.map(boundServerType, servers, [remainingBudget(p, started)] * len(servers)):
+            if bound is not None:
+                pending.append((bound, server))
+            else:
+                results.append({"server": server, "status": status, "bound": None, "objVal": None, "configuration": {}})
+        pending.sort()
+        running = {}
+        while pending or running:
+            while pending and len(running) < workers:
+                bound, server = pending.pop(0)
+                if best is not None and bound >= best["objVal"]:
+                    results.append({"server": server, "status": GRB.CUTOFF, "bound": bound, "objVal": None, "configuration": {}})
+                    continue
+                remaining = remainingBudget(p, started)
+                if remaining["timeLimit"] == 0:
+                    results.append({"server": server, "status": GRB.TIME_LIMIT, "bound": bound, "objVal": None, "configuration": {}})
+                    continue
+                future = pool.submit(solveServerType, server, remaining, best["objVal"] if best else None)
+                running[future] = bound
+            done, notDone = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                result["bound"] = running.pop(future)
+                results.append(result)
+                if result["objVal"] is not None and (best is None or result["objVal"] < best["objVal"]):
+                    best = result
+    return best, results
+
+
+##### Column generation #####
+
+# What one pattern (a server with every node configured the same) adds to the cluster
+patternResources = ["serverCount", "nodeCount", "rackUnits", "watts", "cores", "gigaflops", "memoryGB",
+                    "diskTB", "diskHddTB", "diskFastTB", "diskIOPS", "diskHddIOPS", "diskFastIOPS",
+                    "diskStreamMBs", "diskCount", "networkSpeed", "networkCards"]
+
+# Groups a node picks one entry of -> input limiting the distinct entries over all patterns
+patternGroups = {"cpus": "maxDistinctCpus",
+                 "memory": "maxDistinctMemory",
+                 "disk25": "maxDistinct25Disks",
+                 "disk35": "maxDistinct35Disks",
+                 "diskNvme": "maxDistinctNvmeDisks",
+                 "network": "maxDistinctNetworkCards"}
+
+
+# Cost of each unit of a requirement the restricted master LP leaves uncovered
+patternSlackCost = 1e6
+
+# Status of a columnGeneration() result the LP bound does not prove optimal. The integer
+# problem only chooses among the patterns the dives found, so it may cost more than the
+# best configuration or find none although one exists.
+HEURISTIC = "heuristic"
+
+
+def unitResources(component):
+    if isinstance(component, Cpu):
+        return {"cores": component.cores, "gigaflops": component.cores * component.ghz}
+    if isinstance(component, Memory):
+        return {"memoryGB": component.memoryGB}
+    if isinstance(component, Disk):
+        isHdd = component.type == hdd
+        return {"diskTB": component.tb, "diskHddTB": component.tb * isHdd, "diskFastTB": component.tb * (not isHdd),
+                "diskIOPS": component.iops, "diskHddIOPS": component.iops * isHdd,
+                "diskFastIOPS": component.iops * (not isHdd), "diskStreamMBs": component.streamMBs, "diskCount": 1}
+    return {"networkSpeed": component.speedGbit * component.adapterCount, "networkCards": 1}
+
+
+class NodePattern:
+    def __init__(self, server, choices):
+        # choices: [(group, component, count per node)]
+        self.server = server
+        self.choices = choices
+        self.cost = server.configuredCost + server.nodes * sum(c.cost * count for group, c, count in choices)
+        resources = dict.fromkeys(patternResources, 0.0)
+        resources.update(serverCount=1, nodeCount=server.nodes, rackUnits=server.rackUnits, watts=server.watts)
+        for group, component, count in choices:
+            for name, value in unitResources(component).items():
+                resources[name] += server.nodes * count * value
+        self.resources = np.array([resources[name] for name in patternResources], dtype=float)
+        self.name = "pattern " + ", ".join([server.name] + ["{} x {}".format(count, c.baseVarName) for group, c, count in choices])
+
+    def entries(self):
+        # [(group, entry, how many one server of this pattern has)] including the server
+        return [("servers", self.server, 1)] + [(group, c, self.server.nodes * count) for group, c, count in self.choices]
+
+
+def masterRows(p):
+    # (name, {resource: coefficient}, sense, rhs) of the rows over all patterns; the
+    # maxRackUnits and maxWatts rows also get the capacity of the racks used
+    return [("minServers", {"serverCount": 1}, GRB.GREATER_EQUAL, p["minServers"]),
+            ("maxServers", {"serverCount": 1}, GRB.LESS_EQUAL, p["maxServers"]),
+            ("maxRackUnits", {"rackUnits": 1}, GRB.LESS_EQUAL, 0),
+            ("maxWatts", {"watts": 1}, GRB.LESS_EQUAL, 0),
+            ("minCores", {"cores": 1}, GRB.GREATER_EQUAL, p["minCores"]),
+            ("minGigaflops", {"gigaflops": 1}, GRB.GREATER_EQUAL, p["minGigaflops"]),
+            ("minMemory", {"memoryGB": 1}, GRB.GREATER_EQUAL, p["minMemory"]),
+            ("minimumTerabytes", {"diskTB": 1}, GRB.GREATER_EQUAL, p["minDiskTB"]),
+            ("minimumHddTB", {"diskHddTB": 1}, GRB.GREATER_EQUAL, p["minDiskHddTB"]),
+            ("minimumFastTB", {"diskFastTB": 1}, GRB.GREATER_EQUAL, p["minDiskFastTB"]),
+            ("minimumIOPS", {"diskIOPS": 1}, GRB.GREATER_EQUAL, p["minDiskIOPS"]),
+            ("minimumHddIOPS", {"diskHddIOPS": 1}, GRB.GREATER_EQUAL, p["minDiskHddIOPS"]),
+            ("minimumFastIOPS", {"diskFastIOPS": 1}, GRB.GREATER_EQUAL, p["minDiskFastIOPS"]),
+            ("minimumStreamMBs", {"diskStreamMBs": 1}, GRB.GREATER_EQUAL, p["minDiskStreamMBs"]),
+            ("minDiskCount", {"diskCount": 1}, GRB.GREATER_EQUAL, p["minDiskCount"]),
+            ("minTotalNetworkSpeed", {"networkSpeed": 1}, GRB.GREATER_EQUAL, p["minTotalNetworkSpeedGigabits"]),
+            ("maxNetworkConnections", {"networkCards": 1}, GRB.LESS_EQUAL, p["maxNetworkConnections"])]
+
+
+def nodeOptions(server, groups, p):
+    # group -> [(component or None, fewest, most per node)] for one node of server. The
+    # per node rows of buildIlp() (slots, memory per node, network cards and connections
+    # per node) hold for every count in the range.
+    def ceil(x):
+        return int(np.ceil(x - 1e-9))
+
+    options = dict((group, []) for group in patternGroups)
+    if server.cpuSlots > 0:
+        options["cpus"] = [(cpu, server.cpuSlots, server.cpuSlots) for cpu in groups["cpus"]]
+    else:
+        options["cpus"] = [(None, 0, 0)]
+    for memory in groups["memory"]:
+        fewest = max(server.minMemorySlots, ceil(p["minAvgMemoryPerNode"] / memory.memoryGB), 1)
+        most = min(server.memorySlots, int(p["maxAvgMemoryPerNode"] // memory.memoryGB))
+        options["memory"].append((memory, fewest, most))
+    if server.minMemorySlots == 0 and p["minAvgMemoryPerNode"] <= 0:
+        options["memory"].append((None, 0, 0))
+    for group, slots, minimum in [("disk25", server.disk25Slots, server.minimum25Disks),
+                                  ("disk35", server.disk35Slots, server.minimum35Disks)]:
+        if p["fillAllDiskSlots"]:
+            minimum = slots
+        options[group] = [(disk, max(minimum, 1), slots) for disk in groups[group]]
+        if minimum == 0:
+            options[group].append((None, 0, 0))
+    # Unlike the ILP, NVMe disks need a slot
+    nvmeSlots = server.nvmeSlots if p["maxDistinctNvmeDisks"] > 0 else 0
+    options["diskNvme"] = [(disk, 1, nvmeSlots) for disk in groups["diskNvme"]] + [(None, 0, 0)]
+    for group, slots in [("siom", server.siomCards * p["allowSiomCards"]),
+                         ("pciNetwork", server.pcieV3X16Slots + server.pcieV3X8Slots)]:
+        for card in groups[group]:
+            fewest = max(p["minNetworkCardsPerServer"], ceil(p["minNetworkConnectionsPerNode"] / card.adapterCount), 1)
+            options["network"].append((card, fewest, min(p["maxNetworkCardsPerServer"], slots)))
+    if p["minNetworkCardsPerServer"] == 0 and p["minNetworkConnectionsPerNode"] <= 0:
+        options["network"].append((None, 0, 0))
+    return dict((group, [option for option in entries if option[1] <= option[2]]) for group, entries in options.items())
+
+
+class PatternPricer:
+    # Finds the pattern of each server with the lowest reduced cost for the duals of the
+    # master rows. A node's reduced cost is a sum over the groups of count times the unit
+    # reduced cost of the chosen entry, so each group takes its best entry at its fewest
+    # or most count.
+
+    def __init__(self, groups, p):
+        self.servers = groups["servers"]
+        self.options = [nodeOptions(server, groups, p) for server in self.servers]
+        self.arrays = None
+
+    def copy(self):
+        pricer = PatternPricer.__new__(PatternPricer)
+        pricer.servers = list(self.servers)
+        pricer.options = [dict((group, list(entries)) for group, entries in options.items()) for options in self.options]
+        pricer.arrays = None
+        return pricer
+
+    def restrict(self, group, identifiers):
+        # Only offer the entries of group in identifiers from now on
+        if group == "servers":
+            kept = [k for k, server in enumerate(self.servers) if server.identifier in identifiers]
+            self.servers = [self.servers[k] for k in kept]
+            self.options = [self.options[k] for k in kept]
+        else:
+            for options in self.options:
+                options[group] = [option for option in options[group] if option[0] is None or option[0].identifier in identifiers]
+        self.arrays = None
+
+    def optionArrays(self, options):
+        arrays = {}
+        for group, entries in options.items():
+            units = [unitResources(c) if c is not None else {} for c, fewest, most in entries]
+            arrays[group] = (np.array([[u.get(name, 0.0) for name in patternResources] for u in units], dtype=float).reshape(len(entries), len(patternResources)),
+                             np.array([c.cost if c is not None else 0.0 for c, fewest, most in entries], dtype=float),
+                             np.array([fewest for c, fewest, most in entries], dtype=float),
+                             np.array([most for c, fewest, most in entries], dtype=float))
+        return arrays
+
+    def price(self, weights):
+        # [(reduced cost, pattern)] with one pattern per server that has an entry for every
+        # group; weights are the duals mapped onto patternResources
+        if self.arrays is None:
+            self.arrays = [self.optionArrays(options) for options in self.options]
+        patterns = []
+        for server, options, arrays in zip(self.servers, self.options, self.arrays):
+            if any(not entries for entries in options.values()):
+                continue
+            base = np.zeros(len(patternResources))
+            base[patternResources.index("serverCount")] = 1
+            base[patternResources.index("nodeCount")] = server.nodes
+            base[patternResources.index("rackUnits")] = server.rackUnits
+            base[patternResources.index("watts")] = server.watts
+            reducedCost = server.configuredCost - base @ weights
+            choices = []
+            for group, (units, cost, fewest, most) in arrays.items():
+                unit = cost - units @ weights
+                counts = np.where(unit >= 0, fewest, most)
+                best = int(np.argmin(counts * unit))
+                reducedCost += server.nodes * counts[best] * unit[best]
+                component = options[group][best][0]
+                if component is not None:
+                    choices.append((group, component, int(counts[best])))
+            patterns.append((reducedCost, NodePattern(server, choices)))
+        return patterns
+
+
+def patternVariants(pattern, options):
+    # Patterns differing from pattern in one group, with any entry of it at either end of its range
+    chosen = dict((group, (c, count)) for group, c, count in pattern.choices)
+    for group, entries in options.items():
+        for component, fewest, most in entries:
+            for count in sorted(set([fewest, most])):
+                variant = dict(chosen)
+                variant.pop(group, None)
+                if component is not None:
+                    variant[group] = (component, count)
+                yield NodePattern(pattern.server, [(g,) + variant[g] for g in options if g in variant])
+
+
+def distinctLimits(p):
+    # (limit, groups) for every limit on distinct entries a configuration may use
+    limits = [(p["maxDistinctServerTypes"], ["servers"])]
+    limits += [(p[name], [group]) for group, name in patternGroups.items()]
+    limits.append((p["maxDistinctDisks"], allDisks))
+    return limits
+
+
+def columnGeneration(catalog=None, inputs=None, env=None, maxIterations=200, variantDives=3, started=None):
+    # Chooses how many servers of each node pattern to buy, so every node can actually be
+    # built (the ILP only checks slots and per node limits in total). The LP over the
+    # patterns found so far is solved and the pricer adds the patterns its duals say are
+    # worth having until there are none; its value is a lower bound. The LP ignores the
+    # limits on distinct entries, so they are met by diving: for each limit the entries
+    # the LP uses most are kept, the others removed, and the LP solved again. With one
+    # server type there is a dive per server type. The integer problem over all patterns
+    # found, with the limits, gives the configuration. Patterns one entry away from the
+    # ones the variantDives cheapest dives ended on are offered to it as well.
+    # This is a heuristic: the status is GRB.OPTIMAL only when the configuration costs no
+    # more than the bound, HEURISTIC otherwise, also when it found no configuration, which
+    # does not mean there is none. gap is (objVal - bound) / objVal. The master LP and the
+    # integer problem share timeLimit, counted from started; when it runs out the patterns
+    # found so far go to the integer problem and the status is GRB.TIME_LIMIT. mipGap and
+    # the tuning profile apply to both models.
+    p = inputs or currentInputs()
+    catalog = catalog or loadCatalog()
+    groups, racks = buildGroups(catalog, p)
+    groups, merged, conflicts = mergeDuplicates(groups)
+    if p["pruneDominated"]:
+        groups, pruned = removeDominated(groups, p)
+    pricer = PatternPricer(groups, p)
+    rows = masterRows(p)
+    rowNames = [rowName for rowName, coefs, sense, rhs in rows]
+    W = np.array([[coefs.get(name, 0.0) for name in patternResources] for rowName, coefs, sense, rhs in rows])
+    senses = np.array([sense for rowName, coefs, sense, rhs in rows])
+    rhs = np.array([rhs for rowName, coefs, sense, rhs in rows], dtype=float)
+    rackCost = np.array([p["rackCostScalingFactor"] * (r.networkCost + r.costPerMonth * 12 * r.timeHorizonYears) for r in racks])
+    rackRows = np.zeros((len(rows), len(racks)))
+    rackRows[rowNames.index("maxRackUnits")] = [-r.availableRackUnits for r in racks]
+    rackRows[rowNames.index("maxWatts")] = [-r.availableWatts for r in racks]
+
+    ##### Restricted master LP #####
+    started = started if started is not None else time.perf_counter()
+    m = gp.Model("columns", env=env) if env is not None else gp.Model("columns")
+    setSolveParams(m, p, "ILP", started)
+    timedOut = False
+    m.addMVar(len(racks), ub=1.0, obj=rackCost)
+    # Expensive slack on every >= row keeps the LP feasible before the patterns can cover it
+    covering = np.flatnonzero(senses == GRB.GREATER_EQUAL)
+    slack = m.addMVar(len(covering), obj=patternSlackCost)
+    S = sp.csr_matrix((np.ones(len(covering)), (covering, np.arange(len(covering)))), shape=(len(rows), len(covering)))
+    constrs = m.addMConstr(sp.hstack([sp.csr_matrix(rackRows), S], format="csr"), None, senses, rhs).tolist()
+    m.setAttr("ConstrName", constrs, rowNames)
+    patterns = []
+    patternVars = []
+    names = set()
+
+    def addPatterns(candidates):
+        added = 0
+        for reducedCost, pattern in candidates:
+            if pattern.name not in names and reducedCost < -1e-6:
+                column = W @ pattern.resources
+                nonzero = np.flatnonzero(column)
+                patternVars.append(m.addVar(obj=pattern.cost, column=gp.Column(column[nonzero].tolist(), [constrs[i] for i in nonzero]), name=pattern.name))
+                patterns.append(pattern)
+                names.add(pattern.name)
+                added += 1
+        return added
+
+    def solveMaster(pricer):
+        nonlocal timedOut
+        iterations = 0
+        while iterations < maxIterations and not timedOut:
+            iterations += 1
+            if p["timeLimit"] is not None:
+                setTimeLimit(m, p["timeLimit"], started)
+            m.optimize()
+            timedOut = m.Status == GRB.TIME_LIMIT
+            if m.Status != GRB.OPTIMAL:
+                break
+            weights = W.T @ np.array(m.getAttr("Pi", constrs))
+            if addPatterns(pricer.price(weights)) == 0:
+                break
+        return iterations
+
+    def covered():
+        return m.Status == GRB.OPTIMAL and slack.X.max(initial=0) < 1e-6
+
+    # The cheapest pattern of every server to start from
+    addPatterns([(-1, pattern) for reducedCost, pattern in pricer.price(np.zeros(len(patternResources)))])
+    iterations = solveMaster(pricer)
+    # Only a bound once the pricer has no pattern left to add
+    bound = m.ObjVal if covered() and iterations < maxIterations and not timedOut else None
+
+    ##### Diving #####
+    def restrict(pricer, limitGroups, keep):
+        for group in limitGroups:
+            pricer.restrict(group, set(identifier for g, identifier in keep if g == group))
+        for pattern, v in zip(patterns, patternVars):
+            if any(group in limitGroups and (group, c.identifier) not in keep for group, c, count in pattern.entries()):
+                v.UB = 0
+
+    # (LP value, patterns) each dive ended on; variants of the patterns of the cheapest
+    # dives are offered to the integer problem too
+    used = []
+
+    def dive(pricer):
+        iterations = solveMaster(pricer)
+        for limit, limitGroups in distinctLimits(p):
+            if not covered():
+                break
+            usage = {}
+            for pattern, x in zip(patterns, m.getAttr("X", patternVars)):
+                for group, component, count in pattern.entries():
+                    if group in limitGroups and x > 1e-9:
+                        key = (group, component.identifier)
+                        usage[key] = usage.get(key, 0.0) + x * count
+            if len(usage) > limit:
+                restrict(pricer, limitGroups, set(sorted(usage, key=usage.get, reverse=True)[:int(limit)]))
+                iterations += solveMaster(pricer)
+        if covered():
+            used.append((m.ObjVal, [pattern for pattern, x in zip(patterns, m.getAttr("X", patternVars)) if x > 1e-9]))
+        return iterations
+
+    if p["maxDistinctServerTypes"] == 1:
+        branches = [set([("servers", server.identifier)]) for server in pricer.servers]
+    else:
+        branches = [None]
+    for keep in branches:
+        branch = pricer.copy()
+        if keep is not None:
+            restrict(branch, ["servers"], keep)
+        iterations += dive(branch)
+        m.setAttr("UB", patternVars, [GRB.INFINITY] * len(patternVars))
+    options = dict((server.identifier, options) for server, options in zip(pricer.servers, pricer.options))
+    for pattern in sum([dived for value, dived in sorted(used, key=lambda entry: entry[0])[:variantDives]], []):
+        for variant in patternVariants(pattern, options[pattern.server.identifier]):
+            if variant.name not in names:
+                patterns.append(variant)
+                names.add(variant.name)
+
+    ##### Integer master #####
+    result = {"objVal": None, "bound": bound, "gap": None, "iterations": iterations, "patterns": {}, "configuration": {},
+              "status": HEURISTIC}
+    if not patterns:
+        m.dispose()
+        return result
+    ip = gp.Model("columns IP", env=env) if env is not None else gp.Model("columns IP")
+    counts = ip.addMVar(len(patterns), lb=0, ub=p["maxServers"], obj=[pattern.cost for pattern in patterns], vtype=GRB.INTEGER)
+    rackUse = ip.addMVar(len(racks), obj=rackCost, vtype=GRB.BINARY)
+    # Entries of the patterns; a pattern can only be bought when all of its entries are used
+    entries = {}
+    links = []
+    for j, pattern in enumerate(patterns):
+        for group, component, count in pattern.entries():
+            links.append((j, entries.setdefault((group, component.identifier), len(entries))))
+    ip.addMVar(len(entries), vtype=GRB.BINARY)
+    limits = distinctLimits(p)
+    P = np.array([pattern.resources for pattern in patterns])
+    n = np.arange(len(links))
+    A = sp.bmat([[sp.csr_matrix(W @ P.T), sp.csr_matrix(rackRows), sp.csr_matrix((len(rows), len(entries)))],
+                 [sp.csr_matrix((np.ones(len(links)), (n, [j for j, e in links])), shape=(len(links), len(patterns))), None,
+                  sp.csr_matrix((np.full(len(links), -float(p["maxServers"])), (n, [e for j, e in links])), shape=(len(links), len(entries)))],
+                 [None, None, sp.csr_matrix([[1.0 if group in limitGroups else 0.0 for group, identifier in entries] for limit, limitGroups in limits])]],
+                format="csr")
+    ip.addMConstr(A, None, np.concatenate([senses, [GRB.LESS_EQUAL] * (len(links) + len(limits))]),
+                  np.concatenate([rhs, np.zeros(len(links)), [limit for limit, limitGroups in limits]]))
+    previous = {}
+    for k, rack in enumerate(racks):
+        key = modelKey(rack)
+        if key in previous:
+            ip.addConstr(rackUse[k] <= rackUse[previous[key]], name="rack {} after rack {}".format(rack, racks[previous[key]]))
+        previous[key] = k
+    setSolveParams(ip, p, "ILP", started)
+    ip.optimize()
+
+    if timedOut or ip.Status == GRB.TIME_LIMIT:
+        result["status"] = GRB.TIME_LIMIT
+    if ip.SolCount > 0:
+        result["objVal"] = ip.ObjVal
+        if bound is not None:
+            result["gap"] = max(ip.ObjVal - bound, 0.0) / max(abs(ip.ObjVal), 1e-10)
+            if ip.Status == GRB.OPTIMAL and result["gap"] <= 1e-9:
+                result["status"] = GRB.OPTIMAL
+        configuration = {}
+        for pattern, x in zip(patterns, counts.X):
+            count = int(round(x, 0))
+            if count == 0:
+                continue
+            result["patterns"][pattern.name] = count
+            for group, component, total in pattern.entries():
+                configuration[component.baseVarName] = configuration.get(component.baseVarName, 0) + count * total
+        for rack, x in zip(racks, rackUse.X):
+            if x > 0.5:
+                configuration["rack " + rack.name] = 1
+        result["configuration"] = configuration
+    ip.dispose()
+    m.dispose()
+    return result
+
+
+##### Node index #####
+
+# Inputs the per node ranges of nodeOptions() and the racks depend on; an index is built
+# for one set of them
+nodeInputs = ["minAvgMemoryPerNode", "maxAvgMemoryPerNode", "fillAllDiskSlots", "maxDistinctNvmeDisks",
+              "minNetworkCardsPerServer", "maxNetworkCardsPerServer", "minNetworkConnectionsPerNode", "allowSiomCards",
+              "rackCostPerMonth", "serverCostTimeHorizonYears", "availableWattsPerRack"]
+
+# Dominance over every attribute a requirement can be put on, for an index that serves any query
+indexRules = {"cpus": (("cores", "gigaflops"), ()),
+              "memory": ((), ("memoryGB",)),
+              "disk25": (("tb", "iops", "streamMBs"), ("isHdd",)),
+              "disk35": (("tb", "iops", "streamMBs"), ("isHdd",)),
+              "diskNvme": (("tb", "iops", "streamMBs"), ("isHdd",)),
+              "siom": (("networkSpeed", "networkConnections"), ()),
+              "pciNetwork": (("networkSpeed", "networkConnections"), ())}
+
+indexColumns = [name for name in patternResources if name != "serverCount"]
+
+
+def nodeIndexPath(catalog, p):
+    key = hashlib.sha1(json.dumps([catalog.key] + [p[name] for name in nodeInputs]).encode("utf-8")).hexdigest()
+    return os.path.join(catalog.path or os.path.join(defaultCatalogDir, ".compiled", catalog.key), "nodeIndex", key)
+
+
+def optionCounts(group, fewest, most):
+    # Counts per node indexed for one entry: every count in its range, except that disk
+    # counts are indexed at both ends only (the ranges of the large chassis would multiply
+    # the index by up to 46 for each disk type)
+    if group in allDisks:
+        return sorted(set([fewest, most]))
+    return list(range(fewest, most + 1))
+
+
+def buildNodeIndex(catalog=None, inputs=None, path=None):
+    # Enumerates every server with all nodes configured the same (a NodePattern) over the
+    # catalog, without the entries another one is no worse than on every attribute, and
+    # writes the patterns sorted by cost. Returns the opened NodeIndex.
+    p = inputs or currentInputs()
+    catalog = catalog or loadCatalog()
+    path = path or nodeIndexPath(catalog, p)
+    groups, racks = buildGroups(catalog, p)
+    groups, merged, conflicts = mergeDuplicates(groups)
+    groups, pruned = removeDominated(groups, p, indexRules)
+    entryGroups = list(patternGroups)
+    names = dict((group, []) for group in entryGroups)
+    positions = {}
+    blocks = []
+    for s, server in enumerate(groups["servers"]):
+        options = nodeOptions(server, groups, p)
+        if any(not entries for entries in options.values()):
+            continue
+        # Per group: one row per (entry, count) with its resources, cost, entry and count
+        axes = []
+        for group in entryGroups:
+            resources, cost, entries, counts = [], [], [], []
+            for component, fewest, most in options[group]:
+                if component is not None and (group, component.baseVarName) not in positions:
+                    positions[(group, component.baseVarName)] = len(names[group])
+                    names[group].append(component.baseVarName)
+                unit = unitResources(component) if component is not None else {}
+                for count in optionCounts(group, fewest, most) if component is not None else [0]:
+                    resources.append([count * unit.get(name, 0.0) for name in indexColumns])
+                    cost.append(count * component.cost if component is not None else 0.0)
+                    entries.append(positions[(group, component.baseVarName)] if component is not None else -1)
+                    counts.append(count)
+            axes.append((np.array(resources, dtype=float), np.array(cost), np.array(entries), np.array(counts)))
+        choice = np.indices([len(axis[1]) for axis in axes]).reshape(len(axes), -1)
+        block = {"server": np.full(choice.shape[1], s), "cost": np.full(choice.shape[1], server.configuredCost, dtype=float)}
+        resources = np.zeros((choice.shape[1], len(indexColumns)))
+        for group, (resource, cost, entries, counts), picked in zip(entryGroups, axes, choice):
+            resources += server.nodes * resource[picked]
+            block["cost"] += server.nodes * cost[picked]
+            block[group] = entries[picked]
+            block[group + "Count"] = counts[picked]
+        for name, value in [("nodeCount", server.nodes), ("rackUnits", server.rackUnits), ("watts", server.watts)]:
+            resources[:, indexColumns.index(name)] += value
+        for k, name in enumerate(indexColumns):
+            block[name] = resources[:, k]
+        blocks.append(block)
+
+    columns = {}
+    order = np.argsort(np.concatenate([block["cost"] for block in blocks]), kind="stable") if blocks else np.zeros(0, dtype=int)
+    choiceColumns = ["server"] + sum([[group, group + "Count"] for group in entryGroups], [])
+    for name in ["cost"] + indexColumns + choiceColumns:
+        values = np.concatenate([block[name] for block in blocks]) if blocks else np.zeros(0)
+        columns[name] = values[order].astype(np.int16 if name in choiceColumns else np.float64)
+    manifest = {"catalogKey": catalog.key, "inputs": dict((name, p[name]) for name in nodeInputs), "groups": entryGroups,
+                "names": dict(names, servers=[{"name": server.baseVarName, "nodes": server.nodes} for server in groups["servers"]]),
+                "racks": [dict((attr, getattr(rack, attr)) for attr in ("name",) + Rack.modelAttributes) for rack in racks]}
+    return openNodeIndex(writeIndex(path, columns, manifest))
+
+
+def loadNodeIndex(catalog=None, inputs=None):
+    # The index for the catalog and per node inputs, built the first time it is asked for
+    p = inputs or currentInputs()
+    catalog = catalog or loadCatalog()
+    path = nodeIndexPath(catalog, p)
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        return openNodeIndex(path)
+    return buildNodeIndex(catalog, p, path)
+
+
+##### Pareto frontier #####
+
+# Capacity built in buildIlp() -> (requirement input, its row)
+frontierMetrics = {"gigaflops": ("minGigaflops", "minGigaflops"),
+                   "diskTB": ("minDiskTB", "minimumTerabytes"),
+                   "memoryGB": ("minMemory", "minMemory"),
+                   "networkSpeed": ("minTotalNetworkSpeedGigabits", "minTotalNetworkSpeed")}
+
+
+class FrontierModel:
+    # One ILP re-solved for many requirement levels: a level only changes the RHS of the
+    # metric's requirement row (the epsilon constraint on the cost objective) and each solve
+    # starts from the solution of a point that is feasible for it.
+
+    def __init__(self, env, catalog, p, metrics):
+        for metric in metrics:
+            if metric not in frontierMetrics:
+                raise ValueError("unknown frontier metric " + str(metric))
+        # Entries pruned without a metric's requirement may be on the frontier for it
+        built = dict(p, **dict((frontierMetrics[metric][0], max(p[frontierMetrics[metric][0]], 1)) for metric in metrics))
+        self.m = gp.Model("ILP frontier", env=env)
+        self.b = buildMatrix(self.m, catalog, built, p["pruneDominated"], p["tightenBounds"], p["linkingConstraints"])
+        self.exprs = buildIlp(self.b, built)
+        self.cost = self.b.linExpr(self.exprs["cost"])
+        self.p = p
+
+    def capacity(self, x):
+        return dict((metric, float((self.exprs[metric] @ x)[0])) for metric in frontierMetrics)
+
+    def solve(self, levels, start=None):
+        # Cheapest configuration with every metric in levels at least its level, as a point
+        # {"levels", "cost", "capacity", "configuration"}, or None when there is none
+        for metric, (name, constrName) in frontierMetrics.items():
+            self.b.constrs[constrName].RHS = levels.get(metric, self.p[name])
+        if start is not None:
+            self.m.setAttr("Start", self.b.vars, start.tolist())
+        self.m.optimize()
+        if self.m.SolCount == 0:
+            return None
+        x = np.array(self.m.getAttr("X", self.b.vars))
+        return {"levels": dict(levels), "cost": self.m.ObjVal, "capacity": self.capacity(x),
+                "configuration": solvedConfiguration(self.m, self.b.vars), "x": x}
+
+    def maximum(self, metric, levels):
+        # Largest metric reachable with the other levels met, ignoring cost
+        for other, (name, constrName) in frontierMetrics.items():
+            self.b.constrs[constrName].RHS = levels.get(other, self.p[name]) if other != metric else 0
+        self.m.setObjective(self.b.linExpr(self.exprs[metric]), GRB.MAXIMIZE)
+        self.m.optimize()
+        best = self.m.ObjVal if self.m.SolCount > 0 else None
+        self.m.setObjective(self.cost, GRB.MINIMIZE)
+        return best
+
+    def trace(self, metric, low, high, levels=None, resolution=0.01, costTolerance=0.001, maxPoints=50):
+        # Frontier points of cost against metric on [low, high] with the other metrics at
+        # levels. Both ends are solved, then the gap between neighbouring points is bisected
+        # until the cheaper point already reaches the next level, the cost difference is
+        # below costTolerance (relative) or the levels are closer than resolution * (high - low).
+        # A solve a time limit ends without a configuration leaves its interval unsplit.
+        levels = dict(levels or {})
+
+        def solve(level, start=None):
+            return self.solve(dict(levels, **{metric: float(level)}), start)
+
+        last = solve(high)
+        if last is None:
+            return []
+        first = solve(low, last["x"])
+        if first is None:
+            return [last]
+        points = [first, last]
+        pending = [(first, last)]
+        step = resolution * max(high - low, 1e-9)
+        while pending and len(points) < maxPoints:
+            left, right = pending.pop()
+            reached = left["capacity"][metric]
+            if reached >= right["levels"][metric] - step or right["cost"] - left["cost"] <= costTolerance * abs(right["cost"]):
+                continue
+            # The right point meets every level in between, so it is a feasible start
+            middle = solve((reached + right["levels"][metric]) / 2, right["x"])
+            if middle is None:
+                continue
+            points.append(middle)
+            pending.extend([(left, middle), (middle, right)])
+        return points
+
+
+def frontierSegment(p, metrics, segment, resolution, costTolerance, maxPoints):
+    # Traces one segment in a worker: {"metric", "low", "high", "levels"}, with high capped
+    # at (or, when None, set to) the most the model can reach at those levels
+    model = FrontierModel(workerEnv, workerCatalog, p, metrics)
+    try:
+        reachable = model.maximum(segment["metric"], segment["levels"])
+        if reachable is None or reachable < segment["low"]:
+            return []
+        high = reachable if segment["high"] is None else min(segment["high"], reachable)
+        points = model.trace(segment["metric"], segment["low"], high, segment["levels"], resolution, costTolerance, maxPoints)
+    finally:
+        model.m.dispose()
+    for point in points:
+        del point["x"]
+    return points
+
+
+def paretoPoints(points, metrics):
+    # Points no other point beats on cost and all metrics, cheapest first
+    points = sorted(points, key=lambda point: (point["cost"], [-point["capacity"][metric] for metric in metrics]))
+    frontier = []
+    for point in points:
+        if not any(all(other["capacity"][metric] >= point["capacity"][metric] - 1e-9 for metric in metrics) for other in frontier):
+            frontier.append(point)
+    return frontier
+
+
+def paretoFrontier(metrics, inputs=None, low=None, high=None, levels=5, segments=None, workers=None, threads=1,
+                   catalogDir=None, params=None, resolution=0.01, costTolerance=0.001, maxPoints=50, catalog=None, env=None):
+    # Cost against one or two of frontierMetrics, e.g. paretoFrontier(["gigaflops"]) or
+    # paretoFrontier(["diskTB", "memoryGB"]). The first metric is traced from low (default:
+    # its current requirement) to high (default: the most reachable); a second metric is held
+    # at levels values spread over its own range. The range (or every level) is split into
+    # independent segments solved in a process pool, each on one persistent model.
+    # catalog (a Catalog) wins over catalogDir; env is only used for the range, as workers
+    # start their own from threads and params.
+    # Returns the non-dominated points [{"cost", "capacity": {metric: value}, "levels",
+    # "configuration"}], cheapest first.
+    metrics = list(metrics)
+    if not 1 <= len(metrics) <= 2:
+        raise ValueError("a frontier takes one or two metrics")
+    p = inputs or currentInputs()
+    catalog = catalog or (loadCatalog(catalogDir) if catalogDir else loadCatalog())
+    metric = metrics[0]
+    low = p[frontierMetrics[metric][0]] if low is None else low
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    segmentList = []
+    ownEnv = env is None
+    env = env or quietEnv(threads, params)
+    model = FrontierModel(env, catalog, p, metrics)
+    try:
+        if len(metrics) == 1:
+            high = model.maximum(metric, {}) if high is None else high
+            if high is None or high < low:
+                return []
+            count = segments or workers
+            bounds = np.linspace(low, high, count + 1)
+            segmentList = [{"metric": metric, "low": float(a), "high": float(b), "levels": {}} for a, b in zip(bounds[:-1], bounds[1:])]
+        else:
+            other = metrics[1]
+            otherLow = p[frontierMetrics[other][0]]
+            otherHigh = model.maximum(other, {})
+            if otherHigh is None or otherHigh < otherLow:
+                return []
+            for level in np.linspace(otherLow, otherHigh, levels):
+                segmentList.append({"metric": metric, "low": low, "high": high, "levels": {other: float(level)}})
+    finally:
+        model.m.dispose()
+        if ownEnv:
+            env.dispose()
+    points = []
+    with ProcessPoolExecutor(min(workers, len(segmentList)), initializer=startDecompositionWorker,
+                             initargs=(threads, catalog, params)) as pool:
+        futures = [pool.submit(frontierSegment, p, metrics, segment, resolution, costTolerance, maxPoints) for segment in segmentList]
+        for future in as_completed(futures):
+            points.extend(future.result())
+    return paretoPoints(points, metrics)
+
+
+##### Capacity planning #####
+
+def periodCost(b):
+    # Unit cost of every count variable of b
+    return b.values(list(b.groups), lambda c: c.configuredCost if isinstance(c, Server) else c.cost)
+
+
+def buildPlanningWindow(m, catalog, periods, first, installed, monthsPerPeriod, discountRate):
+    # Builds one copy of the ILP per period in periods (the inputs of consecutive periods,
+    # the first with index first) in m. Each period's counts, uses and racks are at least
+    # the previous period's and the first period's at least installed (the vars of the
+    # last period solved, None before the first). The objective is the discounted cost of
+    # what each period adds plus the rack rent of every period. Returns the builders.
+    builders = []
+    objective = 0
+    for k, p in enumerate(periods):
+        b = buildMatrix(m, catalog, p, False, p["tightenBounds"], p["linkingConstraints"])
+        buildIlp(b, p)
+        if builders:
+            previous = builders[-1]
+            A = sp.hstack([sp.identity(b.size, format="csr"), -sp.identity(b.size, format="csr")], format="csr")
+            m.addMConstr(A, b.vars + previous.vars, np.full(b.size, GRB.GREATER_EQUAL), np.zeros(b.size))
+            before = (previous.count, previous.rack)
+        elif installed is not None:
+            m.setAttr("LB", b.vars, installed.tolist())
+            before = (installed[:b.n], installed[2 * b.n:])
+        else:
+            before = (np.zeros(b.n), np.zeros(len(b.racks)))
+        discount = (1.0 + discountRate) ** -(first + k)
+        scaling = p["rackCostScalingFactor"]
+        rent = b.rackValues("costPerMonth") * monthsPerPeriod
+        network = b.rackValues("networkCost")
+        objective = objective + discount * (periodCost(b) @ (b.count - before[0]) +
+                                            scaling * (network @ (b.rack - before[1]) + rent @ b.rack))
+        builders.append(b)
+    m.setObjective(objective, GRB.MINIMIZE)
+    return builders
+
+
+def groupEntries(b, counts):
+    entries = []
+    for group, components in b.groups.items():
+        for j, component in enumerate(components, b.start[group]):
+            if counts[j] > 0:
+                entries.append((group, component, int(counts[j])))
+    return entries
+
+
+def capacityPlan(forecast, inputs=None, catalog=None, env=None, window=2, monthsPerPeriod=3, discountRate=0.0):
+    # Plans purchases over len(forecast) periods, one dict of input overrides each (e.g.
+    # the minDiskTB and minGigaflops expected each quarter). Hardware bought stays
+    # installed. Racks cost p["rackCostScalingFactor"] times their network cost once and
+    # their rent every period they are used. Solved by rolling horizon: a MIP over window
+    # periods fixes the first one, then moves on by a period, starting from the previous
+    # window's plan. window=None solves all periods in one MIP.
+    # Returns {"periods": [...], "cost": discounted total, "infeasiblePeriod": index or None}.
+    base = inputs or currentInputs()
+    catalog = catalog or loadCatalog()
+    # Rent is charged per period instead of over serverCostTimeHorizonYears
+    periods = [dict(base, **dict(overrides, serverCostTimeHorizonYears=0)) for overrides in forecast]
+    step = 1 if window else len(periods)
+    window = window or len(periods)
+    installed = None
+    start = []
+    plan = {"periods": [], "cost": 0.0, "window": window, "infeasiblePeriod": None}
+    for t in range(0, len(periods), step):
+        started = time.perf_counter()
+        m = gp.Model("ILP plan", env=env) if env is not None else gp.Model("ILP plan")
+        builders = buildPlanningWindow(m, catalog, periods[t:t + window], t, installed, monthsPerPeriod, discountRate)
+        for b, x in zip(builders, start[1:] + start[-1:] * window):
+            m.setAttr("Start", b.vars, x.tolist())
+        m.optimize()
+        if m.SolCount == 0:
+            plan["infeasiblePeriod"] = t
+            m.dispose()
+            break
+        start = [np.round(np.array(m.getAttr("X", b.vars))) for b in builders]
+        for k in range(min(step, len(builders))):
+            period = plannedPeriod(builders[k], start[k], installed, periods[t + k], t + k, monthsPerPeriod, discountRate)
+            period.update(inputs=forecast[t + k], gap=m.MIPGap, seconds=(time.perf_counter() - started) / min(step, len(builders)))
+            plan["periods"].append(period)
+            plan["cost"] += period["discount"] * period["cost"]
+            installed = start[k]
+        m.dispose()
+    return plan
+
+
+def plannedPeriod(b, x, installed, p, t, monthsPerPeriod, discountRate):
+    # What period t of a solved planning window has installed, buys and costs
+    before = installed if installed is not None else np.zeros(b.size)
+    scaling = p["rackCostScalingFactor"]
+    racks = [rack for rack, used in zip(b.racks, x[2 * b.n:]) if used > 0.5]
+    newRacks = [rack for rack, used, was in zip(b.racks, x[2 * b.n:], before[2 * b.n:]) if used > 0.5 > was]
+    period = {"period": t, "installed": Solution(groupEntries(b, x), racks, rackCostScalingFactor=scaling),
+              "purchased": Solution(groupEntries(b, x - before), newRacks, rackCostScalingFactor=scaling),
+              "rackRent": scaling * sum(rack.costPerMonth * monthsPerPeriod for rack in racks),
+              "discount": (1.0 + discountRate) ** -t}
+    period["cost"] = period["purchased"].cost + period["rackRent"]
+    return period
 
 ##### inputs #####
 
-# Servers
-maxDistinctServerTypes = 1
-minServers = 0
-maxServers = 50
-
-# Memory
-maxDistinctMemory = 1
-minMemory = 10240
-maxAvgMemoryPerNode = 3000
-minAvgMemoryPerNode = 256
-
-# Cpus
-maxDistinctCpus = 1
-minCores = 0
-minGigaflops = 2300 + 700
-
-# Disk
-maxDistinctDisks = 3
-maxDistinct25Disks = 1
-maxDistinct35Disks = 1
-maxDistinctNvmeDisks = 0
-minDiskCount = 0
-minDiskTB = 1800
-minDiskIOPS = 0
-minDiskStreamMBs = 0
-minDiskHddIOPS = 0
-minDiskHddTB = 0
-minDiskFastIOPS = 0
-minDiskFastTB = 0
-fillAllDiskSlots = True
-
-# Netowrk
-minTotalNetworkSpeedGigabits = 4300
-minNetworkConnectionsPerNode = 2
-maxNetworkConnections = 10000
-maxDistinctNetworkCards = 1
-minNetworkCardsPerServer = 1
-maxNetworkCardsPerServer = 1
-allowSiomCards = False
-
-# Racks
-rackCostPerMonth = 2000
-serverCostTimeHorizonYears = 0
-availableWattsPerRack = 20000
-# Used to shut off rack costs
-rackCostScalingFactor = 0
-
-
-bestIlp = ilp()
-print(bestIlp)
+def userCacheDir(*names):
+    # Per-user directory for files kept between runs, outside the source tree
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "serverOptimization", *names)
+
+
+class Config:
+    # The inputs of ilp() and goalModel(). Every attribute is a default that an instance
+    # or currentInputs() overrides, e.g. config.minMemory = 20480 or Config(minMemory=20480).
+
+    # Servers
+    maxDistinctServerTypes = 1
+    minServers = 0
+    maxServers = 50
+
+    # Memory
+    maxDistinctMemory = 1
+    minMemory = 10240
+    maxAvgMemoryPerNode = 3000
+    minAvgMemoryPerNode = 256
+
+    # Cpus
+    maxDistinctCpus = 1
+    minCores = 0
+    minGigaflops = 2300 + 700
+
+    # Disk
+    maxDistinctDisks = 3
+    maxDistinct25Disks = 1
+    maxDistinct35Disks = 1
+    maxDistinctNvmeDisks = 0
+    minDiskCount = 0
+    minDiskTB = 1800
+    minDiskIOPS = 0
+    minDiskStreamMBs = 0
+    minDiskHddIOPS = 0
+    minDiskHddTB = 0
+    minDiskFastIOPS = 0
+    minDiskFastTB = 0
+    fillAllDiskSlots = True
+
+    # Netowrk
+    minTotalNetworkSpeedGigabits = 4300
+    minNetworkConnectionsPerNode = 2
+    maxNetworkConnections = 10000
+    maxDistinctNetworkCards = 1
+    minNetworkCardsPerServer = 1
+    maxNetworkCardsPerServer = 1
+    allowSiomCards = False
+
+    # Presolve
+    pruneDominated = True
+    # Bound every count by the server slots and use them as the big-M coefficients
+    tightenBounds = True
+    # "bigM" rows or "indicator" constraints between countVar and useVar
+    linkingConstraints = "bigM"
+
+    # Solver
+    # "auto" enumerates single type configurations without Gurobi and uses the ILP otherwise,
+    # "mip" always builds the ILP, "enumerate" fails for inputs it cannot enumerate,
+    # "decompose" solves one ILP per server type in parallel (see decomposeByServer()),
+    # "columns" buys whole node configurations so every node can be built (columnGeneration());
+    # it is a heuristic, see HEURISTIC
+    solverMode = "auto"
+    # Directory of solved configurations used as MIP starts, e.g. userCacheDir("warmstart");
+    # None (the default) to disable
+    warmStartPath = None
+    # JSON lines file each solve appends its progress trace to (see solveTrace.py), None to disable
+    tracePath = None
+    # Print the time and size of each build section, m.update(), presolve and optimize()
+    profileBuild = False
+    # Seconds a solve may take, building included, before it returns the best configuration
+    # found so far with its gap; None for no limit
+    timeLimit = None
+    # Relative gap at which a solve stops, None for Gurobi's default
+    mipGap = None
+    # Directory of the Gurobi parameter files tuning.py saves (ILP.prm, goals.prm), loaded
+    # before every solve; None to use the defaults
+    tuningPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tuning")
+    # Attach a Sensitivity to ILP solutions (auto then builds the ILP instead of enumerating)
+    sensitivity = False
+    # SQLite file of solved inputs (see solveCache.py) ilp() and goalProgramming() return
+    # without solving; None (the default) to always solve
+    cachePath = None
+    # Read the ILP from a compiled model saved under the compiled catalog instead of building
+    # it, compiling it the first time (see compiledIlp())
+    compileModels = False
+    # File goalProgramming() writes its model to (.lp, .mps, .mps.bz2, ...), None to write none
+    goalModelPath = None
+
+    # Racks
+    rackCostPerMonth = 2000
+    serverCostTimeHorizonYears = 0
+    availableWattsPerRack = 20000
+    # Used to shut off rack costs
+    rackCostScalingFactor = 0
+
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            if name not in inputNames:
+                raise ValueError("unknown input " + name)
+            setattr(self, name, value)
+
+    def inputs(self):
+        return dict((name, getattr(self, name)) for name in inputNames)
+
+
+inputNames = ["maxDistinctServerTypes", "minServers", "maxServers",
+              "maxDistinctMemory", "minMemory", "maxAvgMemoryPerNode", "minAvgMemoryPerNode",
+              "maxDistinctCpus", "minCores", "minGigaflops",
+              "maxDistinctDisks", "maxDistinct25Disks", "maxDistinct35Disks", "maxDistinctNvmeDisks",
+              "minDiskCount", "minDiskTB", "minDiskIOPS", "minDiskStreamMBs", "minDiskHddIOPS",
+              "minDiskHddTB", "minDiskFastIOPS", "minDiskFastTB", "fillAllDiskSlots",
+              "minTotalNetworkSpeedGigabits", "minNetworkConnectionsPerNode", "maxNetworkConnections",
+              "maxDistinctNetworkCards", "minNetworkCardsPerServer", "maxNetworkCardsPerServer", "allowSiomCards",
+              "pruneDominated", "tightenBounds", "linkingConstraints", "solverMode", "warmStartPath", "tracePath", "profileBuild",
+              "timeLimit", "mipGap", "tuningPath", "sensitivity", "cachePath", "compileModels", "goalModelPath",
+              "rackCostPerMonth", "serverCostTimeHorizonYears", "availableWattsPerRack", "rackCostScalingFactor"]
+
+
+# Inputs of the module level functions; scripts set config.minMemory etc. before solving
+config = Config()
+
+
+def currentInputs(overrides=None):
+    inputs = config.inputs()
+    for name, value in (overrides or {}).items():
+        if name not in inputs:
+            raise ValueError("unknown input " + name)
+        inputs[name] = value
+    return inputs
 
 
 class Goal:
-    def __init__(self, model, name, goal, nWeight=0, pWeight=0, nBound=-1, pBound=-1):
+    def __init__(self, model, name, goal, nWeight=0, pWeight=0, nBound=-1, pBound=-1, priority=0):
         self.model = model
         self.name = name
         self.goal = goal
+        # Level of the goal when Goals.hierarchical is set; higher levels are optimized first
+        self.priority = priority
         self.negativeDeviationWeight = nWeight
         self.positiveDeviationWeight = pWeight
         self.negativeDeviationBound = nBound
         self.positiveDeviationBound = pBound
         self.negativeDeviation = None
         self.positiveDeviation = None
-        self.linExpr = LinExpr()
-        self.objective = LinExpr()
+        self.linExpr = gp.LinExpr()
+        self.objective = gp.LinExpr()
+        # The deviations the weights penalize, scaled by the goal but not weighted
+        self.levelObjective = gp.LinExpr()
         self.min = None
         self.max = None
 
     def finalize(self):
         if self.min is not None:
-            self.model.addConstr(self.linExpr, GRB.GREATER_EQUAL, self.min, "min " + self.name)
+            self.model.addLConstr(self.linExpr, GRB.GREATER_EQUAL, self.min, "min " + self.name)
         if self.max is not None:
-            self.model.addConstr(self.linExpr, GRB.LESS_EQUAL, self.max, "max " + self.name)
-        if isinstance(self.goal, LinExpr):
-            self.model.addConstr(self.linExpr, GRB.EQUAL, self.goal, "equal " + self.name)
+            self.model.addLConstr(self.linExpr, GRB.LESS_EQUAL, self.max, "max " + self.name)
+        if isinstance(self.goal, gp.LinExpr):
+            self.model.addLConstr(self.linExpr, GRB.EQUAL, self.goal, "equal " + self.name)
         elif self.goal is not None:
             if self.negativeDeviationBound >= 0:
                 self.negativeDeviation = self.model.addVar(lb=0, ub=self.negativeDeviationBound, vtype=GRB.INTEGER, name=self.name + " negative deviation")
@@ -619,12 +2366,18 @@ class Goal:
                 self.positiveDeviation = self.model.addVar(lb=0, ub=self.positiveDeviationBound, vtype=GRB.INTEGER, name=self.name + " positive deviation")
             else:
                 self.positiveDeviation = self.model.addVar(lb=0, vtype=GRB.INTEGER, name=self.name + " positive deviation")
+            # At most one deviation is nonzero, so each is the goal's real distance even in
+            # a direction no objective level penalizes
+            self.model.addSOS(GRB.SOS_TYPE1, [self.negativeDeviation, self.positiveDeviation])
             self.linExpr = self.linExpr + self.negativeDeviation - self.positiveDeviation
-            self.model.addConstr(self.linExpr, GRB.EQUAL, self.goal, "goal " + self.name)
+            self.model.addLConstr(self.linExpr, GRB.EQUAL, self.goal, "goal " + self.name)
             if self.goal != 0:
                 self.objective = (self.negativeDeviationWeight / float(self.goal)) * self.negativeDeviation + (self.positiveDeviationWeight / float(self.goal)) * self.positiveDeviation
             else:
                 self.objective = self.negativeDeviationWeight * self.negativeDeviation + self.positiveDeviationWeight * self.positiveDeviation
+            scale = 1.0 / abs(self.goal) if self.goal != 0 else 1.0
+            self.levelObjective = (self.negativeDeviationWeight > 0) * scale * self.negativeDeviation + \
+                (self.positiveDeviationWeight > 0) * scale * self.positiveDeviation
         return self.objective
 
     def add(self, other):
@@ -653,10 +2406,10 @@ class Goal:
 
 class Goals:
 
-    def __init__(self, name):
-        m = Model(name)
+    def __init__(self, name, env=None):
+        m = gp.Model(name, env=env)
         self.model = m
-        self.cost = Goal(m, "cost", goal=400000, pWeight=4000)  # 432304
+        self.cost = Goal(m, "cost", goal=400000, pWeight=4000, priority=1)  # 432304
 
         # Servers
         self.distinctServerTypes = Goal(m, "distinctServerTypes", goal=1, pWeight=1, pBound=0)
@@ -666,13 +2419,13 @@ class Goals:
         # Memory
         # True Constraint
         self.distinctMemoryTypes = Goal(m, "distinctMemoryTypes", goal=1, pWeight=1, pBound=0)
-        self.memoryGB = Goal(m, "memoryGB", goal=10240, nWeight=10000000, nBound=1000)
+        self.memoryGB = Goal(m, "memoryGB", goal=10240, nWeight=10000000, nBound=1000, priority=2)
         # self.avgMemoryPerNode = Goal(m, "avgMemoryPerNode", goal=256, nWeight=1, pWeight=1, nBound=128, pBound=3000)
 
         # Cpus
         self.distinctCpuTypes = Goal(m, "distinctCpuTypes", goal=1, pWeight=1, pBound=0)
-        self.cpuCores = Goal(m, "cpuCores", goal=0, nWeight=1000000)
-        self.cpuGigaflops = Goal(m, "cpuGigaflops", goal=3000, nWeight=300000, nBound=10000)
+        self.cpuCores = Goal(m, "cpuCores", goal=0, nWeight=1000000, priority=2)
+        self.cpuGigaflops = Goal(m, "cpuGigaflops", goal=3000, nWeight=300000, nBound=10000, priority=2)
 
         # Disk
         self.distinctDiskTypes = Goal(m, "distinctDiskTypes", goal=2, pWeight=1, pBound=0)
@@ -683,7 +2436,7 @@ class Goals:
         self.disk25Count = Goal(m, "disk25Count", goal=0)
         self.disk35Count = Goal(m, "disk35Count", goal=0)
         self.diskNvmeCount = Goal(m, "diskNvmeCount", goal=0)
-        self.diskTB = Goal(m, "diskTB", goal=1800, nWeight=1000000, nBound=1800)
+        self.diskTB = Goal(m, "diskTB", goal=1800, nWeight=1000000, nBound=1800, priority=2)
         self.diskIOPS = Goal(m, "diskIOPS", goal=0, nWeight=1)
         self.diskStreamMBs = Goal(m, "streamMBs", goal=10000, nWeight=1, nBound=0)
         self.diskHddIOPS = Goal(m, "diskHddIOPS", goal=0, nWeight=1, nBound=0)
@@ -711,167 +2464,225 @@ class Goals:
         # Used to shut off rack costs
         self.rackCostScalingFactor = 0
 
+        # Optimize the goals level by level (by Goal.priority, highest first) instead of one
+        # weighted sum. Within a level the deviations are summed without their weights.
+        self.hierarchical = False
+        # priority -> {"absTol": ..., "relTol": ...}: how much a level's optimum may be given
+        # up for the levels below it (Gurobi's ObjNAbsTol/ObjNRelTol)
+        self.levelTolerances = {}
+
+    def inputs(self):
+        # Goal targets and plain settings, used to find the closest saved solution
+        inputs = {}
+        for attr, value in vars(self).items():
+            if isinstance(value, Goal):
+                if isinstance(value.goal, (int, float)):
+                    inputs[attr] = value.goal
+            elif isinstance(value, (int, float, str)):
+                inputs[attr] = value
+        return inputs
+
+    def settings(self):
+        # Every goal's target, weights, bounds and priority and every plain setting, the
+        # key of the solve cache. None once the model is built and targets are expressions.
+        settings = {"hierarchical": self.hierarchical, "levelTolerances": self.levelTolerances}
+        for attr, value in vars(self).items():
+            if isinstance(value, Goal):
+                if value.goal is not None and not isinstance(value.goal, (int, float)):
+                    return None
+                settings[attr] = [value.goal, value.negativeDeviationWeight, value.positiveDeviationWeight,
+                                  value.negativeDeviationBound, value.positiveDeviationBound, value.priority]
+            elif isinstance(value, (int, float, str)):
+                settings[attr] = value
+        return settings
+
+    def goals(self):
+        return [value for value in vars(self).values() if isinstance(value, Goal)]
+
     def finalize(self):
-        allGoals = [attr for attr in dir(self) if isinstance(getattr(self, attr), Goal)]
-        objective = LinExpr()
-        for goal in allGoals:
-            objective = objective + getattr(self, goal).finalize()
+        objective = gp.LinExpr()
+        for goal in self.goals():
+            objective = objective + goal.finalize()
         return objective
 
-
-def goalProgramming(i):
+    def setObjective(self):
+        # Finalizes every goal and sets the weighted sum as the objective, or with
+        # hierarchical one objective per priority level in a single optimize()
+        m = self.model
+        objective = self.finalize()
+        if not self.hierarchical:
+            m.setObjective(objective, GRB.MINIMIZE)
+            return
+        levels = {}
+        for goal in self.goals():
+            levels[goal.priority] = levels.get(goal.priority, gp.LinExpr()) + goal.levelObjective
+        m.ModelSense = GRB.MINIMIZE
+        for index, priority in enumerate(sorted(levels, reverse=True)):
+            tolerance = self.levelTolerances.get(priority, {})
+            m.setObjectiveN(levels[priority], index, priority=priority, abstol=tolerance.get("absTol", 1e-6),
+                            reltol=tolerance.get("relTol", 0), name="priority {}".format(priority))
+
+
+def goalModel(i, catalog=None, profile=None):
+    # Adds the rows and objective of goalProgramming() to i.model without solving it,
+    # timing each section with profile like ilpModel()
     m = i.model
-    cpus, memory, disk25, disk35, diskNvme, siom, pciNetwork, servers, racks = buildVars(m)
+    if profile is not None:
+        profile.mark("catalog")
+    # The racks are built from the goals' rack settings, not the module inputs
+    rackInputs = ["rackCostPerMonth", "serverCostTimeHorizonYears", "availableWattsPerRack"]
+    b = buildMatrix(m, catalog, currentInputs(dict((name, getattr(i, name)) for name in rackInputs)))
+    b.profile = profile
 
     ##### Server #####
+    b.section("Server")
+    s = serverRows(b)
+    cost = s["cost"]
 
-    serverCpuSlots = LinExpr()
-    serverMemorySlots = LinExpr()
-    serverMinMemorySlots = LinExpr()
-    server25DiskSlots = LinExpr()
-    server35DiskSlots = LinExpr()
-    serverNvmeSlots = LinExpr()
-    min25Disks = LinExpr()
-    min35Disks = LinExpr()
-    maxSiomCards = LinExpr()
-    maxPciNetworkCards = LinExpr()
-    for server in servers:
-        i.serverCount.add(server.countVar)
-        i.distinctServerTypes.add(server.useVar)
-        i.nodeCount.add(server.countVar * server.nodes)
-        i.rackUnits.add(server.countVar * server.rackUnits)
-        i.watts.add(server.countVar * server.watts)
-        i.cost.add(server.countVar * server.configuredCost)
-
-        serverCpuSlots = serverCpuSlots + server.countVar * (server.cpuSlots * server.nodes)
-        serverMemorySlots = serverMemorySlots + server.countVar * (server.memorySlots * server.nodes)
-        serverMinMemorySlots = serverMinMemorySlots + server.countVar * (server.minMemorySlots * server.nodes)
-        server25DiskSlots = server25DiskSlots + server.countVar * (server.disk25Slots * server.nodes)
-        min25Disks = min25Disks + server.countVar * (server.minimum25Disks * server.nodes)
-        server35DiskSlots = server35DiskSlots + server.countVar * (server.disk35Slots * server.nodes)
-        min35Disks = min35Disks + server.countVar * (server.minimum35Disks * server.nodes)
-        serverNvmeSlots = serverNvmeSlots + server.countVar * (server.nvmeSlots * server.nodes)
-        maxSiomCards = maxSiomCards + server.countVar * (server.siomCards * server.nodes)
-        maxPciNetworkCards = maxPciNetworkCards + server.countVar * ((server.pcieV3X16Slots + server.pcieV3X8Slots) * server.nodes)
+    i.serverCount.add(b.linExpr(s["serverCount"]))
+    i.distinctServerTypes.add(b.linExpr(s["serverTypes"]))
+    i.nodeCount.add(b.linExpr(s["nodeCount"]))
+    i.rackUnits.add(b.linExpr(s["rackUnits"]))
+    i.watts.add(b.linExpr(s["watts"]))
 
     ##### Racks #####
+    b.section("Racks")
+
+    rackOrder(b)
+    i.racks.add(b.linExpr(b.rackExpr()))
+    cost = cost + rackCosts(b, i.rackCostScalingFactor)
 
-    maxRackUnits = LinExpr()
-    maxWatts = LinExpr()
-    previousRack = None
-    for rack in racks:
-        if previousRack is not None:
-            m.addConstr(rack.useVar, GRB.LESS_EQUAL, previousRack.useVar, "rack {} after rack {}".format(rack, previousRack))
-        #previousRack = rack
-        i.racks.add(rack.useVar)
-        maxRackUnits = maxRackUnits + rack.useVar * rack.availableRackUnits
-        maxWatts = maxWatts + rack.useVar * rack.availableWatts
-        i.cost.add(rack.useVar * i.rackCostScalingFactor * (rack.networkCost + (rack.costPerMonth * 12 * rack.timeHorizonYears)))
-
-    i.rackUnits.setMax(maxRackUnits)
-    i.watts.setMax(maxWatts)
+    i.rackUnits.setMax(b.linExpr(b.rackExpr(b.rackValues("availableRackUnits"))))
+    i.watts.setMax(b.linExpr(b.rackExpr(b.rackValues("availableWatts"))))
 
     ##### CPU #####
-    cpuCount = LinExpr()
-    for cpu in cpus:
-        i.distinctCpuTypes.add(cpu.useVar)
-        i.cpuCores.add(cpu.countVar * cpu.cores)
-        i.cpuGigaflops.add(cpu.countVar * (cpu.cores * cpu.ghz))
-        i.cost.add(cpu.countVar * cpu.cost)
-        cpuCount = cpuCount + cpu.countVar
+    b.section("CPU")
+    i.distinctCpuTypes.add(b.linExpr(b.useExpr("cpus")))
+    i.cpuCores.add(b.linExpr(b.countExpr("cpus", b.values("cpus", "cores"))))
+    i.cpuGigaflops.add(b.linExpr(b.countExpr("cpus", b.values("cpus", "cores") * b.values("cpus", "ghz"))))
+    cost = cost + b.countExpr("cpus", b.values("cpus", "cost"))
 
-    m.addConstr(serverCpuSlots, GRB.EQUAL, cpuCount, "fillCpuSlots")
+    b.addConstr(s["serverCpuSlots"] - b.countExpr("cpus"), GRB.EQUAL, 0, "fillCpuSlots")
 
     ##### Memory #####
-    memorySlots = LinExpr()
-    for mem in memory:
-        i.distinctMemoryTypes.add(mem.useVar)
-        i.memoryGB.add(mem.countVar * mem.memoryGB)
-        i.cost.add(mem.countVar * mem.cost)
-        memorySlots = memorySlots + mem.countVar
+    b.section("Memory")
+    memorySlots = b.countExpr("memory")
+    i.distinctMemoryTypes.add(b.linExpr(b.useExpr("memory")))
+    i.memoryGB.add(b.linExpr(b.countExpr("memory", b.values("memory", "memoryGB"))))
+    cost = cost + b.countExpr("memory", b.values("memory", "cost"))
 
-    m.addConstr(memorySlots, GRB.LESS_EQUAL, serverMemorySlots, "maxMemorySlotsAvailable")
-    m.addConstr(memorySlots, GRB.GREATER_EQUAL, serverMinMemorySlots, "minMemorySlotsRequiredByServers")
+    b.addConstr(memorySlots - s["serverMemorySlots"], GRB.LESS_EQUAL, 0, "maxMemorySlotsAvailable")
+    b.addConstr(memorySlots - s["serverMinMemorySlots"], GRB.GREATER_EQUAL, 0, "minMemorySlotsRequiredByServers")
 
     ##### Disk #####
-    allDisks = []
-    allDisks.extend(disk25)
-    allDisks.extend(disk35)
-    allDisks.extend(diskNvme)
-
-    for disk in disk25:
-        i.disk25Count.add(disk.countVar)
-        i.distinct25DiskTypes.add(disk.useVar)
-    for disk in disk35:
-        i.disk35Count.add(disk.countVar)
-        i.distinct35DiskTypes.add(disk.useVar)
-    for disk in diskNvme:
-        i.diskNvmeCount.add(disk.countVar)
-        i.distinctNvmeDiskTypes.add(disk.useVar)
-
-    for disk in allDisks:
-        i.distinctDiskTypes.add(disk.useVar)
-        i.diskCount.add(disk.countVar)
-        i.diskTB.add(disk.countVar * disk.tb)
-        i.diskIOPS.add(disk.countVar * disk.iops)
-        i.diskStreamMBs.add(disk.countVar * disk.streamMBs)
-        i.cost.add(disk.countVar * disk.cost)
-        if disk.type == hdd:
-            i.diskHddTB.add(disk.countVar * disk.tb)
-            i.diskHddIOPS.add(disk.countVar * disk.iops)
-        else:
-            i.diskFastTB.add(disk.countVar * disk.tb)
-            i.diskFastIOPS.add(disk.countVar * disk.iops)
+    b.section("Disk")
+    isHdd = b.values(allDisks, lambda disk: disk.type == hdd)
+    tb = b.values(allDisks, "tb")
+    iops = b.values(allDisks, "iops")
+
+    i.disk25Count.add(b.linExpr(b.countExpr("disk25")))
+    i.distinct25DiskTypes.add(b.linExpr(b.useExpr("disk25")))
+    i.disk35Count.add(b.linExpr(b.countExpr("disk35")))
+    i.distinct35DiskTypes.add(b.linExpr(b.useExpr("disk35")))
+    i.diskNvmeCount.add(b.linExpr(b.countExpr("diskNvme")))
+    i.distinctNvmeDiskTypes.add(b.linExpr(b.useExpr("diskNvme")))
+
+    i.distinctDiskTypes.add(b.linExpr(b.useExpr(allDisks)))
+    i.diskCount.add(b.linExpr(b.countExpr(allDisks)))
+    i.diskTB.add(b.linExpr(b.countExpr(allDisks, tb)))
+    i.diskIOPS.add(b.linExpr(b.countExpr(allDisks, iops)))
+    i.diskStreamMBs.add(b.linExpr(b.countExpr(allDisks, b.values(allDisks, "streamMBs"))))
+    i.diskHddTB.add(b.linExpr(b.countExpr(allDisks, tb * isHdd)))
+    i.diskHddIOPS.add(b.linExpr(b.countExpr(allDisks, iops * isHdd)))
+    i.diskFastTB.add(b.linExpr(b.countExpr(allDisks, tb * (1 - isHdd))))
+    i.diskFastIOPS.add(b.linExpr(b.countExpr(allDisks, iops * (1 - isHdd))))
+    cost = cost + b.countExpr(allDisks, b.values(allDisks, "cost"))
 
     if i.fillAllDiskSlots:
-        i.disk35Count.setEqual(server35DiskSlots)
-        i.disk25Count.setEqual(server25DiskSlots)
+        i.disk35Count.setEqual(b.linExpr(s["server35DiskSlots"]))
+        i.disk25Count.setEqual(b.linExpr(s["server25DiskSlots"]))
     else:
-        i.disk25Count.setMin(min25Disks).setMax(server25DiskSlots)
-        i.disk35Count.setMin(min35Disks).setMax(server35DiskSlots)
+        i.disk25Count.setMin(b.linExpr(s["min25Disks"])).setMax(b.linExpr(s["server25DiskSlots"]))
+        i.disk35Count.setMin(b.linExpr(s["min35Disks"])).setMax(b.linExpr(s["server35DiskSlots"]))
 
     ##### Network #####
-    networks = []
-    networks.extend(siom)
-    networks.extend(pciNetwork)
-
-    networkCards = LinExpr()
-    for network in networks:
-        networkCards = networkCards + network.countVar
-        i.totalNetworkSpeedGigabits.add(network.countVar * (network.speedGbit * network.adapterCount))
-        i.networkConnections.add(network.countVar * network.adapterCount)
-        i.distinctNetworkCardTypes.add(network.useVar)
-        i.cost.add(network.countVar * network.cost)
-
-    siomCardCount = LinExpr()
-    for s in siom:
-        siomCardCount = siomCardCount + s.countVar
-
-    pciNetworkCount = LinExpr()
-    for pci in pciNetwork:
-        pciNetworkCount = pciNetworkCount + pci.countVar
-
-    m.addConstr(networkCards, GRB.GREATER_EQUAL, i.nodeCount.linExpr * i.minNetworkCardsPerNode, "minNetworkCardPerNode")
-    i.networkConnections.setMin(i.minNetworkConnectionsPerNode * i.nodeCount.linExpr)
-    m.addConstr(siomCardCount, GRB.LESS_EQUAL, maxSiomCards if allowSiomCards else 0, "maxSiomCards")
-    m.addConstr(pciNetworkCount, GRB.LESS_EQUAL, maxPciNetworkCards, "maxPciNetworkCards")
+    b.section("Network")
+    adapterCount = b.values(networks, "adapterCount")
+    networkCards = b.countExpr(networks)
+    i.totalNetworkSpeedGigabits.add(b.linExpr(b.countExpr(networks, b.values(networks, "speedGbit") * adapterCount)))
+    i.networkConnections.add(b.linExpr(b.countExpr(networks, adapterCount)))
+    i.distinctNetworkCardTypes.add(b.linExpr(b.useExpr(networks)))
+    cost = cost + b.countExpr(networks, b.values(networks, "cost"))
+
+    b.addConstr(networkCards - s["nodeCount"] * i.minNetworkCardsPerNode, GRB.GREATER_EQUAL, 0, "minNetworkCardPerNode")
+    i.networkConnections.setMin(b.linExpr(s["nodeCount"] * i.minNetworkConnectionsPerNode))
+    b.addConstr(b.countExpr("siom") - s["maxSiomCards"] * i.allowSiomCards, GRB.LESS_EQUAL, 0, "maxSiomCards")
+    b.addConstr(b.countExpr("pciNetwork") - s["maxPciNetworkCards"], GRB.LESS_EQUAL, 0, "maxPciNetworkCards")
+
+    b.emit()
+    i.cost.add(b.linExpr(cost))
 
     ##### Objective #####
+    b.section("Objective")
+
+    i.setObjective()
+    if profile is not None:
+        profile.mark("update")
+        m.update()
+        profile.mark(None)
+    return b
+
+
+def goalProgramming(i, catalog=None):
+    started = time.perf_counter()
+    cache = openSolveCache(config.cachePath)
+    settings = i.settings() if cache else None
+    if settings is not None:
+        catalog = catalog or loadCatalog()
+        # The time limit and gap target are module inputs
+        key = cacheKey("goals", catalog.key, dict(config.inputs(), goals=settings), modelSourceKey())
+        solution = cache.get(key)
+        if solution is not None:
+            solution.printConfiguration()
+            return solution
 
-    objective = i.finalize()
-
-    m.setObjective(objective, GRB.MINIMIZE)
-
-    m.optimize()
-
-    m.write("goalModel.lp")
-
-    for v in m.getVars():
-        if abs(v.X) > 1e-6 and not v.varName.startswith("use "):
-            print (v.varName, int(round(v.X, 0)))
-    return m.getAttr("ObjVal")
+    m = i.model
+    profile = BuildProfile(m.ModelName) if config.profileBuild else None
+    b = goalModel(i, catalog, profile)
+    printPresolve(b)
+
+    store = openWarmStartStore(config.warmStartPath)
+    if store:
+        store.apply(m, i.inputs(), b.catalogKey)
+    trace = openSolveTrace(config.tracePath)
+    setSolveParams(m, config.inputs(), "goals", started)
+    if profile:
+        profile.presolve(m)
+        profile.mark("optimize")
+    m.optimize(trace)
+    if profile:
+        profile.finish()
+        print (profile.line())
+    if trace:
+        trace.write(m, i.inputs())
+    if store:
+        store.save(m, i.inputs(), b.catalogKey)
+
+    if config.goalModelPath:
+        m.write(config.goalModelPath)
+
+    solution = Solution.fromModel(m, b, i.rackCostScalingFactor)
+    if settings is not None and cacheable(solution):
+        cache.put(key, "goals", solution)
+    solution.printConfiguration()
+    return solution
 
 
 # goals = Goals("goalProgramming")
 # bestGoals = goalProgramming(goals)
-# print("best optimization function = {}".format(bestGoals))
+# print("best optimization function = {}".format(bestGoals.objVal))
+
+
+if __name__ == "__main__":
+    bestIlp = ilp()
+    print(bestIlp)
@@ -0,0 +1,178 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import csv
+import json
+
+import numpy as np
+
+diskGroups = ["disk25", "disk35", "diskNvme"]
+networkGroups = ["siom", "pciNetwork"]
+
+# Derived total -> (groups it sums over, amount per component bought)
+totalAttributes = {"servers": (["servers"], lambda c: 1),
+                   "nodes": (["servers"], lambda c: c.nodes),
+                   "watts": (["servers"], lambda c: c.watts),
+                   "rackUnits": (["servers"], lambda c: c.rackUnits),
+                   "cpus": (["cpus"], lambda c: 1),
+                   "cores": (["cpus"], lambda c: c.cores),
+                   "gigaflops": (["cpus"], lambda c: c.cores * c.ghz),
+                   "memoryGB": (["memory"], lambda c: c.memoryGB),
+                   "diskCount": (diskGroups, lambda c: 1),
+                   "diskTB": (diskGroups, lambda c: c.tb),
+                   "diskIOPS": (diskGroups, lambda c: c.iops),
+                   "diskStreamMBs": (diskGroups, lambda c: c.streamMBs),
+                   "networkCards": (networkGroups, lambda c: 1),
+                   "networkConnections": (networkGroups, lambda c: c.adapterCount),
+                   "networkGbit": (networkGroups, lambda c: c.speedGbit * c.adapterCount)}
+
+
+def unitCost(group, component):
+    return component.configuredCost if group == "servers" else component.cost
+
+
+def rackCost(rack, scalingFactor):
+    return scalingFactor * (rack.networkCost + rack.costPerMonth * 12 * rack.timeHorizonYears)
+
+
+def detached(component):
+    # Copy of a catalog component or rack without the model variables buildMatrix() sets
+    copy = object.__new__(type(component))
+    copy.__dict__ = dict((name, None if name in ["countVar", "useVar"] else value) for name, value in vars(component).items())
+    return copy
+
+
+class Solution:
+    # A solved configuration: the count of every component bought (with the catalog
+    # object it came from), the racks used and derived totals. Built from a solved model
+    # with one getAttr call (fromModel) or from a {varName: count} configuration.
+
+    def __init__(self, entries, racks, objVal=None, status=None, mipGap=None, rackCostScalingFactor=0):
+        # entries: [(group, component, count)] with count > 0; racks: the Rack objects used
+        self.entries = entries
+        self.racks = racks
+        self.objVal = objVal
+        self.status = status
+        self.mipGap = mipGap
+        # Lower bound on objVal, when the solve method gives one apart from mipGap
+        self.bound = None
+        self.rackCostScalingFactor = rackCostScalingFactor
+        # {name: value} of each objective of a hierarchical model
+        self.objectives = None
+        # Sensitivity of the configuration when solved with the sensitivity input
+        self.sensitivity = None
+        self.totals = self.computeTotals()
+
+    @classmethod
+    def fromModel(cls, m, b, rackCostScalingFactor=0):
+        # Reads every count, use and rack value of the MatrixBuilder b's model at once
+        solved = m.SolCount > 0
+        x = np.array(m.getAttr("X", b.vars)) if solved else np.zeros(len(b.vars))
+        counts = np.round(x[:b.n]).astype(int)
+        groupOf = {}
+        for group, components in b.groups.items():
+            for component in components:
+                groupOf[id(component)] = group
+        entries = [(groupOf[id(b.components[j])], b.components[j], int(counts[j])) for j in np.flatnonzero(counts > 0)]
+        racks = [rack for rack, used in zip(b.racks, x[2 * b.n:]) if used > 0.5]
+        solution = cls(entries, racks, m.ObjVal if solved else None, m.Status, m.MIPGap if solved and m.IsMIP and m.NumObj == 1 else None,
+                       rackCostScalingFactor)
+        if solved and m.NumObj > 1:
+            solution.objectives = {}
+            for k in range(m.NumObj):
+                m.params.ObjNumber = k
+                solution.objectives[m.ObjNName] = m.ObjNVal
+        return solution
+
+    @classmethod
+    def fromConfiguration(cls, configuration, groups, racks, objVal=None, rackCostScalingFactor=0):
+        # configuration: {varName: count} as printed by ilp(), e.g. from enumeration
+        byName = {}
+        for group, components in groups.items():
+            for component in components:
+                byName.setdefault(component.baseVarName, (group, component))
+        entries = [byName[name] + (int(count),) for name, count in configuration.items() if name in byName and count > 0]
+        used = [rack for rack in racks if configuration.get("rack " + rack.name, 0) > 0]
+        return cls(entries, used, objVal, rackCostScalingFactor=rackCostScalingFactor)
+
+    def computeTotals(self):
+        totals = dict((name, 0) for name in totalAttributes)
+        for group, component, count in self.entries:
+            for name, (groups, amount) in totalAttributes.items():
+                if group in groups:
+                    totals[name] += count * amount(component)
+        totals["racks"] = len(self.racks)
+        totals["availableRackUnits"] = sum(rack.availableRackUnits for rack in self.racks)
+        totals["availableWatts"] = sum(rack.availableWatts for rack in self.racks)
+        totals["cost"] = sum(count * unitCost(group, component) for group, component, count in self.entries) + \
+            sum(rackCost(rack, self.rackCostScalingFactor) for rack in self.racks)
+        return totals
+
+    def __getattr__(self, name):
+        # solution.cores, solution.diskTB, ... read the totals
+        totals = self.__dict__.get("totals", {})
+        if name in totals:
+            return totals[name]
+        raise AttributeError(name)
+
+    def __getstate__(self):
+        # Pickled (e.g. by the solve cache) without the model's variables
+        state = dict(self.__dict__)
+        state["entries"] = [(group, detached(component), count) for group, component, count in self.entries]
+        state["racks"] = [detached(rack) for rack in self.racks]
+        return state
+
+    def __repr__(self):
+        return "Solution(objVal={}, cost={}, servers={})".format(self.objVal, self.totals["cost"], self.totals["servers"])
+
+    def group(self, name):
+        return [(component, count) for group, component, count in self.entries if group == name]
+
+    def configuration(self):
+        # {varName: count} of the components and racks bought, as ilp() prints them
+        configuration = dict((component.baseVarName, count) for group, component, count in self.entries)
+        for rack in self.racks:
+            configuration["rack " + rack.name] = 1
+        return configuration
+
+    def printConfiguration(self):
+        for name, count in self.configuration().items():
+            print (name, count)
+
+    def columns(self):
+        # One row per component bought: {column: numpy array}
+        return {"group": np.array([group for group, component, count in self.entries], dtype=str),
+                "name": np.array([component.baseVarName for group, component, count in self.entries], dtype=str),
+                "count": np.array([count for group, component, count in self.entries], dtype=np.int64),
+                "unitCost": np.array([unitCost(group, component) for group, component, count in self.entries], dtype=float),
+                "cost": np.array([count * unitCost(group, component) for group, component, count in self.entries], dtype=float)}
+
+    def toDict(self):
+        return {"objVal": self.objVal, "status": self.status, "mipGap": self.mipGap, "bound": self.bound, "objectives": self.objectives, "totals": self.totals,
+                "sensitivity": self.sensitivity.toDict() if self.sensitivity is not None else None,
+                "components": [{"group": group, "name": component.baseVarName, "count": count, "unitCost": unitCost(group, component)}
+                               for group, component, count in self.entries],
+                "racks": [rack.name for rack in self.racks]}
+
+    def toJson(self, **kwargs):
+        return json.dumps(self.toDict(), **kwargs)
+
+    def write(self, path):
+        # .json writes toDict(); .parquet (needs pyarrow) and .csv write columns()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(self.toDict(), f, indent=2)
+            return path
+        columns = self.columns()
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("pyarrow is required to write parquet solutions ({})".format(path))
+            pyarrow.parquet.write_table(pyarrow.table(dict((name, values.tolist()) for name, values in columns.items())), path)
+            return path
+        with open(path, "w") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(columns))
+            writer.writerows(zip(*[values.tolist() for values in columns.values()]))
+        return path
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+# Inputs that change where results are written or how fast they are found, not what is solved
+ignoredInputs = ["warmStartPath", "tracePath", "profileBuild", "cachePath", "tuningPath", "compileModels", "goalModelPath"]
+
+# Caches opened by this process, keyed by path, so hits after the first are served from memory
+openCaches = {}
+
+
+def normalize(value):
+    # Numbers as floats so 3000 and 3000.0 hash the same; dicts with sorted string keys
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return dict((str(name), normalize(item)) for name, item in sorted(value.items(), key=lambda item: str(item[0])))
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return float(value) if hasattr(value, "__float__") else str(value)
+
+
+def cacheKey(model, catalogKey, inputs, sourceKey=None):
+    # Stable hash of the kind of model, the catalog, every input the result depends on and
+    # the version of the code that built the model (sourceKey)
+    inputs = dict((name, value) for name, value in inputs.items() if name not in ignoredInputs)
+    text = json.dumps({"model": model, "catalog": catalogKey, "inputs": normalize(inputs), "source": sourceKey}, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SolveCache:
+    # Solutions keyed by cacheKey() in one SQLite file. Entries older than maxAge seconds
+    # are misses and are deleted on the next put; beyond maxEntries or maxBytes the least
+    # recently used entries are evicted. Entries read once are kept in memory so repeated
+    # hits in one process do not touch the file.
+
+    def __init__(self, path, maxEntries=10000, maxBytes=256 * 1024 * 1024, maxAge=30 * 24 * 3600):
+        self.path = path
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge
+        self.memory = {}
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, model TEXT, created REAL, "
+                                    "accessed REAL, size INTEGER, objVal REAL, mipGap REAL, solution BLOB)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS solutionsAccessed ON solutions (accessed)")
+        return self.connection
+
+    def get(self, key):
+        # The stored Solution, or None on a miss
+        now = time.time()
+        if key in self.memory:
+            created, solution = self.memory[key]
+            if now - created <= self.maxAge:
+                return solution
+            del self.memory[key]
+        connection = self.connect()
+        row = connection.execute("SELECT created, solution FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[0] > self.maxAge:
+            return None
+        try:
+            solution = pickle.loads(row[1])
+        except Exception:
+            # Written by an incompatible version of the component classes
+            return None
+        with connection:
+            connection.execute("UPDATE solutions SET accessed = ? WHERE key = ?", (now, key))
+        self.memory[key] = (row[0], solution)
+        return solution
+
+    def put(self, key, model, solution):
+        now = time.time()
+        blob = pickle.dumps(solution, protocol=pickle.HIGHEST_PROTOCOL)
+        connection = self.connect()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (key, model, now, now, len(blob), solution.objVal, solution.mipGap, blob))
+            self.evict(connection, now)
+        self.memory[key] = (now, solution)
+
+    def evict(self, connection, now):
+        connection.execute("DELETE FROM solutions WHERE created < ?", (now - self.maxAge,))
+        count, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions").fetchone()
+        if count <= self.maxEntries and size <= self.maxBytes:
+            return
+        # Keep the most recently used entries that fit both limits
+        kept, keptSize = 0, 0
+        for key, entrySize in connection.execute("SELECT key, size FROM solutions ORDER BY accessed DESC").fetchall():
+            if kept < self.maxEntries and keptSize + entrySize <= self.maxBytes:
+                kept += 1
+                keptSize += entrySize
+            else:
+                connection.execute("DELETE FROM solutions WHERE key = ?", (key,))
+                self.memory.pop(key, None)
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute("DELETE FROM solutions")
+        self.memory = {}
+
+    def stats(self):
+        count, size = self.connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions").fetchone()
+        return {"entries": count, "bytes": size, "inMemory": len(self.memory)}
+
+
+def openSolveCache(path):
+    if not path:
+        return None
+    if path not in openCaches:
+        openCaches[path] = SolveCache(path)
+    return openCaches[path]
@@ -0,0 +1,129 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+
+import numpy as np
+
+from lazyImport import LazyImport
+
+GRB = LazyImport("gurobipy", "GRB")
+
+
+def relativeGap(incumbent, bound):
+    # MIPGap as Gurobi reports it; None before the first solution
+    if incumbent is None or abs(incumbent) >= GRB.INFINITY:
+        return None
+    if abs(bound - incumbent) < 1e-10:
+        return 0.0
+    return abs(bound - incumbent) / max(abs(incumbent), 1e-10)
+
+
+class SolveTrace:
+    # Optimize callback recording the progress of one solve: a point for every new
+    # solution and, at most every interval seconds, for bound and node progress. Also
+    # records when presolve ended and when the root relaxation was solved. write() appends
+    # the run as one JSON line to path.
+
+    def __init__(self, path=None, interval=0.5):
+        self.path = path
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.points = []
+        self.presolve = None
+        self.rootLP = None
+        self.lastPoint = None
+
+    def point(self, event, runtime, incumbent, bound, nodes, **extra):
+        incumbent = None if abs(incumbent) >= GRB.INFINITY else incumbent
+        self.points.append(dict({"event": event, "time": round(runtime, 4), "incumbent": incumbent, "bound": bound,
+                                 "gap": relativeGap(incumbent, bound), "nodes": int(nodes)}, **extra))
+        self.lastPoint = runtime
+
+    def __call__(self, model, where):
+        if where in (GRB.Callback.POLLING, GRB.Callback.PRESOLVE, GRB.Callback.MESSAGE):
+            return
+        runtime = model.cbGet(GRB.Callback.RUNTIME)
+        if self.presolve is None:
+            self.presolve = runtime
+        if where == GRB.Callback.MIPNODE and self.rootLP is None:
+            self.rootLP = runtime
+        elif where == GRB.Callback.MIPSOL:
+            # A heuristic can find a solution worse than the incumbent
+            objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            incumbent = min(objective, model.cbGet(GRB.Callback.MIPSOL_OBJBST))
+            self.point("solution", runtime, incumbent, model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                       model.cbGet(GRB.Callback.MIPSOL_NODCNT), objective=objective, improved=objective <= incumbent)
+        elif where == GRB.Callback.MIP and (self.lastPoint is None or runtime - self.lastPoint >= self.interval):
+            self.point("progress", runtime, model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND),
+                       model.cbGet(GRB.Callback.MIP_NODCNT))
+
+    def result(self, model, inputs=None):
+        # The trace of model's last solve as a dict
+        solutions = [point for point in self.points if point["event"] == "solution"]
+        solved = model.SolCount > 0
+        improvements = [point for point in solutions if point["improved"]]
+        return {"model": model.ModelName, "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "inputs": inputs, "status": model.Status, "runtime": model.Runtime,
+                "objVal": model.ObjVal if solved else None, "bound": model.ObjBound if model.IsMIP and model.NumObj == 1 else None,
+                "gap": model.MIPGap if solved and model.IsMIP and model.NumObj == 1 else None, "nodes": model.NodeCount,
+                "presolve": self.presolve, "rootLP": self.rootLP,
+                "firstSolution": solutions[0]["time"] if solutions else None,
+                "lastImprovement": improvements[-1]["time"] if improvements else None,
+                "points": self.points}
+
+    def write(self, model, inputs=None):
+        entry = self.result(model, inputs)
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        self.reset()
+        return entry
+
+
+def openSolveTrace(path):
+    return SolveTrace(path) if path else None
+
+
+def loadTraces(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def timeToGap(trace, gap):
+    # Seconds until the solve first reached gap, None if it never did
+    for point in trace["points"]:
+        if point["gap"] is not None and point["gap"] <= gap:
+            return point["time"]
+    if trace["gap"] is not None and trace["gap"] <= gap:
+        return trace["runtime"]
+    return None
+
+
+def traceSummary(traces, percentiles=(50, 90, 99), gaps=(0.1, 0.01, 0.0001)):
+    # Percentiles over many solves of the phase times, node count, first and last improving
+    # solution and the time to reach each gap, as {metric: {"p50": value, ..., "count": n}}.
+    # Solves that never reached a gap are left out of its percentiles and counted in "missing".
+    metrics = dict((name, [trace[name] for trace in traces])
+                   for name in ["runtime", "presolve", "rootLP", "firstSolution", "lastImprovement", "nodes"])
+    for gap in gaps:
+        metrics["gap {:g}".format(gap)] = [timeToGap(trace, gap) for trace in traces]
+    summary = {}
+    for name, values in metrics.items():
+        present = np.array([value for value in values if value is not None], dtype=float)
+        entry = dict(("p{:g}".format(q), float(np.percentile(present, q)) if len(present) else None) for q in percentiles)
+        entry.update(count=len(present), missing=len(values) - len(present))
+        summary[name] = entry
+    return summary
+
+
+def slowestSolves(traces, top=10):
+    # The top slowest solves with their inputs, to find the requirement combinations that
+    # make the solver slow
+    return sorted(traces, key=lambda trace: trace["runtime"], reverse=True)[:top]
@@ -0,0 +1,38 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+# The modules import each other by name from code/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def so():
+    pytest.importorskip("gurobipy")
+    import serverOptimization
+    return serverOptimization
+
+
+@pytest.fixture(scope="session")
+def catalog(so):
+    return so.loadCatalog()
+
+
+@pytest.fixture(scope="session")
+def env(so):
+    return so.quietEnv(1)
+
+
+@pytest.fixture(scope="session")
+def mixes():
+    # Requirement overrides every mode is compared on; the first is the defaults
+    from benchmark import requirementMixes
+    return requirementMixes(4, seed=0)
+
+
+def solveMode(so, catalog, env, mix, mode, **overrides):
+    # solve() of a mix with solverMode = mode
+    return so.solve(so.currentInputs(dict(mix, solverMode=mode, **overrides)), catalog, env)
@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+
+# The sections of buildIlp()/goalModel() in build order
+sections = ["Server", "Racks", "CPU", "Memory", "Disk", "Network", "Objective"]
+
+
+def test_profileIlpSections(so, catalog, env, mixes):
+    for mix in mixes:
+        stats = so.profileIlp(catalog, so.currentInputs(dict(mix, solverMode="mip")), env).stats()
+        assert list(stats["phases"]) == ["catalog"] + sections[:-1] + ["emit", "Objective", "update", "presolve", "optimize"]
+        assert all(seconds >= 0 for seconds in stats["phases"].values())
+        assert stats["total"] == sum(stats["phases"].values())
+        assert list(stats["sections"]) == ["Linking"] + sections
+        for name, entry in stats["sections"].items():
+            assert set(entry) >= {"vars", "constrs", "nonzeros", "seconds"}
+        # Every variable, row and nonzero of the ILP belongs to a section
+        assert stats["unattributed"] == {"vars": 0, "constrs": 0, "nonzeros": 0}
+        assert stats["size"]["vars"] == stats["size"]["intVars"] > stats["presolved"]["vars"] > 0
+        assert stats["presolved"]["constrs"] <= stats["size"]["constrs"]
+
+
+def test_goalProfileSections(so, catalog, env):
+    from benchmark import mixGoals
+    profile = so.BuildProfile("goalProgramming")
+    profile.mark("goals")
+    goals = mixGoals(so, {}, env)
+    so.goalModel(goals, catalog, profile)
+    profile.presolve(goals.model)
+    profile.finish()
+    stats = profile.stats()
+    assert list(stats["sections"]) == ["Linking"] + sections
+    assert {"goals", "catalog", "emit", "update", "presolve"} <= set(stats["phases"])
+    # The deviations of the goals are added outside the builder
+    assert stats["unattributed"]["vars"] > 0
+    assert json.loads(profile.line()[len("profile "):]) == json.loads(json.dumps(stats))
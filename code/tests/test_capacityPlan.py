@@ -0,0 +1,31 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import solveMode
+
+# Five quarters of growing storage and compute
+forecast = [{"minDiskTB": 600 + 400 * t, "minGigaflops": 2000 + 500 * t} for t in range(5)]
+
+
+def test_singlePeriodMatchesIlp(so, catalog, env):
+    plan = so.capacityPlan(forecast[:1], catalog=catalog, env=env, window=None)
+    mip = solveMode(so, catalog, env, dict(forecast[0], serverCostTimeHorizonYears=0), "mip")
+    assert plan["cost"] == pytest.approx(mip.objVal)
+
+
+def test_rollingHorizonAgainstFullPlan(so, catalog, env):
+    inputs = so.currentInputs({"rackCostScalingFactor": 1})
+    full = so.capacityPlan(forecast, inputs, catalog, env, window=None)
+    rolling = so.capacityPlan(forecast, inputs, catalog, env, window=2)
+    assert full["infeasiblePeriod"] is None and rolling["infeasiblePeriod"] is None
+    assert len(rolling["periods"]) == len(full["periods"]) == len(forecast)
+    # The full plan is optimal over all periods; rolling horizon can only cost more, and a
+    # window over all periods is the full plan
+    assert rolling["cost"] >= full["cost"] - 1e-6
+    assert so.capacityPlan(forecast, inputs, catalog, env, window=len(forecast))["cost"] == pytest.approx(full["cost"])
+    for plan in [full, rolling]:
+        for before, after in zip(plan["periods"], plan["periods"][1:]):
+            installed = dict(before["installed"].configuration())
+            assert all(after["installed"].configuration().get(name, 0) >= count for name, count in installed.items())
+        assert plan["cost"] == pytest.approx(sum(period["cost"] for period in plan["periods"]))
@@ -0,0 +1,43 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from compiledModel import modelSuffix, rowsSuffix, stateSuffix
+from componentCatalog import compileCatalog, defaultCatalogDir, openCompiled
+
+
+@pytest.fixture
+def tmpCatalog(tmp_path):
+    # The default catalog compiled under tmp_path, so compiled models are written there
+    return openCompiled(compileCatalog(defaultCatalogDir, str(tmp_path)))
+
+
+def test_compiledMatchesBuilt(so, tmpCatalog, env, mixes):
+    for mix in mixes:
+        built = so.solve(so.currentInputs(dict(mix, solverMode="mip")), tmpCatalog, env)
+        for run in range(2):
+            # Compiled on the first run, read on the second
+            compiled = so.solve(so.currentInputs(dict(mix, solverMode="mip", compileModels=True)), tmpCatalog, env)
+            assert compiled.objVal == pytest.approx(built.objVal)
+            assert compiled.configuration() == built.configuration()
+    files = os.listdir(os.path.join(tmpCatalog.path, "models"))
+    prefixes = set(name[:-len(suffix)] for name in files for suffix in [modelSuffix, stateSuffix, rowsSuffix] if name.endswith(suffix))
+    # Every compiled model is complete, with no temporary files left behind
+    assert len(files) == 3 * len(prefixes)
+
+
+def test_compiledScenarioModel(so, tmpCatalog, env):
+    built = so.ScenarioModel(tmpCatalog, env)
+    so.ScenarioModel(tmpCatalog, env, compileModels=True)
+    compiled = so.ScenarioModel(tmpCatalog, env, compileModels=True)
+    assert compiled.rows is None
+    for requirements in [{}, {"minDiskTB": 1200}, {"maxAvgMemoryPerNode": 1500}]:
+        assert compiled.optimize(**requirements).objVal == pytest.approx(built.optimize(**requirements).objVal)
+    assert sorted(compiled.exprs) == sorted(built.exprs)
+
+
+def test_compileModelsOffByDefault(so, tmpCatalog, env):
+    so.solve(so.currentInputs({"solverMode": "mip"}), tmpCatalog, env)
+    assert not os.path.exists(os.path.join(tmpCatalog.path, "models"))
@@ -0,0 +1,48 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+
+import componentCatalog
+from componentCatalog import catalogKey, defaultCatalogDir, loadCatalog
+
+
+def copyCatalog(target):
+    os.makedirs(target)
+    for name in os.listdir(defaultCatalogDir):
+        if name.endswith(".csv"):
+            shutil.copy(os.path.join(defaultCatalogDir, name), target)
+    return target
+
+
+def test_keyFollowsSources(tmp_path, monkeypatch):
+    source = copyCatalog(str(tmp_path / "catalog"))
+    key = catalogKey(source)
+    assert key == catalogKey(defaultCatalogDir)
+    # Unchanged files are not read again
+    monkeypatch.setattr(componentCatalog.hashlib, "sha1", None)
+    assert catalogKey(source) == key
+    monkeypatch.undo()
+    # An edited file is
+    path = os.path.join(source, "servers.csv")
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace("4685", "4686", 1))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    changed = catalogKey(source)
+    assert changed != key
+    catalog = loadCatalog(source, str(tmp_path / "compiled"))
+    assert catalog.key == changed
+    assert 4686 in catalog.table("servers")["cost"]
+
+
+def test_newSourceFile(tmp_path):
+    # A parquet file is read instead of the csv of the same table, although no file the key
+    # was computed from changed
+    source = copyCatalog(str(tmp_path / "catalog"))
+    key = catalogKey(source)
+    with open(os.path.join(source, "siom.parquet"), "wb") as f:
+        f.write(b"not read, only hashed")
+    assert catalogKey(source) != key
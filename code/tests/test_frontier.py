@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import solveMode
+
+
+@pytest.fixture
+def frontier(so, catalog, env):
+    return so.FrontierModel(env, catalog, so.currentInputs(), ["diskTB"])
+
+
+def test_traceMatchesIlp(so, catalog, env, frontier):
+    points = frontier.trace("diskTB", 1000, 3000, maxPoints=6)
+    assert len(points) >= 2
+    for point in points:
+        mip = solveMode(so, catalog, env, {"minDiskTB": point["levels"]["diskTB"]}, "mip")
+        assert point["cost"] == pytest.approx(mip.objVal)
+        assert point["capacity"]["diskTB"] >= point["levels"]["diskTB"] - 1e-6
+
+
+def test_traceSkipsSolvesWithoutConfiguration(frontier, monkeypatch):
+    # As when a time limit ends a solve before it finds a configuration
+    solve = frontier.solve
+    calls = []
+
+    def endsEarly(levels, start=None):
+        calls.append(levels)
+        return solve(levels, start) if len(calls) <= 2 else None
+    monkeypatch.setattr(frontier, "solve", endsEarly)
+    points = frontier.trace("diskTB", 1000, 3000)
+    assert [point["levels"]["diskTB"] for point in points] == [1000, 3000]
+    assert len(calls) == 3
+
+
+def test_traceWithoutConfiguration(frontier):
+    assert frontier.trace("diskTB", 1000, 1e9) == []
+
+
+def test_paretoFrontierUsesCallersEnv(so, catalog, env, monkeypatch):
+    created = []
+    quietEnv = so.quietEnv
+    monkeypatch.setattr(so, "quietEnv", lambda *args: created.append(args) or quietEnv(*args))
+    points = so.paretoFrontier(["diskTB"], low=1000, high=3000, segments=2, workers=2, maxPoints=4, catalog=catalog, env=env)
+    # Workers are separate processes, so the parent started no environment of its own
+    assert created == []
+    assert len(points) >= 2
+    for point in points:
+        mip = solveMode(so, catalog, env, {"minDiskTB": point["levels"]["diskTB"]}, "mip")
+        assert point["cost"] == pytest.approx(mip.objVal)
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import pytest
+
+
+def builtGoals(so, catalog, env, **settings):
+    # (Goals, MatrixBuilder) of goalModel() with the settings changed from the defaults
+    goals = so.Goals("goalProgramming", env)
+    for name, value in settings.items():
+        setattr(goals, name, value)
+    b = so.goalModel(goals, catalog)
+    goals.model.update()
+    return goals, b
+
+
+def siomCoefficients(so, goals, b):
+    row = goals.model.getRow(goals.model.getConstrByName("maxSiomCards"))
+    coefs = dict((row.getVar(k).VarName, row.getCoeff(k)) for k in range(row.size()))
+    return [coefs.get(server.countVar.VarName, 0.0) for server in b.groups["servers"]]
+
+
+def test_goalsSettingsReachModel(so, catalog, env, monkeypatch):
+    # The goals' own settings build the model, whatever the module inputs are
+    monkeypatch.setattr(so.config, "allowSiomCards", True)
+    monkeypatch.setattr(so.config, "rackCostPerMonth", 1)
+    goals, b = builtGoals(so, catalog, env)
+    assert not any(siomCoefficients(so, goals, b))
+    assert all(rack.costPerMonth == goals.rackCostPerMonth for rack in b.racks)
+    goals, b = builtGoals(so, catalog, env, allowSiomCards=True, rackCostPerMonth=3000)
+    assert any(siomCoefficients(so, goals, b))
+    assert all(rack.costPerMonth == 3000 for rack in b.racks)
+
+
+@pytest.mark.parametrize("hierarchical", [False, True])
+def test_goalProgrammingSolves(so, catalog, env, hierarchical, capsys):
+    goals = so.Goals("goalProgramming", env)
+    goals.hierarchical = hierarchical
+    solution = so.goalProgramming(goals, catalog)
+    assert solution.objVal is not None
+    assert solution.servers > 0
+    assert (solution.objectives is not None) == hierarchical
+
+
+def test_hierarchicalLevels(so, catalog, env, capsys):
+    goals = so.Goals("goalProgramming", env)
+    goals.hierarchical = True
+    strict = so.goalProgramming(goals, catalog)
+    # Requirements first, then cost: the cost level is the relative overrun of the budget
+    assert strict.objectives["priority 2"] == pytest.approx(0.0, abs=1e-6)
+    budget = goals.cost.goal
+    assert strict.objectives["priority 1"] == pytest.approx(max(strict.cost - budget, 0) / budget)
+    assert goals.cost.negativeDeviation.X * goals.cost.positiveDeviation.X == 0
+    # Giving up some of the requirement level can only make the levels below it cheaper
+    goals = so.Goals("goalProgramming", env)
+    goals.hierarchical = True
+    goals.levelTolerances = {2: {"absTol": 1}}
+    relaxed = so.goalProgramming(goals, catalog)
+    assert relaxed.objectives["priority 2"] <= 1 + 1e-6
+    assert relaxed.objectives["priority 1"] <= strict.objectives["priority 1"] + 1e-6
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Node index queries against a direct scan of the index and against the solver modes
+import time
+
+import numpy as np
+import pytest
+
+from conftest import solveMode
+from nodeIndex import indexRequirements, queryLimits
+
+
+def queryInputs(so, mix):
+    p = so.currentInputs(mix)
+    return dict((name, p[name]) for name in list(indexRequirements) + list(queryLimits))
+
+
+@pytest.fixture
+def index(so, catalog, tmp_path):
+    return so.buildNodeIndex(catalog, so.currentInputs(), str(tmp_path / "index"))
+
+
+def scan(index, top, **requirements):
+    # Cheapest (cost, row) of every row that fits, racks looked up for all of them
+    limits = dict(queryLimits, **dict((name, value) for name, value in requirements.items() if name in queryLimits))
+    count = index.serversNeeded(**requirements)
+    columns = index.columns
+    feasible = (count <= limits["maxServers"]) & (count * columns["networkCards"] <= limits["maxNetworkConnections"])
+    fits = ((count * columns["rackUnits"])[:, None] <= index.rackUnits) & ((count * columns["watts"])[:, None] <= index.rackWatts)
+    rackCost = np.where(fits, limits["rackCostScalingFactor"] * index.rackCost, np.inf).min(axis=1)
+    total = np.where(feasible, count * columns["cost"] + rackCost, np.inf)
+    rows = [row for row in np.argsort(total, kind="stable")[:top] if np.isfinite(total[row])]
+    return [float(total[row]) for row in rows]
+
+
+def test_queryMatchesScan(so, index, mixes):
+    for mix in mixes:
+        for top in [1, 10]:
+            for rackCostScalingFactor in [0, 1]:
+                requirements = dict(queryInputs(so, mix), rackCostScalingFactor=rackCostScalingFactor)
+                costs = [answer["cost"] for answer in index.query(top, **requirements)]
+                assert costs == pytest.approx(scan(index, top, **requirements))
+
+
+def test_queryAgainstSolvers(so, catalog, env, index, mixes):
+    # One configuration on every node can only cost more than the ILP, which checks the per
+    # node limits in total; the answer's configuration costs what the query says
+    for mix in mixes:
+        if any(mix.get(name, value) != value for name, value in index.manifest["inputs"].items()):
+            continue
+        best = index.query(1, **queryInputs(so, mix))[0]
+        mip = solveMode(so, catalog, env, mix, "mip")
+        assert best["cost"] >= mip.objVal - 1e-6
+        if so.bestConfigurations(catalog, so.currentInputs(mix), top=1) is not None:
+            assert best["cost"] >= solveMode(so, catalog, env, mix, "enumerate").objVal - 1e-6
+        solution = so.configurationSolution(best["configuration"], best["cost"], catalog, so.currentInputs(mix))
+        assert solution.cost == pytest.approx(best["cost"])
+    # The defaults' optimum has every node configured the same
+    assert index.query(1, **queryInputs(so, {}))[0]["cost"] == pytest.approx(solveMode(so, catalog, env, {}, "mip").objVal)
+
+
+def test_queryIsFast(so, index):
+    requirements = queryInputs(so, {})
+    index.query(10, **requirements)
+    times = []
+    for k in range(20):
+        started = time.perf_counter()
+        index.query(10, **dict(requirements, minDiskTB=requirements["minDiskTB"] + k))
+        times.append(time.perf_counter() - started)
+    # A few milliseconds; the bound leaves room for slow and loaded machines
+    assert np.median(times) < 0.05
+
+
+def test_queryNeedsTop(index):
+    with pytest.raises(ValueError):
+        index.query(0)
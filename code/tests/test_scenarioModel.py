@@ -0,0 +1,128 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# A ScenarioModel updated in place against the ILP built from scratch for the same inputs
+import pytest
+
+from conftest import solveMode
+
+# Changes of every kind update() applies: right hand sides, per node coefficients, racks
+updates = [{"minDiskTB": 1200},
+           {"minMemory": 20480, "minGigaflops": 5000},
+           {"maxAvgMemoryPerNode": 1500, "minNetworkConnectionsPerNode": 1},
+           {"rackCostScalingFactor": 1, "rackCostPerMonth": 3000},
+           {"maxServers": 20, "minTotalNetworkSpeedGigabits": 8000},
+           {"allowSiomCards": True}]
+
+
+def test_updateMatchesRebuild(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env)
+    requirements = {}
+    for update in updates:
+        requirements.update(update)
+        solution = scenario.optimize(**update)
+        assert solution.status == so.GRB.OPTIMAL
+        assert solution.objVal == pytest.approx(solveMode(so, catalog, env, requirements, "mip").objVal)
+
+
+def test_updateInPlaceKeepsModel(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env)
+    scenario.optimize()
+    model = scenario.model
+    assert not scenario.update(minDiskTB=1200, rackCostScalingFactor=1)
+    assert scenario.model is model
+    assert scenario.update(fillAllDiskSlots=False)
+    assert scenario.model is not model
+
+
+def test_solveParamsReachModel(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env)
+    envTimeLimit = scenario.model.Params.TimeLimit
+    scenario.optimize(timeLimit=5)
+    # The budget counts from the call, so a little of it is spent before optimizing
+    assert 0 < scenario.model.Params.TimeLimit <= 5
+    scenario.optimize(timeLimit=None)
+    assert scenario.model.Params.TimeLimit == envTimeLimit
+    assert scenario.update(mipGap=0.05)
+    assert scenario.model.Params.MIPGap == pytest.approx(0.05)
+
+
+def test_firstBudgetIncludesBuild(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env, timeLimit=1e-9)
+    solution = scenario.optimize()
+    assert scenario.model.Params.TimeLimit == 0
+    assert solution.status == so.GRB.TIME_LIMIT
+    assert solution.objVal is None
+
+
+def builtWithPrices(so, catalog, env, prices, **requirements):
+    # Objective of the ILP built from scratch with prices
+    p = so.currentInputs(dict(requirements, solverMode="mip"))
+    m = so.gp.Model("ILP", env=env)
+    b = so.buildMatrix(m, catalog, p, p["pruneDominated"], p["tightenBounds"], p["linkingConstraints"], prices=prices)
+    so.buildIlp(b, p)
+    m.optimize()
+    objVal = m.ObjVal
+    m.dispose()
+    return objVal
+
+
+def inPlacePart(scenario):
+    # A part bought that is neither merged nor involved in pruning, so its price is set in place
+    pruned = set(c.identifier for group, component, dominator in scenario.pruned for c in (component, dominator))
+    x = scenario.model.getAttr("X", scenario.builder.vars)
+    for j, component in enumerate(scenario.builder.components):
+        if x[j] > 0.5 and not component.aliases and component.identifier not in pruned:
+            return component
+
+
+@pytest.mark.parametrize("pruneDominated", [True, False])
+def test_pricesInPlaceMatchRebuild(so, catalog, env, pruneDominated):
+    scenario = so.ScenarioModel(catalog, env, pruneDominated=pruneDominated)
+    scenario.optimize()
+    component = inPlacePart(scenario)
+    prices = {component.identifier: component.cost * 1.2}
+    model = scenario.model
+    assert not scenario.updatePrices(prices)
+    assert scenario.model is model
+    assert scenario.optimize().objVal == pytest.approx(builtWithPrices(so, catalog, env, prices, pruneDominated=pruneDominated))
+    # Coefficients cached by the builder follow the new price
+    group = next(group for group, components in scenario.builder.groups.items() if component in components)
+    attr = "configuredCost" if group == "servers" else "cost"
+    assert component.cost == pytest.approx(prices[component.identifier])
+    assert getattr(component, attr) in scenario.builder.values(group, attr)
+    # Prices stay in effect when a requirement rebuilds the model
+    assert scenario.update(fillAllDiskSlots=False)
+    assert scenario.optimize().objVal == pytest.approx(builtWithPrices(so, catalog, env, prices, pruneDominated=pruneDominated,
+                                                                       fillAllDiskSlots=False))
+
+
+def test_pricesOfPrunedOrMergedPartsRebuild(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env)
+    scenario.optimize()
+    group, component, dominator = scenario.pruned[0]
+    # Cheap enough that it may no longer be dominated
+    prices = {component.identifier: component.cost / 10}
+    assert scenario.updatePrices(prices)
+    assert scenario.optimize().objVal == pytest.approx(builtWithPrices(so, catalog, env, prices))
+    # Without pruning the merged entries stay in the model
+    scenario = so.ScenarioModel(catalog, env, pruneDominated=False)
+    scenario.optimize()
+    merged = next(c for c in scenario.builder.components if c.aliases)
+    prices = {merged.aliases[0].identifier: merged.cost / 2}
+    assert scenario.updatePrices(prices)
+    assert scenario.optimize().objVal == pytest.approx(builtWithPrices(so, catalog, env, prices, pruneDominated=False))
+
+
+def test_unknownPart(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env)
+    with pytest.raises(ValueError):
+        scenario.updatePrices({"no such part": 1})
+
+
+def test_optimizeReturnsSolution(so, catalog, env):
+    scenario = so.ScenarioModel(catalog, env, sensitivity=True)
+    solution = scenario.optimize(minDiskTB=1200)
+    solved = solveMode(so, catalog, env, {"minDiskTB": 1200}, "mip", sensitivity=True)
+    assert solution.objVal == pytest.approx(solved.objVal)
+    assert solution.totals["cost"] == pytest.approx(solved.totals["cost"])
+    assert solution.sensitivity.objVal == pytest.approx(solved.sensitivity.objVal)
@@ -0,0 +1,61 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def solved(so, catalog, env):
+    # (model, builder, Sensitivity) of the default inputs
+    p = so.currentInputs({"solverMode": "mip"})
+    m, b = so.ilpModel(catalog, p, env)
+    m.optimize()
+    return m, b, so.sensitivityAnalysis(m, b)
+
+
+def fixedLp(so, m, b, name, rhs):
+    # Objective of the LP sensitivityAnalysis() reads its duals from, with input name at rhs
+    x = np.round(np.array(m.getAttr("X", b.vars)))
+    lp = m.relax()
+    lpVars = lp.getVars()
+    lp.setAttr("LB", lpVars[b.n:], x[b.n:].tolist())
+    lp.setAttr("UB", lpVars[b.n:], x[b.n:].tolist())
+    lp.getConstrs()[b.constrs[so.ScenarioModel.rhsInputs[name]].index].RHS = rhs
+    lp.optimize()
+    objVal = lp.ObjVal
+    lp.dispose()
+    return objVal
+
+
+def test_requirementChangeIsLpEstimate(so, solved):
+    m, b, sensitivity = solved
+    assert sensitivity.lpObjVal <= sensitivity.objVal + 1e-6
+    checked = 0
+    for name, entry in sensitivity.requirements.items():
+        if entry["dual"] == 0 or not np.isfinite(entry["rhsLow"]) or not np.isfinite(entry["rhsHigh"]):
+            continue
+        assert sensitivity.requirementChange(name, entry["rhs"]) == pytest.approx(sensitivity.lpObjVal)
+        rhs = (entry["rhs"] + entry["rhsHigh"]) / 2
+        assert sensitivity.requirementChange(name, rhs) == pytest.approx(fixedLp(so, m, b, name, rhs))
+        assert sensitivity.requirementChange(name, entry["rhsHigh"] + 1) is None
+        checked += 1
+    assert checked > 0
+
+
+def test_costChangeBoundsNewOptimum(so, catalog, env, solved):
+    # The configuration repriced is feasible, so the MIP with the new price costs at most that
+    m, b, sensitivity = solved
+    checked = 0
+    for name, entry in sensitivity.components.items():
+        assert sensitivity.costChange(name, entry["cost"]) == pytest.approx(sensitivity.objVal)
+        # Prices in the units updatePrices() takes, a server's list price included
+        component = b.components[b.varNames.index(name)]
+        assert entry["cost"] == pytest.approx(component.cost)
+        cost = entry["cost"] * 1.1
+        estimate = sensitivity.costChange(name, cost)
+        if estimate is None:
+            continue
+        scenario = so.ScenarioModel(catalog, env)
+        assert scenario.optimize(prices={component.identifier: cost}).objVal <= estimate + 1e-6
+        checked += 1
+    assert checked > 0
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import solveCache
+
+
+@pytest.fixture
+def counted(so, monkeypatch):
+    # Counts the solves that miss the cache
+    calls = []
+    solveUncached = so.solveUncached
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return solveUncached(*args, **kwargs)
+    monkeypatch.setattr(so, "solveUncached", counting)
+    return calls
+
+
+def inputs(so, path, **overrides):
+    return so.currentInputs(dict(overrides, solverMode="mip", cachePath=path))
+
+
+def test_cacheHit(so, catalog, env, counted, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = so.solve(inputs(so, path), catalog, env)
+    second = so.solve(inputs(so, path), catalog, env)
+    assert len(counted) == 1
+    assert second.objVal == first.objVal
+    assert second.configuration() == first.configuration()
+    # A new process reads the file, not the memory of this one
+    solveCache.openCaches.pop(path)
+    third = so.solve(inputs(so, path), catalog, env)
+    assert len(counted) == 1
+    assert third.configuration() == first.configuration()
+
+
+def test_cacheInvalidation(so, catalog, env, counted, tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    so.solve(inputs(so, path), catalog, env)
+    # Another requirement misses; inputs that only change what is written besides do not
+    so.solve(inputs(so, path, minDiskTB=2000), catalog, env)
+    assert len(counted) == 2
+    so.solve(inputs(so, path, profileBuild=True, compileModels=False), catalog, env)
+    assert len(counted) == 2
+    # A changed model formulation misses
+    monkeypatch.setattr(so, "sourceKey", "another version")
+    so.solve(inputs(so, path), catalog, env)
+    assert len(counted) == 3
+
+
+def test_cacheOffByDefault(so, catalog, env, counted, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = so.currentInputs({"solverMode": "mip"})
+    assert p["cachePath"] is None
+    so.solve(p, catalog, env)
+    so.solve(p, catalog, env)
+    assert len(counted) == 2
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_timeLimitedSolvesAreNotCached(so, catalog, env, counted, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    solution = so.solve(inputs(so, path, timeLimit=1e-9, minCores=3000), catalog, env)
+    assert solution.status == so.GRB.TIME_LIMIT
+    so.solve(inputs(so, path, timeLimit=1e-9, minCores=3000), catalog, env)
+    assert len(counted) == 2
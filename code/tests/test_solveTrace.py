@@ -0,0 +1,49 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def solveTrace():
+    import solveTrace
+    return solveTrace
+
+
+def tracedSolve(so, solveTrace, catalog, env, mix, path=None):
+    p = so.currentInputs(dict(mix, solverMode="mip", warmStartPath=None, cachePath=None))
+    m, b = so.ilpModel(catalog, p, env)
+    trace = solveTrace.SolveTrace(path)
+    m.optimize(trace)
+    return m, trace.write(m, mix)
+
+
+def test_traceEndsAtObjVal(so, solveTrace, catalog, env, mixes):
+    for mix in mixes:
+        m, result = tracedSolve(so, solveTrace, catalog, env, mix)
+        solutions = [point for point in result["points"] if point["event"] == "solution"]
+        assert solutions
+        incumbents = [point["incumbent"] for point in result["points"] if point["incumbent"] is not None]
+        bounds = [point["bound"] for point in result["points"]]
+        # Minimizing: the incumbent only falls and the bound only rises
+        assert all(later <= earlier + 1e-9 for earlier, later in zip(incumbents, incumbents[1:]))
+        assert all(later >= earlier - 1e-9 for earlier, later in zip(bounds, bounds[1:]))
+        assert all(point["bound"] <= point["incumbent"] + 1e-6 for point in solutions)
+        improvements = [point for point in solutions if point["improved"]]
+        assert improvements[-1]["incumbent"] == pytest.approx(m.ObjVal)
+        assert result["objVal"] == m.ObjVal
+        assert result["lastImprovement"] == improvements[-1]["time"]
+        assert result["firstSolution"] <= result["lastImprovement"] <= result["runtime"]
+        assert result["gap"] == pytest.approx(solveTrace.relativeGap(m.ObjVal, m.ObjBound))
+
+
+def test_writeAppendsLines(so, solveTrace, catalog, env, mixes, tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    for mix in mixes[:2]:
+        tracedSolve(so, solveTrace, catalog, env, mix, path)
+    traces = solveTrace.loadTraces(path)
+    assert [trace["inputs"] for trace in traces] == [json.loads(json.dumps(mix)) for mix in mixes[:2]]
+    summary = solveTrace.traceSummary(traces)
+    assert summary["runtime"]["count"] == 2
+    assert solveTrace.slowestSolves(traces, top=1)[0]["runtime"] == max(trace["runtime"] for trace in traces)
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Every solver mode against the ILP ("mip") on the same requirement mixes
+import csv
+import os
+
+import pytest
+
+from componentCatalog import defaultCatalogDir, loadCatalog
+from conftest import solveMode
+
+
+def test_enumerateMatchesIlp(so, catalog, env, mixes):
+    enumerated = 0
+    for mix in mixes:
+        if so.bestConfigurations(catalog, so.currentInputs(mix), top=1) is None:
+            continue
+        enumerated += 1
+        mip = solveMode(so, catalog, env, mix, "mip")
+        solution = solveMode(so, catalog, env, mix, "enumerate")
+        assert solution.objVal == pytest.approx(mip.objVal)
+        assert solution.cost == pytest.approx(mip.cost)
+    # The defaults are a single type case
+    assert enumerated > 0
+
+
+def test_enumerateRefusesMixedTypes(so, catalog, env):
+    with pytest.raises(ValueError):
+        solveMode(so, catalog, env, {"maxDistinctCpus": 2, "maxDistinctServerTypes": 2}, "enumerate")
+
+
+def test_decomposeMatchesIlp(so, catalog, env, mixes):
+    for mix in mixes:
+        mip = solveMode(so, catalog, env, mix, "mip")
+        solution = solveMode(so, catalog, env, mix, "decompose")
+        assert solution.objVal == pytest.approx(mip.objVal)
+
+
+def test_decomposeUsesGivenCatalog(so, catalog, env, tmp_path):
+    # A catalog other than the default must reach the workers
+    for name in os.listdir(defaultCatalogDir):
+        if name.endswith(".csv"):
+            with open(os.path.join(defaultCatalogDir, name)) as source, open(tmp_path / name, "w", newline="") as target:
+                rows = list(csv.reader(source))
+                if name == "servers.csv":
+                    cost = rows[0].index("cost")
+                    for row in rows[1:]:
+                        row[cost] = str(2 * float(row[cost]))
+                csv.writer(target).writerows(rows)
+    doubled = loadCatalog(str(tmp_path), str(tmp_path / ".compiled"))
+    mip = so.solve(so.currentInputs({"solverMode": "mip"}), doubled, env)
+    best, results = so.decomposeByServer(so.currentInputs(), workers=2, catalog=doubled)
+    assert best["objVal"] == pytest.approx(mip.objVal)
+    assert mip.objVal > solveMode(so, catalog, env, {}, "mip").objVal
+
+
+def test_columnsIsBoundedHeuristic(so, catalog, env, mixes):
+    # Whole node configurations can cost more than the ILP, which only checks per node
+    # limits in total; the result is optimal only when it meets its own LP bound
+    for mix in mixes:
+        mip = solveMode(so, catalog, env, mix, "mip")
+        solution = solveMode(so, catalog, env, mix, "columns")
+        assert solution.objVal >= mip.objVal - 1e-6
+        assert solution.bound <= solution.objVal + 1e-6
+        assert solution.mipGap == pytest.approx((solution.objVal - solution.bound) / solution.objVal)
+        assert solution.status in (so.GRB.OPTIMAL, so.HEURISTIC)
+        if solution.status == so.GRB.OPTIMAL:
+            assert solution.mipGap == pytest.approx(0.0, abs=1e-9)
+    # The defaults reach the ILP's optimum
+    assert solveMode(so, catalog, env, {}, "columns").objVal == pytest.approx(solveMode(so, catalog, env, {}, "mip").objVal)
+
+
+def test_columnsWithoutConfigurationIsNotInfeasible(so, catalog, env, tmp_path):
+    mix = {"maxServers": 1, "minDiskTB": 100000}
+    assert solveMode(so, catalog, env, mix, "mip").status == so.GRB.INFEASIBLE
+    solution = solveMode(so, catalog, env, mix, "columns", cachePath=str(tmp_path / "cache.sqlite"))
+    assert solution is not None and solution.objVal is None
+    assert solution.status == so.HEURISTIC
+    assert not so.cacheable(solution)
+
+
+@pytest.mark.parametrize("mode", ["mip", "decompose", "columns"])
+def test_budgetAppliesToEveryMode(so, catalog, env, mode):
+    solution = solveMode(so, catalog, env, {}, mode, timeLimit=0.0)
+    assert solution.status == so.GRB.TIME_LIMIT
+    assert not so.cacheable(solution)
+    solution = solveMode(so, catalog, env, {}, mode, timeLimit=60)
+    assert solution.status != so.GRB.TIME_LIMIT
+    assert solution.objVal == pytest.approx(solveMode(so, catalog, env, {}, "mip").objVal)
+
+
+@pytest.mark.parametrize("mode", ["decompose", "columns"])
+def test_gapTargetAppliesToEveryMode(so, catalog, env, mode):
+    # A loose gap target stops early with a configuration within it of the mode's bound
+    solution = solveMode(so, catalog, env, {}, mode, mipGap=0.2)
+    mip = solveMode(so, catalog, env, {}, "mip")
+    assert solution.objVal >= mip.objVal - 1e-6
+    assert solution.bound <= solution.objVal + 1e-6
+    if mode == "decompose":
+        assert solution.mipGap <= 0.2 + 1e-9
+        assert solution.bound <= mip.objVal + 1e-6
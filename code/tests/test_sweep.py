@@ -0,0 +1,20 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import solveMode
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2])
+def test_sweepMatchesSolve(so, catalog, env, mixes, chunkSize):
+    results = sorted(so.sweep(mixes, workers=2, chunkSize=chunkSize), key=lambda result: result["index"])
+    assert [result["index"] for result in results] == list(range(len(mixes)))
+    for mix, result in zip(mixes, results):
+        assert "error" not in result
+        assert result["scenario"] == mix
+        assert result["objVal"] == pytest.approx(solveMode(so, catalog, env, mix, "mip").objVal)
+
+
+def test_scenarioGrid(so):
+    assert so.scenarioGrid(minMemory=[4096, 8192], minDiskTB=[500]) == [{"minMemory": 4096, "minDiskTB": 500},
+                                                                        {"minMemory": 8192, "minDiskTB": 500}]
@@ -0,0 +1,43 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from warmStart import openWarmStartStore
+
+
+def test_warmStartRoundTrip(so, catalog, env, tmp_path):
+    path = str(tmp_path / "warmstart")
+    p = so.currentInputs({"solverMode": "mip", "warmStartPath": path})
+    solved = so.solve(p, catalog, env)
+    assert os.listdir(path) == ["ILP.json"]
+    # The saved solution is the start of the next model and is its optimum
+    m, b = so.ilpModel(catalog, p, env)
+    store = openWarmStartStore(path)
+    entry = store.apply(m, p, b.catalogKey)
+    assert entry["objVal"] == pytest.approx(solved.objVal)
+    m.update()
+    # With the same catalog every variable starts from the saved value, zero if none was saved
+    starts = m.getAttr("Start", b.vars)
+    assert starts == pytest.approx([entry["values"].get(name, 0.0) for name in b.varNames])
+    m.optimize()
+    assert m.ObjVal == pytest.approx(solved.objVal)
+
+
+def test_closestInputsStart(so, catalog, env, tmp_path):
+    path = str(tmp_path / "warmstart")
+    for minDiskTB in [1000, 3000]:
+        so.solve(so.currentInputs({"solverMode": "mip", "warmStartPath": path, "minDiskTB": minDiskTB}), catalog, env)
+    p = so.currentInputs({"solverMode": "mip", "warmStartPath": path, "minDiskTB": 2800})
+    assert openWarmStartStore(path).closest("ILP", p)["inputs"]["minDiskTB"] == 3000
+    assert so.solve(p, catalog, env).objVal == pytest.approx(so.solve(dict(p, warmStartPath=None), catalog, env).objVal)
+
+
+def test_warmStartOffByDefault(so, catalog, env, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    p = so.currentInputs({"solverMode": "mip"})
+    assert p["warmStartPath"] is None
+    so.solve(p, catalog, env)
+    assert os.listdir(str(tmp_path)) == []
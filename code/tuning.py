@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Runs Gurobi's parameter tuner on the ILP and goal programming models of a set of
+# requirement mixes and saves the best parameter set of each model to config.tuningPath,
+# which later solves load (see setSolveParams()):
+#
+#   python tuning.py --mixes 6 --tune-time 60
+#
+# The tuner works on one model at a time, so every mix is tuned on its own and each
+# parameter set it suggests is then timed on all mixes. The set with the lowest total
+# runtime is saved, or an empty profile when none beats the defaults.
+import argparse
+import os
+import tempfile
+import time
+
+from benchmark import mixGoals, requirementMixes
+from componentCatalog import defaultCatalogDir, loadCatalog
+
+# Parameters of the tuner itself, never saved in a profile
+tunerParams = ["TuneTimeLimit", "TuneResults", "TuneOutput", "TuneTrials", "TuneCriterion", "TimeLimit"]
+
+
+def tuningModel(so, kind, catalog, mix, env):
+    # The model kind ("ILP" or "goals") of a requirement mix, built but not solved
+    if kind == "ILP":
+        m, b = so.ilpModel(catalog, so.currentInputs(dict(mix, solverMode="mip")), env)
+        return m
+    goals = mixGoals(so, mix, env)
+    so.goalModel(goals, catalog)
+    return goals.model
+
+
+def parseValue(text):
+    # setParam() wants ints and floats as numbers, not as the text of the file
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def readParams(path):
+    # {name: value} of a Gurobi .prm file
+    params = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                name, value = line.split(None, 1)
+                params[name] = parseValue(value)
+    return params
+
+
+def changedParams(m):
+    # Parameters of m that differ from Gurobi's defaults
+    handle, path = tempfile.mkstemp(suffix=".prm")
+    os.close(handle)
+    try:
+        m.write(path)
+        return readParams(path)
+    finally:
+        os.remove(path)
+
+
+def tunedParams(m, tuneTime, results=3):
+    # The parameter sets the tuner suggests for m, without those m already had
+    before = changedParams(m)
+    m.Params.TuneTimeLimit = tuneTime
+    m.Params.TuneResults = results
+    m.tune()
+    candidates = []
+    for k in range(m.TuneResultCount):
+        m.getTuneResult(k)
+        candidates.append(dict((name, value) for name, value in changedParams(m).items()
+                               if before.get(name) != value and name not in tunerParams))
+    return candidates
+
+
+def timeParams(so, kind, catalog, mixes, env, params, timeLimit):
+    # Total runtime of solving every mix with params
+    total = 0.0
+    for mix in mixes:
+        m = tuningModel(so, kind, catalog, mix, env)
+        for name, value in params.items():
+            m.setParam(name, value)
+        m.Params.TimeLimit = timeLimit
+        m.optimize()
+        total += m.Runtime
+        m.dispose()
+    return total
+
+
+def writeProfile(path, params, comment):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("# " + comment + "\n")
+        for name, value in sorted(params.items()):
+            f.write("{} {}\n".format(name, value))
+    return path
+
+
+def tune(kind="ILP", mixes=6, seed=0, tuneTime=60, timeLimit=300, threads=0, catalogDir=defaultCatalogDir, path=None):
+    # Tunes kind over requirementMixes(mixes, seed), saves the best profile to path
+    # (config.tuningPath by default) and returns (path, params, runtime, default runtime)
+    import serverOptimization as so
+    env = so.quietEnv(threads)
+    catalog = loadCatalog(catalogDir)
+    mixList = requirementMixes(mixes, seed)
+    candidates = []
+    for mix in mixList:
+        m = tuningModel(so, kind, catalog, mix, env)
+        for params in tunedParams(m, tuneTime):
+            if params and params not in candidates:
+                candidates.append(params)
+        m.dispose()
+    default = timeParams(so, kind, catalog, mixList, env, {}, timeLimit)
+    best, bestTime = {}, default
+    for params in candidates:
+        runtime = timeParams(so, kind, catalog, mixList, env, params, timeLimit)
+        if runtime < bestTime:
+            best, bestTime = params, runtime
+    path = path or os.path.join(so.config.tuningPath, kind + ".prm")
+    comment = "{} over {} mixes (seed {}) on {}: {:.3f}s, defaults {:.3f}s".format(kind, len(mixList), seed,
+                                                                                  time.strftime("%Y-%m-%d"), bestTime, default)
+    writeProfile(path, best, comment)
+    return path, best, bestTime, default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune Gurobi parameters for the ILP and goal programming models")
+    parser.add_argument("--kinds", nargs="+", default=["ILP", "goals"], choices=["ILP", "goals"])
+    parser.add_argument("--mixes", type=int, default=6, help="requirement mixes to tune and time on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tune-time", type=float, default=60, help="seconds the tuner spends on each mix")
+    parser.add_argument("--time-limit", type=float, default=300, help="seconds per solve when timing a parameter set")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--catalog", default=defaultCatalogDir)
+    parser.add_argument("--output", help="directory to save the profiles to, config.tuningPath by default")
+    args = parser.parse_args()
+    for kind in args.kinds:
+        path = os.path.join(args.output, kind + ".prm") if args.output else None
+        path, params, runtime, default = tune(kind, args.mixes, args.seed, args.tune_time, args.time_limit, args.threads,
+                                              args.catalog, path)
+        print("{}: {} ({:.3f}s, defaults {:.3f}s) -> {}".format(kind, params or "defaults", runtime, default, path))
+
+
+if __name__ == "__main__":
+    main()
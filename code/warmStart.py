@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+
+
+def inputDistance(a, b):
+    # Sum of relative differences of numeric inputs; any other differing input counts as 1
+    distance = 0.0
+    for name in set(a) | set(b):
+        x, y = a.get(name), b.get(name)
+        numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (x, y))
+        if numeric:
+            distance += abs(x - y) / max(abs(x), abs(y), 1)
+        elif x != y:
+            distance += 1
+    return distance
+
+
+class WarmStartStore:
+    # Solved configurations saved per model name (one JSON file each) with the inputs they
+    # were solved for. Values are keyed by variable name and only nonzeros are stored.
+
+    def __init__(self, path, capacity=200):
+        self.path = path
+        self.capacity = capacity
+
+    def fileName(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def load(self, name):
+        try:
+            with open(self.fileName(name)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return []
+
+    def closest(self, name, inputs):
+        entries = self.load(name)
+        if not entries:
+            return None
+        return min(entries, key=lambda entry: inputDistance(entry["inputs"], inputs))
+
+    def apply(self, model, inputs, catalogKey=None):
+        # Sets Start from the closest saved solution. With the same catalog every variable
+        # gets a value (zero when not stored); after a catalog change only the stored
+        # variables that still exist are set and Gurobi completes the partial start.
+        entry = self.closest(model.ModelName, inputs)
+        if entry is None:
+            return None
+        model.update()
+        vars = model.getVars()
+        names = model.getAttr("VarName", vars)
+        values = entry["values"]
+        if catalogKey is not None and entry.get("catalogKey") == catalogKey:
+            model.setAttr("Start", vars, [values.get(name, 0.0) for name in names])
+        else:
+            matched = [(v, values[name]) for v, name in zip(vars, names) if name in values]
+            model.setAttr("Start", [v for v, x in matched], [x for v, x in matched])
+        return entry
+
+    def save(self, model, inputs, catalogKey=None):
+        if model.SolCount == 0:
+            return
+        vars = model.getVars()
+        values = dict((name, round(x, 6)) for name, x in zip(model.getAttr("VarName", vars), model.getAttr("X", vars))
+                      if abs(x) > 1e-6)
+        entries = [entry for entry in self.load(model.ModelName) if entry["inputs"] != inputs]
+        entries.append({"inputs": inputs, "catalogKey": catalogKey, "objVal": model.ObjVal, "values": values})
+        entries = entries[-self.capacity:]
+        os.makedirs(self.path, exist_ok=True)
+        # Write then rename so concurrent solves never read a partial file
+        handle, temporary = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(handle, "w") as f:
+            json.dump(entries, f)
+        os.replace(temporary, self.fileName(model.ModelName))
+
+
+def openWarmStartStore(path):
+    return WarmStartStore(path) if path else None